@@ -0,0 +1,254 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dados_isp import carregar_ocorrencias, compactar_ocorrencias, endereco_da_linha_de_comando, \
+    indicadores
+from outliers import matriz_totais
+
+# Agrupamento de CISPs/AISPs pelo perfil de vários indicadores ao mesmo tempo,
+# em vez de comparar um indicador por vez em boxplots e listas de outliers.
+#
+# A matriz (grupos x indicadores) de totais é transformada com log1p (as contagens
+# são muito assimétricas) e padronizada por coluna (média 0, desvio 1).
+# O k-means em minilotes (Sculley, 2010) atualiza os centróides com lotes
+# sorteados: a atribuição do lote é um produto de matrizes e a atualização de
+# todos os centróides é uma média ponderada pelas contagens acumuladas.
+# Cada k da faixa roda em um processo; a silhueta mede a separação dos grupos
+# (em bases grandes, sobre uma amostra).
+
+TAMANHO_LOTE = 1024
+AMOSTRA_SILHUETA = 5000
+
+
+# matriz padronizada e os parâmetros para voltar à escala original
+def matriz_perfis(df, nivel, lista_indicadores=None, log=True):
+    grupos, lista_indicadores, matriz = matriz_totais(df, nivel, lista_indicadores)
+    # a soma do groupby dá 0 para um grupo sem nenhum valor, que não tem perfil
+    sem_valores = df[lista_indicadores].isna().groupby(df[nivel], observed=True).all()
+    if sem_valores.to_numpy().any():
+        raise ValueError('Indicadores sem valores em algum grupo; '
+                         'escolha indicadores com valores em todos os grupos')
+
+    transformada = np.log1p(matriz) if log else matriz
+    media = transformada.mean(axis=0)
+    desvio = transformada.std(axis=0)
+    # indicador constante não separa grupos: fica zerado
+    desvio = np.where(desvio == 0, 1.0, desvio)
+
+    return {
+        'grupos': grupos,
+        'indicadores': lista_indicadores,
+        'matriz': (transformada - media) / desvio,
+        'media': media,
+        'desvio': desvio,
+        'log': log,
+    }
+
+
+# distâncias euclidianas ao quadrado (linhas x centróides)
+def _distancias(matriz, centroides):
+    distancias = (matriz**2).sum(axis=1)[:, np.newaxis] - 2 * matriz @ centroides.T \
+        + (centroides**2).sum(axis=1)
+    return np.maximum(distancias, 0)
+
+
+# inicialização k-means++: cada novo centróide é sorteado com probabilidade
+# proporcional à distância ao centróide mais próximo
+def _inicializar(matriz, k, gerador):
+    centroides = np.empty((k, matriz.shape[1]))
+    centroides[0] = matriz[gerador.integers(len(matriz))]
+    mais_proximo = _distancias(matriz, centroides[:1])[:, 0]
+    for c in range(1, k):
+        total = mais_proximo.sum()
+        if total == 0:
+            centroides[c] = matriz[gerador.integers(len(matriz))]
+        else:
+            centroides[c] = matriz[gerador.choice(len(matriz), p=mais_proximo / total)]
+        mais_proximo = np.minimum(mais_proximo, _distancias(matriz, centroides[c:c + 1])[:, 0])
+    return centroides
+
+
+# retorna (rotulos, centroides, inercia) da melhor entre `inicializacoes` execuções
+def kmeans_minilote(matriz, k, tamanho_lote=TAMANHO_LOTE, iteracoes=100, inicializacoes=3,
+                    tolerancia=1e-4, semente=0):
+    matriz = np.asarray(matriz, dtype=float)
+    n = len(matriz)
+    if not 1 <= k <= n:
+        raise ValueError(f'k deve estar entre 1 e a quantidade de grupos ({n})')
+
+    melhor = None
+    sementes = np.random.SeedSequence(semente).spawn(inicializacoes)
+    for gerador in map(np.random.default_rng, sementes):
+        centroides = _inicializar(matriz, k, gerador)
+        contagens = np.zeros(k)
+
+        for _ in range(iteracoes):
+            if tamanho_lote < n:
+                lote = matriz[gerador.choice(n, tamanho_lote, replace=False)]
+            else:
+                lote = matriz
+            rotulos_lote = np.argmin(_distancias(lote, centroides), axis=1)
+
+            # equivale às atualizações de Sculley ponto a ponto (taxa 1 / contagem)
+            n_lote = np.bincount(rotulos_lote, minlength=k)
+            somas = np.zeros_like(centroides)
+            np.add.at(somas, rotulos_lote, lote)
+            contagens_novas = contagens + n_lote
+            atualizados = n_lote > 0
+            novos = centroides.copy()
+            novos[atualizados] = (contagens[atualizados, np.newaxis] * centroides[atualizados]
+                                  + somas[atualizados]) / contagens_novas[atualizados, np.newaxis]
+
+            deslocamento = np.abs(novos - centroides).max()
+            centroides, contagens = novos, contagens_novas
+            if deslocamento < tolerancia:
+                break
+
+        distancias = _distancias(matriz, centroides)
+        rotulos = np.argmin(distancias, axis=1)
+        inercia = distancias[np.arange(n), rotulos].sum()
+        if melhor is None or inercia < melhor[2]:
+            melhor = (rotulos, centroides, inercia)
+
+    return melhor
+
+
+# silhueta média: (b - a) / max(a, b), com a = distância média ao próprio grupo
+# e b = menor distância média a outro grupo; calculada em blocos de linhas
+def silhueta(matriz, rotulos, amostra=AMOSTRA_SILHUETA, semente=0, tamanho_bloco=1000):
+    matriz = np.asarray(matriz, dtype=float)
+    n = len(matriz)
+    k = int(rotulos.max()) + 1
+    if k < 2:
+        return np.nan
+
+    selecionados = np.arange(n)
+    if amostra is not None and n > amostra:
+        selecionados = np.sort(np.random.default_rng(semente).choice(n, amostra, replace=False))
+    pontos, rotulos_pontos = matriz[selecionados], rotulos[selecionados]
+    quantidade = np.bincount(rotulos_pontos, minlength=k)
+    indicadora = np.zeros((len(pontos), k))
+    indicadora[np.arange(len(pontos)), rotulos_pontos] = 1
+
+    valores = np.empty(len(pontos))
+    for inicio in range(0, len(pontos), tamanho_bloco):
+        fim = min(inicio + tamanho_bloco, len(pontos))
+        distancias = np.sqrt(_distancias(pontos[inicio:fim], pontos))
+        somas = distancias @ indicadora
+        proprio = rotulos_pontos[inicio:fim]
+        linhas = np.arange(fim - inicio)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # o próprio ponto (distância 0) não entra na média do seu grupo
+            a = somas[linhas, proprio] / (quantidade[proprio] - 1)
+            medias = somas / quantidade
+        medias[linhas, proprio] = np.inf
+        medias[:, quantidade == 0] = np.inf
+        b = medias.min(axis=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = (b - a) / np.maximum(a, b)
+        # grupo com um único ponto tem silhueta 0
+        valores[inicio:fim] = np.where(quantidade[proprio] > 1, s, 0.0)
+
+    return float(np.mean(valores))
+
+
+def _ajustar_k(matriz, k, tamanho_lote, iteracoes, semente, amostra):
+    rotulos, centroides, inercia = kmeans_minilote(matriz, k, tamanho_lote, iteracoes,
+                                                   semente=semente)
+    return {
+        'k': k,
+        'rotulos': rotulos,
+        'centroides': centroides,
+        'inercia': inercia,
+        'silhueta': silhueta(matriz, rotulos, amostra, semente),
+    }
+
+
+# k-means para cada k da faixa, um k por processo
+# retorna (df_resumo, df_atribuicoes, centroides):
+#   df_resumo: k, inércia e silhueta
+#   df_atribuicoes: grupo e o cluster de cada grupo para cada k (colunas k2, k3...)
+#   centroides: {k: DataFrame (clusters x indicadores) na escala original dos totais}
+def agrupar(df, nivel='cisp', lista_indicadores=None, faixa_k=range(2, 11), log=True,
+            tamanho_lote=TAMANHO_LOTE, iteracoes=100, semente=0, amostra=AMOSTRA_SILHUETA,
+            processos=None):
+    perfis = matriz_perfis(df, nivel, lista_indicadores, log)
+    matriz = perfis['matriz']
+    faixa_k = [k for k in faixa_k if k <= len(matriz)]
+    if not faixa_k:
+        raise ValueError(f'Nenhum k da faixa cabe em {len(matriz)} grupos')
+
+    argumentos = ([matriz] * len(faixa_k), faixa_k, [tamanho_lote] * len(faixa_k),
+                  [iteracoes] * len(faixa_k), [semente] * len(faixa_k),
+                  [amostra] * len(faixa_k))
+    if processos == 1:
+        resultados = list(map(_ajustar_k, *argumentos))
+    else:
+        processos = processos or min(len(faixa_k), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(_ajustar_k, *argumentos))
+
+    df_resumo = pd.DataFrame({
+        'k': [resultado['k'] for resultado in resultados],
+        'inercia': [resultado['inercia'] for resultado in resultados],
+        'silhueta': [resultado['silhueta'] for resultado in resultados],
+    })
+
+    df_atribuicoes = pd.DataFrame({nivel: np.asarray(perfis['grupos'])})
+    centroides = {}
+    for resultado in resultados:
+        df_atribuicoes[f'k{resultado["k"]}'] = resultado['rotulos']
+        originais = resultado['centroides'] * perfis['desvio'] + perfis['media']
+        if perfis['log']:
+            originais = np.expm1(originais)
+        centroides[resultado['k']] = pd.DataFrame(originais, columns=perfis['indicadores'])
+
+    return df_resumo, df_atribuicoes, centroides
+
+
+if __name__ == '__main__':
+    # uso: python agrupamento.py [nivel] [endereco]
+    nivel = sys.argv[1] if len(sys.argv) > 1 else 'cisp'
+
+    try:
+        print('Obtendo dados...')
+
+        df_ocorrencias = carregar_ocorrencias(endereco_da_linha_de_comando(2))
+        df_ocorrencias = compactar_ocorrencias(df_ocorrencias)
+
+        # indicadores com valores em todas as linhas
+        lista_indicadores = [indicador for indicador in indicadores(df_ocorrencias)
+                             if df_ocorrencias[indicador].notna().all()]
+
+        print('Dados obtidos com sucesso!')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print(f'Agrupando {nivel} pelo perfil de {len(lista_indicadores)} indicadores...')
+
+        df_resumo, df_atribuicoes, centroides = agrupar(df_ocorrencias, nivel, lista_indicadores)
+
+        print('\nInércia e silhueta por k: ')
+        print(30*'-')
+        print(df_resumo.to_string(index=False))
+
+        melhor_k = int(df_resumo.loc[df_resumo['silhueta'].idxmax(), 'k'])
+        print(f'\nCentróides com k = {melhor_k} (maior silhueta): ')
+        print(30*'-')
+        df_centroides = centroides[melhor_k]
+        df_centroides.insert(0, 'quantidade',
+                             np.bincount(df_atribuicoes[f'k{melhor_k}'], minlength=melhor_k))
+        print(df_centroides.round(1).to_string())
+
+    except Exception as e:
+        print(f'Erro ao agrupar: {e}')
+        exit()
@@ -0,0 +1,207 @@
+import sys
+
+import numpy as np
+
+from dados_isp import ENDERECO_DADOS, baixar_dados, compactar_ocorrencias, ler_ocorrencias
+from executor_dag import adicionar_etapa, executar
+from instrumentacao import exibir_relatorio
+from medidas import calcular_medidas, outliers_iqr
+
+# As análises dos exemplos e exercícios declaradas como etapas de um DAG.
+# Todas repetem "obter dados -> delimitar variáveis -> groupby sum -> medidas";
+# aqui as etapas comuns (download, leitura, filtro de anos e cada agregação
+# (nível, indicador)) são calculadas uma única vez por execução e compartilhadas.
+# Os scripts exemploNN/exercicioNN obtêm daqui a base totalizada da sua análise
+# (resultado['total']) e seguem com os cálculos e gráficos de cada aula.
+# Com uma tabela de população, as análises rodam sobre taxas por 100 mil habitantes
+# em vez das contagens brutas (o índice da tabela é construído uma vez e a junção é
+# feita uma vez por base e nível). Com a tabela em outro nível, só os níveis que
+# contêm unidades inteiras da tabela têm taxa (com uma tabela por munic, munic e
+# mes_ano; cisp e aisp exigem uma tabela por cisp, ver enriquecimento.py).
+# Uma análise que falha não impede as demais: com erros={}, executar_analises
+# retorna as que rodaram e registra em erros o motivo das outras.
+# O pandas só é carregado pela etapa de leitura do CSV e o módulo de
+# enriquecimento só quando há tabela de população.
+
+# nome da análise: tipo, nível de agregação, indicadores e intervalo de anos
+ANALISES = {
+    'exemplo01': {'tipo': 'perfil', 'nivel': 'munic', 'indicadores': ['roubo_veiculo']},
+    'exemplo02': {'tipo': 'perfil', 'nivel': 'munic', 'indicadores': ['roubo_veiculo']},
+    'exemplo03': {'tipo': 'perfil', 'nivel': 'munic', 'indicadores': ['roubo_veiculo']},
+    'exemplo04': {'tipo': 'perfil', 'nivel': 'munic', 'indicadores': ['roubo_veiculo']},
+    'exemplo05': {'tipo': 'correlacao', 'nivel': 'cisp',
+                  'indicadores': ['roubo_veiculo', 'recuperacao_veiculos']},
+    'exercicio01': {'tipo': 'perfil', 'nivel': 'mes_ano', 'indicadores': ['estelionato']},
+    'exercicio02': {'tipo': 'perfil', 'nivel': 'cisp', 'indicadores': ['recuperacao_veiculos']},
+    'exercicio03': {'tipo': 'perfil', 'nivel': 'aisp', 'indicadores': ['cvli']},
+    'exercicio04': {'tipo': 'perfil', 'nivel': 'aisp', 'indicadores': ['hom_doloso'],
+                    'anos': (2022, 2023)},
+    'exercicio05': {'tipo': 'correlacao', 'nivel': 'cisp',
+                    'indicadores': ['lesao_corp_dolosa', 'lesao_corp_morte']},
+}
+
+
+def filtrar_anos(df, anos):
+    return df[(df['ano'] >= anos[0]) & (df['ano'] <= anos[1])]
+
+
+def totalizar(df, nivel, indicador):
+    return df[[nivel, indicador]].groupby([nivel], observed=True).sum().reset_index()
+
+
+# medidas descritivas, quartis e outliers de um indicador totalizado
+def perfil(df_total, indicador, multiplicador=1.5, metodo_quantil='weibull'):
+    medidas = calcular_medidas(df_total[indicador], multiplicador, metodo_quantil)
+    inferiores, superiores = outliers_iqr(df_total[indicador], medidas)
+    valores = df_total[indicador].to_numpy()
+
+    return {
+        'total': df_total,
+        'medidas': medidas,
+        'abaixo_q1': df_total[valores < medidas['q1']].sort_values(by=indicador),
+        'acima_q3': df_total[valores > medidas['q3']].sort_values(by=indicador,
+                                                                 ascending=False),
+        'outliers_inferiores': df_total[inferiores].sort_values(by=indicador),
+        'outliers_superiores': df_total[superiores].sort_values(by=indicador,
+                                                               ascending=False),
+    }
+
+
+# correlação de pearson entre dois indicadores totalizados pelo mesmo nível
+# total: os dois indicadores lado a lado, uma linha por grupo
+def correlacao(df_total_x, df_total_y):
+    x = df_total_x.iloc[:, 1].to_numpy(dtype=float)
+    y = df_total_y.iloc[:, 1].to_numpy(dtype=float)
+    return {'total': df_total_x.merge(df_total_y, on=df_total_x.columns[0]),
+            'correlacao': np.corrcoef(x, y)[0, 1]}
+
+
+# declara as etapas das análises escolhidas e retorna (etapas, alvos)
+# populacao: DataFrame com colunas <nivel> (ex.: munic), ano e populacao para
+# analisar taxas
+def montar_etapas(nomes=None, endereco=ENDERECO_DADOS, ocorrencias=None, populacao=None):
+    if nomes is None:
+        nomes = list(ANALISES)
+
+    etapas = {}
+    if ocorrencias is not None:
+        # base já carregada (ex.: bases de teste)
+        adicionar_etapa(etapas, 'ler', lambda: ocorrencias)
+    else:
+        adicionar_etapa(etapas, 'obter', lambda: baixar_dados(endereco))
+        adicionar_etapa(etapas, 'ler',
+                        lambda conteudo: compactar_ocorrencias(ler_ocorrencias(conteudo),
+                                                               exibir=False),
+                        ['obter'])
+
+    alvos = []
+    for nome in nomes:
+        definicao = ANALISES[nome]
+        nivel = definicao['nivel']
+
+        base = 'ler'
+        if 'anos' in definicao:
+            inicio, fim = definicao['anos']
+            base = adicionar_etapa(etapas, f'anos:{inicio}-{fim}',
+                                   lambda df, anos=(inicio, fim): filtrar_anos(df, anos),
+                                   ['ler'])
+
+        if populacao is None:
+            agregados = [
+                adicionar_etapa(etapas, f'agregado:{base}:{nivel}:{indicador}',
+                                lambda df, nivel=nivel, indicador=indicador:
+                                    totalizar(df, nivel, indicador),
+                                [base])
+                for indicador in definicao['indicadores']
+            ]
+        else:
+            from enriquecimento import construir_indice_populacao, taxas_periodo
+
+            indice = adicionar_etapa(etapas, 'indice_populacao',
+                                     lambda: construir_indice_populacao(populacao))
+            taxas = adicionar_etapa(etapas, f'taxas:{base}:{nivel}',
+                                    lambda df, indice, nivel=nivel:
+                                        taxas_periodo(df, indice, nivel),
+                                    [base, indice])
+            agregados = [
+                adicionar_etapa(etapas, f'taxa:{base}:{nivel}:{indicador}',
+                                lambda df_taxas, nivel=nivel, indicador=indicador:
+                                    df_taxas[[nivel, indicador]],
+                                [taxas])
+                for indicador in definicao['indicadores']
+            ]
+
+        if definicao['tipo'] == 'perfil':
+            indicador = definicao['indicadores'][0]
+            calculo = adicionar_etapa(etapas, f'perfil:{agregados[0]}',
+                                      lambda df_total, indicador=indicador:
+                                          perfil(df_total, indicador),
+                                      agregados)
+        else:
+            calculo = adicionar_etapa(etapas, f'correlacao:{"|".join(agregados)}',
+                                      correlacao, agregados)
+
+        alvos.append(adicionar_etapa(etapas, f'analise:{nome}', lambda resultado: resultado,
+                                     [calculo]))
+
+    return etapas, alvos
+
+
+# executa as análises e retorna {nome da análise: resultado}
+# erros: dicionário que recebe {nome da análise: exceção} das análises que falharam,
+# deixadas fora do resultado; sem ele, a primeira falha é lançada
+def executar_analises(nomes=None, endereco=ENDERECO_DADOS, ocorrencias=None, max_threads=None,
+                      populacao=None, erros=None):
+    if nomes is None:
+        nomes = list(ANALISES)
+    etapas, alvos = montar_etapas(nomes, endereco, ocorrencias, populacao)
+    erros_etapas = {} if erros is not None else None
+    resultados = executar(etapas, alvos, max_threads, erros_etapas)
+    if erros is not None:
+        erros.update({nome: erros_etapas[alvo] for nome, alvo in zip(nomes, alvos)
+                      if alvo in erros_etapas})
+    return {nome: resultados[alvo] for nome, alvo in zip(nomes, alvos) if alvo in resultados}
+
+
+if __name__ == '__main__':
+    # uso: python analises.py [endereco] [analise ...] [--populacao=populacao.csv]
+    argumentos = [argumento for argumento in sys.argv[1:] if not argumento.startswith('--')]
+    opcoes = dict(argumento[2:].split('=', 1) for argumento in sys.argv[1:]
+                  if argumento.startswith('--'))
+    endereco = argumentos[0] if argumentos else ENDERECO_DADOS
+    nomes = argumentos[1:] or None
+
+    try:
+        print('Executando análises...')
+
+        populacao = None
+        if 'populacao' in opcoes:
+            from enriquecimento import carregar_populacao
+
+            populacao = carregar_populacao(opcoes['populacao'])
+
+        erros = {}
+        resultados = executar_analises(nomes, endereco, populacao=populacao, erros=erros)
+
+        for nome, erro in erros.items():
+            print(f'\n{nome}: análise ignorada ({erro})')
+
+        for nome, resultado in resultados.items():
+            print(f'\n{nome}: ')
+            print(30*'-')
+            if 'correlacao' in resultado:
+                print(f'Correlação: {resultado["correlacao"]}')
+            else:
+                medidas = resultado['medidas']
+                print(f'Média: {medidas["media"]}')
+                print(f'Mediana: {medidas["mediana"]}')
+                print(f'Q1: {medidas["q1"]}')
+                print(f'Q3: {medidas["q3"]}')
+                print(f'Limite superior: {medidas["limite_superior"]}')
+                print(f'Outliers superiores: {len(resultado["outliers_superiores"])}')
+
+        exibir_relatorio()
+
+    except Exception as e:
+        print(f'Erro ao executar análises: {e}')
+        exit()
@@ -0,0 +1,164 @@
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from dados_isp import carregar_ocorrencias, compactar_ocorrencias, endereco_da_linha_de_comando, \
+    indicadores, indice_mes_ano, rotulo_mes_ano
+from outliers import ESCALA_MAD
+
+# Anomalias mensais por grupo: "a CISP 12 teve um março anormal".
+# Para cada indicador é montada uma matriz densa (grupo x mês) e todas as linhas
+# são comparadas ao mesmo tempo com uma linha de base ao longo do eixo do tempo:
+#
+# movel: média e desvio padrão dos `janela` meses anteriores (somas acumuladas)
+# sazonal: mediana do mesmo mês nos `anos_base` anos anteriores; o resíduo é
+#          escalado pelo MAD dos resíduos do grupo
+#
+# Meses em que o grupo não tem registro ficam como nan e não geram anomalias.
+
+
+# cubo (indicadores x grupos x meses) com um bincount por indicador
+def cubo_grupo_mes(df, nivel, lista_indicadores=None):
+    if lista_indicadores is None:
+        lista_indicadores = indicadores(df)
+
+    codigos, grupos = pd.factorize(df[nivel], sort=True)
+    meses = indice_mes_ano(df['ano'].to_numpy(dtype=np.int64), df['mes'].to_numpy(dtype=np.int64))
+    primeiro_mes = meses.min()
+    n_meses = meses.max() - primeiro_mes + 1
+    posicao = codigos * n_meses + (meses - primeiro_mes)
+    tamanho = len(grupos) * n_meses
+
+    # meses sem nenhuma linha do grupo ficam nan
+    presentes = np.bincount(posicao, minlength=tamanho).reshape(len(grupos), n_meses) > 0
+
+    cubo = np.empty((len(lista_indicadores), len(grupos), n_meses))
+    for i, indicador in enumerate(lista_indicadores):
+        valores = df[indicador].to_numpy(dtype=float, na_value=np.nan)
+        validos = ~np.isnan(valores)
+        cubo[i] = np.bincount(posicao[validos], weights=valores[validos],
+                              minlength=tamanho).reshape(len(grupos), n_meses)
+        cubo[i][~presentes] = np.nan
+
+    indices_meses = np.arange(primeiro_mes, primeiro_mes + n_meses)
+    return grupos, indices_meses, lista_indicadores, cubo
+
+
+# média e desvio padrão dos `janela` meses anteriores a cada mês (eixo -1)
+def _linha_base_movel(matriz, janela, minimo_meses):
+    validos = ~np.isnan(matriz)
+    valores = np.where(validos, matriz, 0.0)
+
+    formato_zeros = matriz.shape[:-1] + (1,)
+    zeros = np.zeros(formato_zeros)
+    soma = np.concatenate([zeros, np.cumsum(valores, axis=-1)], axis=-1)
+    soma_quadrados = np.concatenate([zeros, np.cumsum(valores**2, axis=-1)], axis=-1)
+    contagem = np.concatenate([zeros, np.cumsum(validos, axis=-1)], axis=-1)
+
+    # para o mês t, a janela é [t - janela, t)
+    n_meses = matriz.shape[-1]
+    fim = np.arange(n_meses)
+    inicio = np.maximum(fim - janela, 0)
+
+    n = contagem[..., fim] - contagem[..., inicio]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media = (soma[..., fim] - soma[..., inicio]) / n
+        variancia = (soma_quadrados[..., fim] - soma_quadrados[..., inicio]) / n - media**2
+    desvio = np.sqrt(np.maximum(variancia, 0))
+
+    media[n < minimo_meses] = np.nan
+    return media, desvio
+
+
+def _linha_base_sazonal(matriz, anos_base):
+    n_meses = matriz.shape[-1]
+    anteriores = np.full((anos_base,) + matriz.shape, np.nan)
+    for k in range(1, anos_base + 1):
+        if 12 * k < n_meses:
+            anteriores[k - 1][..., 12 * k:] = matriz[..., :-12 * k]
+
+    # grupos sem histórico suficiente geram médias vazias (nan), sem aviso
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        media = np.nanmedian(anteriores, axis=0)
+        residuo = matriz - media
+        mediana = np.nanmedian(residuo, axis=-1, keepdims=True)
+        escala = ESCALA_MAD * np.nanmedian(np.abs(residuo - mediana), axis=-1, keepdims=True)
+    return media, np.broadcast_to(escala, matriz.shape)
+
+
+# z-score de cada célula (grupo, mês) em relação à linha de base
+# o desvio mínimo de 1 ocorrência evita z-scores enormes em séries quase constantes
+def pontuar_anomalias(cubo, metodo='movel', janela=12, anos_base=3, minimo_meses=6):
+    if metodo == 'movel':
+        esperado, desvio = _linha_base_movel(cubo, janela, minimo_meses)
+    elif metodo == 'sazonal':
+        esperado, desvio = _linha_base_sazonal(cubo, anos_base)
+    else:
+        raise ValueError(f'Método de anomalia desconhecido: {metodo}. Opções: movel, sazonal')
+
+    with np.errstate(invalid='ignore'):
+        zscore = (cubo - esperado) / np.maximum(desvio, 1.0)
+    return esperado, zscore
+
+
+# lista ordenada (maior |z| primeiro) das células anômalas de todos os indicadores
+def detectar_anomalias(df, nivel='cisp', lista_indicadores=None, metodo='movel', limite=3.0,
+                       janela=12, anos_base=3, maximo=None):
+    grupos, meses, lista_indicadores, cubo = cubo_grupo_mes(df, nivel, lista_indicadores)
+    esperado, zscore = pontuar_anomalias(cubo, metodo, janela, anos_base)
+
+    with np.errstate(invalid='ignore'):
+        anomalas = np.abs(zscore) > limite
+    i, g, m = np.nonzero(anomalas)
+
+    df_anomalias = pd.DataFrame({
+        'indicador': np.asarray(lista_indicadores)[i],
+        nivel: np.asarray(grupos)[g],
+        'mes_ano': rotulo_mes_ano(meses[m]),
+        'valor': cubo[i, g, m],
+        'esperado': esperado[i, g, m],
+        'zscore': zscore[i, g, m],
+    })
+    ordem = np.argsort(-np.abs(df_anomalias['zscore'].to_numpy()), kind='stable')
+    df_anomalias = df_anomalias.iloc[ordem].reset_index(drop=True)
+
+    if maximo is not None:
+        df_anomalias = df_anomalias.head(maximo)
+    return df_anomalias
+
+
+if __name__ == '__main__':
+    # uso: python anomalias.py [nivel] [metodo] [endereco]
+    nivel = sys.argv[1] if len(sys.argv) > 1 else 'cisp'
+    metodo = sys.argv[2] if len(sys.argv) > 2 else 'movel'
+
+    try:
+        print('Obtendo dados...')
+
+        df_ocorrencias = carregar_ocorrencias(endereco_da_linha_de_comando(3))
+        df_ocorrencias = compactar_ocorrencias(df_ocorrencias)
+
+        print('Dados obtidos com sucesso!')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print('Detectando anomalias mensais...')
+
+        df_anomalias = detectar_anomalias(df_ocorrencias, nivel, metodo=metodo)
+
+        print(f'\nMeses anômalos por {nivel}: ')
+        print(30*'-')
+        if len(df_anomalias) == 0:
+            print('Nenhuma anomalia encontrada!')
+        else:
+            print(df_anomalias.head(30))
+
+    except Exception as e:
+        print(f'Erro ao detectar anomalias: {e}')
+        exit()
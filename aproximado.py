@@ -0,0 +1,370 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dados_isp import carregar_ocorrencias, compactar_ocorrencias, endereco_da_linha_de_comando
+from medidas import calcular_medidas
+
+# Modo aproximado e interativo para as medidas do exemplo04 e a correlação do exemplo05.
+# A amostra é estratificada por (cisp, ano): cada estrato tem até 12 linhas, uma por
+# mês, e a base é dividida em blocos por uma rotação sorteada dos meses de cada
+# estrato (o mês m do estrato h vai para o bloco (m + deslocamento_h) mod blocos).
+# Com 12 blocos, cada bloco traz um mês de cada estrato, em meses diferentes de
+# estrato para estrato; depois de k blocos cada estrato teve k meses lidos. A divisão
+# depende só de cisp, ano e mês, não da ordem das linhas no arquivo, e custa algumas
+# passadas lineares (sem ordenar a base).
+#
+# O total de cada grupo do nível é a soma de N_h * média lida de seus estratos, e a
+# variância é a do estimador estratificado, soma de N_h² (1 - n_h / N_h) s²_h / n_h
+# (s²_h: variância dentro do estrato). Por isso o primeiro resultado sai com dois
+# blocos lidos, quando os estratos de ano completo já têm dois meses. Estratos com
+# menos de duas linhas lidas (anos incompletos) usam a variância dentro dos estratos
+# do grupo, combinada; os ainda sem linhas lidas entram com a média do grupo. Por
+# estrato são acumuladas só contagens, somas e produtos cruzados. O nível precisa
+# conter estratos inteiros (cisp, aisp, risp, munic, ano...); mes_ano, por exemplo,
+# não pode ser estimado assim.
+#
+# Os totais estimados têm ruído, e estatísticas não lineares dos totais ficam viesadas
+# (a correlação é atenuada, o desvio padrão inflado). Por isso:
+# - correlação: o viés de atenuação é descontado das covariâncias e o intervalo é
+#   calculado na escala z de Fisher, com o erro padrão pelo método delta
+# - medidas: bootstrap paramétrico (réplicas dos totais com o ruído estimado de cada
+#   grupo); a estimativa é corrigida pelo viés das réplicas e o intervalo é o
+#   bootstrap básico (2 * estimativa - quantis das réplicas)
+# A cada bloco a estimativa é refinada; quem chama pode parar quando os limites
+# estiverem estreitos o bastante (ou passar uma tolerância). Lida a base inteira,
+# o resultado é o exato.
+
+MEDIDAS_APROXIMADAS = ['media', 'mediana', 'q1', 'q3', 'desvio_padrao', 'coef_variacao',
+                       'assimetria']
+
+# quantil da normal para 95% de confiança
+Z_95 = 1.959964
+
+# estratos, divididos em blocos pela coluna mes
+ESTRATOS = ['cisp', 'ano']
+MESES = 12
+
+# quantidade de blocos; divisor de 12 para que cada bloco tenha a mesma quantidade de
+# meses de cada estrato
+BLOCOS = 12
+REPLICAS = 200
+
+
+# array da coluna (códigos, se categórica)
+def _array(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy()
+    if pd.api.types.is_extension_array_dtype(serie):
+        return serie.to_numpy(dtype=float, na_value=np.nan)
+    return serie.to_numpy()
+
+
+# códigos 0..n-1 dos valores presentes em um array de inteiros >= 0, sem ordenar
+def _densos(brutos):
+    presentes = np.bincount(brutos) > 0
+    return (np.cumsum(presentes) - 1)[brutos]
+
+
+# inteiros >= 0 que identificam os valores de uma coluna, não necessariamente
+# consecutivos (-1: valor ausente, fora de todos os grupos, como no groupby)
+def _codigos(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy()
+    if pd.api.types.is_integer_dtype(serie.dtype) \
+            and not pd.api.types.is_extension_array_dtype(serie):
+        valores = serie.to_numpy()
+        return valores - valores.min()
+    return pd.factorize(serie.to_numpy())[0]
+
+
+# somas de desvios cruzados dentro de cada estrato (estratos x colunas x colunas)
+def _desvios(contagem, somas, produtos, pares):
+    cruzados = np.zeros((len(contagem), len(somas), len(somas)))
+    for produto, (i, j) in zip(produtos, pares):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dentro = np.where(contagem > 0, produto - somas[i] * somas[j] / contagem, 0)
+        cruzados[:, i, j] = cruzados[:, j, i] = dentro
+    return cruzados
+
+
+# soma por grupo de um array por estrato (estratos x ...)
+def _por_grupo(valores, grupo_estrato, n_grupos):
+    planos = valores.reshape(len(valores), -1)
+    return np.stack([np.bincount(grupo_estrato, weights=plano, minlength=n_grupos)
+                     for plano in planos.T], axis=1).reshape((n_grupos,) + valores.shape[1:])
+
+
+# gerador: a cada bloco, os totais estimados (colunas x grupos), a covariância do
+# total estimado de cada grupo (grupos x colunas x colunas) e a fração lida
+def amostras_progressivas(df, colunas, nivel, blocos=BLOCOS, semente=0):
+    if MESES % blocos:
+        raise ValueError(f'A quantidade de blocos deve dividir {MESES}: {blocos}')
+    rng = np.random.default_rng(semente)
+
+    grupos = _codigos(df[nivel])
+    cisps = grupos if nivel == ESTRATOS[0] else _codigos(df[ESTRATOS[0]])
+    anos = _codigos(df[ESTRATOS[1]])
+    meses = _array(df['mes'])
+    arrays = [_array(df[coluna]) for coluna in colunas]
+    validos = grupos >= 0
+    if not validos.all():
+        grupos, cisps, anos, meses = grupos[validos], cisps[validos], anos[validos], \
+            meses[validos]
+        arrays = [array[validos] for array in arrays]
+
+    # estratos numerados só entre as combinações presentes; a contagem dá o tamanho
+    combinacoes = cisps.astype(np.int64) * (anos.max(initial=0) + 1) + anos
+    contagens = np.bincount(combinacoes)
+    presentes = contagens > 0
+    estratos = (np.cumsum(presentes) - 1)[combinacoes]
+    tamanhos = contagens[presentes]
+    n_estratos = len(tamanhos)
+
+    # o grupo de cada estrato; os grupos são numerados por estrato, não por linha
+    grupo_estrato = np.full(n_estratos, -1, dtype=grupos.dtype)
+    grupo_estrato[estratos] = grupos
+    if not np.array_equal(grupo_estrato[estratos], grupos):
+        raise ValueError(f'O nível {nivel} divide estratos '
+                         f'({", ".join(ESTRATOS)}); não pode ser estimado por amostra')
+    grupo_estrato = _densos(grupo_estrato.astype(np.int64))
+    n_grupos = grupo_estrato.max(initial=-1) + 1
+
+    # mês do estrato (0..11) girado pelo deslocamento sorteado; int8 para que as
+    # passadas pela base a cada bloco sejam baratas
+    deslocamentos = rng.integers(MESES, size=n_estratos, dtype=np.int8)
+    bloco_linha = (meses.astype(np.int8) - 1 + deslocamentos[estratos]) % MESES
+    if blocos < MESES:
+        bloco_linha %= blocos
+
+    n_colunas = len(colunas)
+    pares = [(i, j) for i in range(n_colunas) for j in range(i, n_colunas)]
+    contagem = np.zeros(n_estratos)
+    somas = [np.zeros(n_estratos) for _ in range(n_colunas)]
+    produtos = [np.zeros(n_estratos) for _ in pares]
+
+    for lidos, bloco in enumerate(rng.permutation(blocos), start=1):
+        linhas = np.flatnonzero(bloco_linha == bloco)
+        codigos = estratos[linhas]
+        valores = [np.nan_to_num(np.asarray(array[linhas], dtype=float)) for array in arrays]
+        contagem += np.bincount(codigos, minlength=n_estratos)
+        somas = [soma + np.bincount(codigos, weights=valor, minlength=n_estratos)
+                 for soma, valor in zip(somas, valores)]
+        produtos = [produto + np.bincount(codigos, weights=valores[i] * valores[j],
+                                          minlength=n_estratos)
+                    for produto, (i, j) in zip(produtos, pares)]
+
+        # a partir de dois blocos, todos os estratos de ano completo têm a variância
+        # dentro estimável
+        if lidos < min(2, blocos):
+            continue
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            medias = [soma / contagem for soma in somas]
+            # estratos ainda sem linhas lidas entram com a média do grupo
+            n_grupo = np.bincount(grupo_estrato, weights=contagem, minlength=n_grupos)
+            medias_grupo = [np.bincount(grupo_estrato, weights=soma, minlength=n_grupos)
+                            / n_grupo for soma in somas]
+        medias = [np.where(contagem > 0, media, media_grupo[grupo_estrato])
+                  for media, media_grupo in zip(medias, medias_grupo)]
+        totais = np.stack([np.bincount(grupo_estrato, weights=tamanhos * media,
+                                       minlength=n_grupos) for media in medias])
+
+        covariancias = np.zeros((n_grupos, n_colunas, n_colunas))
+        if lidos < blocos:
+            # estratos com menos de duas linhas lidas (anos incompletos): covariância
+            # dentro dos estratos do grupo, combinada (ou de todos, se o grupo não tiver)
+            cruzados = _desvios(contagem, somas, produtos, pares)
+            graus = np.maximum(contagem - 1, 0)
+            cruzados_grupo = _por_grupo(cruzados, grupo_estrato, n_grupos)
+            graus_grupo = np.bincount(grupo_estrato, weights=graus, minlength=n_grupos)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                combinada = np.where((graus_grupo > 0)[:, np.newaxis, np.newaxis],
+                                     cruzados_grupo / graus_grupo[:, np.newaxis, np.newaxis],
+                                     cruzados.sum(axis=0) / graus.sum())
+                cov_estrato = np.where((graus > 0)[:, np.newaxis, np.newaxis],
+                                       cruzados / graus[:, np.newaxis, np.newaxis],
+                                       combinada[grupo_estrato])
+
+                # lidos: N² (1 - n / N) s² / n; não lidos: (soma dos N)² s² / n do grupo
+                escala = np.where(contagem > 0,
+                                  tamanhos**2 * (1 - contagem / tamanhos) / contagem, 0)
+                nao_lidos = np.bincount(grupo_estrato, weights=tamanhos * (contagem == 0),
+                                        minlength=n_grupos)
+                escala_grupo = np.where(nao_lidos > 0, nao_lidos**2 / n_grupo, 0)
+            covariancias = _por_grupo(cov_estrato * escala[:, np.newaxis, np.newaxis],
+                                      grupo_estrato, n_grupos) \
+                + combinada * escala_grupo[:, np.newaxis, np.newaxis]
+
+        yield {
+            'blocos': lidos,
+            'fracao_amostrada': contagem.sum() / len(estratos),
+            'completo': lidos == blocos,
+            'totais': totais,
+            'covariancias': covariancias,
+        }
+
+
+# medidas de cada linha de uma matriz (réplicas x grupos), como em calcular_medidas
+def _medidas_replicas(matriz):
+    media = matriz.mean(axis=1)
+    desvios = matriz - media[:, np.newaxis]
+    m2 = np.mean(desvios**2, axis=1)
+    m3 = np.mean(desvios**3, axis=1)
+    n = matriz.shape[1]
+    desvio_padrao = np.sqrt(m2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        assimetria = np.where((n < 3) | (m2 == 0), np.nan,
+                              np.sqrt(n * (n - 1)) / (n - 2) * m3 / m2**1.5)
+        coef_variacao = desvio_padrao / media
+    q1, mediana, q3 = np.quantile(matriz, [0.25, 0.5, 0.75], axis=1, method='weibull')
+    return {
+        'media': media,
+        'mediana': mediana,
+        'q1': q1,
+        'q3': q3,
+        'desvio_padrao': desvio_padrao,
+        'coef_variacao': coef_variacao,
+        'assimetria': assimetria,
+    }
+
+
+# estimativas corrigidas e intervalo bootstrap básico das medidas dos totais
+def _intervalos_medidas(amostra, rng, replicas):
+    totais = amostra['totais'][0]
+    medidas = calcular_medidas(totais)
+    if amostra['completo']:
+        return {nome: (medidas[nome],) * 3 for nome in MEDIDAS_APROXIMADAS}
+
+    desvios = np.sqrt(amostra['covariancias'][:, 0, 0])
+    matriz = totais + rng.standard_normal((replicas, len(totais))) * desvios
+    por_replica = _medidas_replicas(matriz)
+
+    intervalos = {}
+    for nome in MEDIDAS_APROXIMADAS:
+        estimativa = medidas[nome]
+        valores = por_replica[nome]
+        if np.isnan(valores).any():
+            intervalos[nome] = (estimativa, np.nan, np.nan)
+            continue
+        baixo, alto = np.quantile(valores, [0.025, 0.975])
+        intervalos[nome] = (2 * estimativa - valores.mean(), 2 * estimativa - alto,
+                            2 * estimativa - baixo)
+    return intervalos
+
+
+# correlação com o viés de atenuação descontado e intervalo na escala z de Fisher
+def _intervalo_correlacao(amostra):
+    x, y = amostra['totais']
+    if amostra['completo']:
+        correlacao = np.corrcoef(x, y)[0, 1]
+        return correlacao, correlacao, correlacao
+
+    covariancias = amostra['covariancias']
+    n = len(x)
+    dx, dy = x - x.mean(), y - y.mean()
+    sxx, syy, sxy = np.mean(dx**2), np.mean(dy**2), np.mean(dx * dy)
+    correlacao = sxy / np.sqrt(sxx * syy)
+
+    # o ruído dos totais soma (1 - 1/n) * variância média do ruído a cada momento
+    ajuste = 1 - 1 / n
+    sxx_c = max(sxx - ajuste * covariancias[:, 0, 0].mean(), 1e-12 * sxx)
+    syy_c = max(syy - ajuste * covariancias[:, 1, 1].mean(), 1e-12 * syy)
+    sxy_c = sxy - ajuste * covariancias[:, 0, 1].mean()
+    corrigida = np.clip(sxy_c / np.sqrt(sxx_c * syy_c), -1 + 1e-12, 1 - 1e-12)
+
+    # método delta: derivada da correlação em relação ao total de cada grupo
+    gx = (dy / np.sqrt(sxx * syy) - correlacao * dx / sxx) / n
+    gy = (dx / np.sqrt(sxx * syy) - correlacao * dy / syy) / n
+    variancia = np.sum(gx**2 * covariancias[:, 0, 0] + gy**2 * covariancias[:, 1, 1]
+                       + 2 * gx * gy * covariancias[:, 0, 1])
+    erro_z = np.sqrt(variancia) / (1 - corrigida**2)
+    z = np.arctanh(corrigida)
+    return corrigida, np.tanh(z - Z_95 * erro_z), np.tanh(z + Z_95 * erro_z)
+
+
+# acrescenta à amostra os intervalos e o maior erro; para quando passar da tolerância
+def _progredir(amostras, intervalos, tolerancia, relativa):
+    for amostra in amostras:
+        resultado = {'blocos': amostra['blocos'], 'fracao_amostrada': amostra['fracao_amostrada']}
+        maior_erro = 0.0
+        for nome, (estimativa, inferior, superior) in intervalos(amostra).items():
+            resultado[nome] = (estimativa, inferior, superior)
+            meia_largura = (superior - inferior) / 2
+            if np.isnan(meia_largura):
+                meia_largura = np.inf
+            erro = meia_largura / abs(estimativa) if relativa and estimativa != 0 \
+                else meia_largura
+            maior_erro = max(maior_erro, erro)
+
+        resultado['maior_erro'] = maior_erro
+        yield resultado
+
+        if tolerancia is not None and maior_erro <= tolerancia:
+            return
+
+
+# gerador: a cada bloco, {medida: (estimativa, limite_inferior, limite_superior)}
+# medidas do exemplo04 sobre os totais de um indicador por nível
+def medidas_aproximadas(df, indicador, nivel='munic', blocos=BLOCOS, tolerancia=None,
+                        relativa=True, semente=0, replicas=REPLICAS):
+    rng = np.random.default_rng([semente, 1])
+    amostras = amostras_progressivas(df, [indicador], nivel, blocos, semente)
+    return _progredir(amostras, lambda amostra: _intervalos_medidas(amostra, rng, replicas),
+                      tolerancia, relativa)
+
+
+# correlação de pearson do exemplo05 entre os totais de dois indicadores por nível
+# a tolerância é absoluta (diferença no coeficiente)
+def correlacao_aproximada(df, indicador_x, indicador_y, nivel='cisp', blocos=BLOCOS,
+                          tolerancia=None, relativa=False, semente=0):
+    amostras = amostras_progressivas(df, [indicador_x, indicador_y], nivel, blocos, semente)
+    return _progredir(amostras,
+                      lambda amostra: {'correlacao': _intervalo_correlacao(amostra)},
+                      tolerancia, relativa)
+
+
+if __name__ == '__main__':
+    # uso: python aproximado.py [tolerancia] [endereco]
+    tolerancia = float(sys.argv[1]) if len(sys.argv) > 1 else 0.05
+
+    try:
+        print('Obtendo dados...')
+
+        df_ocorrencias = carregar_ocorrencias(endereco_da_linha_de_comando(2))
+        df_ocorrencias = compactar_ocorrencias(df_ocorrencias)
+
+        print('Dados obtidos com sucesso!')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print('Estimando medidas de roubo de veículos por município...')
+
+        for resultado in medidas_aproximadas(df_ocorrencias, 'roubo_veiculo', 'munic',
+                                             tolerancia=tolerancia):
+            print(f'Blocos: {resultado["blocos"]} '
+                  f'({resultado["fracao_amostrada"]:.1%} da base), '
+                  f'maior erro relativo: {resultado["maior_erro"]:.4f}')
+
+        print('\nMedidas aproximadas (intervalo de 95%): ')
+        print(30*'-')
+        for nome in MEDIDAS_APROXIMADAS:
+            estimativa, inferior, superior = resultado[nome]
+            print(f'{nome}: {estimativa} [{inferior}, {superior}]')
+
+        for resultado in correlacao_aproximada(df_ocorrencias, 'roubo_veiculo',
+                                               'recuperacao_veiculos', 'cisp',
+                                               tolerancia=tolerancia):
+            pass
+
+        estimativa, inferior, superior = resultado['correlacao']
+        print(f'\nCorrelação aproximada: {estimativa} [{inferior}, {superior}] '
+              f'com {resultado["fracao_amostrada"]:.1%} da base')
+
+    except Exception as e:
+        print(f'Erro ao estimar medidas: {e}')
+        exit()
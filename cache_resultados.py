@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from analises import filtrar_anos, perfil, totalizar
+from dados_isp import carregar_ocorrencias
+from instrumentacao import contadores, contar, cronometrar
+
+# Cache em disco de resultados (perfis, tabelas de outliers, matrizes de correlação).
+# A chave é o hash do conteúdo da base + todos os parâmetros da análise
+# (indicador, nível, intervalo de anos, método dos quantis, multiplicador dos limites).
+# O índice fica em um SQLite dentro do diretório do cache, que serializa o acesso
+# de vários processos; cada resultado é um arquivo pickle gravado de forma atômica.
+# Quando o tamanho total passa do limite, os resultados usados há mais tempo saem (LRU).
+
+DIRETORIO_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'aed_isp')
+LIMITE_BYTES = 512 * 1024**2
+
+
+# hash do conteúdo de um arquivo local, lido em blocos
+def hash_arquivo(caminho, tamanho_bloco=1024**2):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+# hash do conteúdo de uma base já carregada (colunas, tipos e valores)
+def hash_dataframe(df):
+    sha = hashlib.sha256()
+    sha.update(json.dumps([str(coluna) for coluna in df.columns]).encode())
+    sha.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+def chave_resultado(hash_dados, **parametros):
+    texto = json.dumps({'dados': hash_dados, **parametros}, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def _conectar(diretorio):
+    os.makedirs(diretorio, exist_ok=True)
+    conexao = sqlite3.connect(os.path.join(diretorio, 'indice.sqlite'),
+                              timeout=60, isolation_level=None)
+    conexao.execute('PRAGMA journal_mode=WAL')
+    conexao.execute('CREATE TABLE IF NOT EXISTS resultados ('
+                    'chave TEXT PRIMARY KEY, arquivo TEXT NOT NULL, '
+                    'tamanho INTEGER NOT NULL, ultimo_acesso REAL NOT NULL)')
+    conexao.execute('CREATE INDEX IF NOT EXISTS idx_ultimo_acesso '
+                    'ON resultados (ultimo_acesso)')
+    return conexao
+
+
+# retorna (encontrado, valor)
+def obter_resultado(chave, diretorio=DIRETORIO_CACHE):
+    conexao = _conectar(diretorio)
+    try:
+        linha = conexao.execute('SELECT arquivo FROM resultados WHERE chave = ?',
+                                (chave,)).fetchone()
+        if linha is None:
+            contar('cache.falhas')
+            return False, None
+
+        try:
+            with open(os.path.join(diretorio, linha[0]), 'rb') as arquivo:
+                valor = pickle.load(arquivo)
+        except FileNotFoundError:
+            # arquivo apagado por fora do cache: a linha órfã sai do índice
+            # (sob a trava de escrita, conferindo que ninguém regravou o arquivo)
+            conexao.execute('BEGIN IMMEDIATE')
+            if not os.path.exists(os.path.join(diretorio, linha[0])):
+                conexao.execute('DELETE FROM resultados WHERE chave = ?', (chave,))
+            conexao.execute('COMMIT')
+            contar('cache.falhas')
+            return False, None
+
+        conexao.execute('UPDATE resultados SET ultimo_acesso = ? WHERE chave = ?',
+                        (time.time(), chave))
+        contar('cache.acertos')
+        return True, valor
+    finally:
+        conexao.close()
+
+
+def guardar_resultado(chave, valor, diretorio=DIRETORIO_CACHE, limite_bytes=LIMITE_BYTES):
+    conexao = _conectar(diretorio)
+    # serializa fora da trava em um arquivo temporário; leitores nunca veem arquivo pela metade
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            pickle.dump(valor, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+        nome_arquivo = f'{chave}.pkl'
+        tamanho = os.path.getsize(temporario)
+
+        # renomear, atualizar o índice e apagar os despejados sob a mesma trava de escrita:
+        # um despejo de outro processo não apaga um arquivo que acabou de ser regravado
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            os.replace(temporario, os.path.join(diretorio, nome_arquivo))
+            conexao.execute('INSERT OR REPLACE INTO resultados VALUES (?, ?, ?, ?)',
+                            (chave, nome_arquivo, tamanho, time.time()))
+            removidos = _despejar(conexao, limite_bytes)
+            for arquivo_removido in removidos:
+                try:
+                    os.remove(os.path.join(diretorio, arquivo_removido))
+                except FileNotFoundError:
+                    pass
+            conexao.execute('COMMIT')
+        except BaseException:
+            conexao.execute('ROLLBACK')
+            raise
+
+        contar('cache.gravacoes')
+        contar('cache.despejos', len(removidos))
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        conexao.close()
+
+
+# remove do índice os resultados usados há mais tempo até caber no limite
+# (roda dentro da transação de guardar_resultado)
+def _despejar(conexao, limite_bytes):
+    total = conexao.execute('SELECT COALESCE(SUM(tamanho), 0) FROM resultados').fetchone()[0]
+    removidos = []
+    if total <= limite_bytes:
+        return removidos
+
+    for chave, arquivo, tamanho in conexao.execute(
+            'SELECT chave, arquivo, tamanho FROM resultados ORDER BY ultimo_acesso').fetchall():
+        if total <= limite_bytes:
+            break
+        conexao.execute('DELETE FROM resultados WHERE chave = ?', (chave,))
+        removidos.append(arquivo)
+        total -= tamanho
+    return removidos
+
+
+def resultado_em_cache(hash_dados, parametros, calcular, diretorio=DIRETORIO_CACHE,
+                       limite_bytes=LIMITE_BYTES):
+    chave = chave_resultado(hash_dados, **parametros)
+    encontrado, valor = obter_resultado(chave, diretorio)
+    if encontrado:
+        return valor
+
+    with cronometrar(f'cache.calcular.{parametros.get("tipo", "resultado")}'):
+        valor = calcular()
+    guardar_resultado(chave, valor, diretorio, limite_bytes)
+    return valor
+
+
+def estatisticas_cache(diretorio=DIRETORIO_CACHE):
+    conexao = _conectar(diretorio)
+    try:
+        quantidade, tamanho = conexao.execute(
+            'SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM resultados').fetchone()
+    finally:
+        conexao.close()
+
+    valores = contadores()
+    acertos = valores.get('cache.acertos', 0)
+    falhas = valores.get('cache.falhas', 0)
+    consultas = acertos + falhas
+    return {
+        'resultados': quantidade,
+        'bytes': tamanho,
+        'acertos': acertos,
+        'falhas': falhas,
+        'taxa_acerto': acertos / consultas if consultas else 0.0,
+    }
+
+
+def _filtrar_anos(df, anos):
+    return df if anos is None else filtrar_anos(df, anos)
+
+
+# perfil (medidas descritivas) e outliers de um indicador por nível, com cache
+# anos: (ano_inicial, ano_final) ou None para o histórico completo
+def perfil_outliers(df, hash_dados, indicador, nivel, anos=None, metodo_quantil='weibull',
+                    multiplicador=1.5, diretorio=DIRETORIO_CACHE, limite_bytes=LIMITE_BYTES):
+    parametros = {'tipo': 'perfil_outliers', 'indicador': indicador, 'nivel': nivel,
+                  'anos': anos, 'metodo_quantil': metodo_quantil,
+                  'multiplicador': multiplicador}
+
+    def calcular():
+        df_total = totalizar(_filtrar_anos(df, anos), nivel, indicador)
+        return perfil(df_total, indicador, multiplicador, metodo_quantil)
+
+    return resultado_em_cache(hash_dados, parametros, calcular, diretorio, limite_bytes)
+
+
+# matriz de correlação de pearson entre indicadores totalizados por nível, com cache
+def matriz_correlacao(df, hash_dados, lista_indicadores, nivel, anos=None,
+                      diretorio=DIRETORIO_CACHE, limite_bytes=LIMITE_BYTES):
+    parametros = {'tipo': 'correlacao', 'indicadores': list(lista_indicadores),
+                  'nivel': nivel, 'anos': anos}
+
+    def calcular():
+        df_total = _filtrar_anos(df, anos).groupby([nivel], observed=True)[
+            list(lista_indicadores)].sum()
+        matriz = np.corrcoef(df_total.to_numpy(dtype=float).T)
+        return pd.DataFrame(matriz, index=lista_indicadores, columns=lista_indicadores)
+
+    return resultado_em_cache(hash_dados, parametros, calcular, diretorio, limite_bytes)
+
+
+if __name__ == '__main__':
+    # uso: python cache_resultados.py arquivo.csv [indicador] [nivel]
+    indicador = sys.argv[2] if len(sys.argv) > 2 else 'roubo_veiculo'
+    nivel = sys.argv[3] if len(sys.argv) > 3 else 'munic'
+
+    try:
+        print('Obtendo dados...')
+
+        hash_dados = hash_arquivo(sys.argv[1])
+        df_ocorrencias = carregar_ocorrencias(sys.argv[1])
+
+        print(f'Hash da base: {hash_dados}')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print('Calculando perfil...')
+
+        resultado = perfil_outliers(df_ocorrencias, hash_dados, indicador, nivel)
+
+        print(f'\nMedidas de {indicador} por {nivel}: ')
+        print(30*'-')
+        for medida, valor in resultado['medidas'].items():
+            print(f'{medida}: {valor}')
+
+        print('\nCache: ')
+        print(30*'-')
+        for nome, valor in estatisticas_cache().items():
+            print(f'{nome}: {valor}')
+
+    except Exception as e:
+        print(f'Erro ao calcular perfil: {e}')
+        exit()
@@ -0,0 +1,123 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from anomalias import cubo_grupo_mes
+from dados_isp import carregar_ocorrencias, compactar_ocorrencias, endereco_da_linha_de_comando
+
+# Correlação cruzada com defasagem entre séries mensais.
+# No exemplo05 a correlação entre roubo_veiculo e recuperacao_veiculos é feita
+# sobre os totais, mas a recuperação acontece meses depois do roubo.
+# Aqui, para cada grupo, calcula-se a correlação de pearson entre x[t] e y[t + d]
+# para d = 0..max_defasagem, com todas as séries (pares x grupos) de uma vez:
+# os produtos cruzados saem de uma convolução por FFT e as somas de cada janela
+# de somas acumuladas.
+#
+# Meses sem registro do grupo contam como zero ocorrências.
+
+
+# x e y: arrays (..., meses); retorna (..., max_defasagem + 1)
+def correlacao_defasada(x, y, max_defasagem=12):
+    x = np.nan_to_num(np.asarray(x, dtype=float))
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    n = x.shape[-1]
+    if max_defasagem >= n - 1:
+        raise ValueError('max_defasagem precisa ser menor que a quantidade de meses - 1')
+
+    # centralizar reduz o erro numérico das somas
+    x = x - x.mean(axis=-1, keepdims=True)
+    y = y - y.mean(axis=-1, keepdims=True)
+
+    # soma de x[t] * y[t + d] para todas as defasagens d >= 0
+    tamanho_fft = 1 << int(np.ceil(np.log2(2 * n)))
+    cruzada = np.fft.irfft(np.conj(np.fft.rfft(x, tamanho_fft)) * np.fft.rfft(y, tamanho_fft),
+                           tamanho_fft)
+    defasagens = np.arange(max_defasagem + 1)
+    soma_xy = cruzada[..., defasagens]
+
+    # somas acumuladas: x usa os meses [0, n - d) e y usa [d, n)
+    def acumulada(valores):
+        zeros = np.zeros(valores.shape[:-1] + (1,))
+        return np.concatenate([zeros, np.cumsum(valores, axis=-1)], axis=-1)
+
+    soma_x = acumulada(x)[..., n - defasagens]
+    soma_xx = acumulada(x**2)[..., n - defasagens]
+    acumulada_y = acumulada(y)
+    acumulada_yy = acumulada(y**2)
+    soma_y = acumulada_y[..., n:n + 1] - acumulada_y[..., defasagens]
+    soma_yy = acumulada_yy[..., n:n + 1] - acumulada_yy[..., defasagens]
+
+    m = n - defasagens
+    covariancia = soma_xy - soma_x * soma_y / m
+    variancia_x = soma_xx - soma_x**2 / m
+    variancia_y = soma_yy - soma_y**2 / m
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return covariancia / np.sqrt(variancia_x * variancia_y)
+
+
+# defasagem com a maior correlação e o coeficiente correspondente
+def melhor_defasagem(correlacoes):
+    preenchidas = np.where(np.isnan(correlacoes), -np.inf, correlacoes)
+    melhor = np.argmax(preenchidas, axis=-1)
+    coeficiente = np.take_along_axis(correlacoes, melhor[..., np.newaxis], axis=-1)[..., 0]
+    return melhor, coeficiente
+
+
+# melhor defasagem por grupo para cada par (x, y) de indicadores, em um único cálculo
+def defasagens_por_grupo(df, pares, nivel='cisp', max_defasagem=12):
+    lista_indicadores = sorted({indicador for par in pares for indicador in par})
+    grupos, _, lista_indicadores, cubo = cubo_grupo_mes(df, nivel, lista_indicadores)
+    posicao = {indicador: i for i, indicador in enumerate(lista_indicadores)}
+
+    # arrays (pares x grupos x meses)
+    x = cubo[[posicao[par[0]] for par in pares]]
+    y = cubo[[posicao[par[1]] for par in pares]]
+
+    correlacoes = correlacao_defasada(x, y, max_defasagem)
+    melhor, coeficiente = melhor_defasagem(correlacoes)
+
+    tabelas = []
+    for p, (indicador_x, indicador_y) in enumerate(pares):
+        tabelas.append(pd.DataFrame({
+            'indicador_x': indicador_x,
+            'indicador_y': indicador_y,
+            nivel: np.asarray(grupos),
+            'melhor_defasagem': melhor[p],
+            'correlacao': coeficiente[p],
+            'correlacao_sem_defasagem': correlacoes[p, :, 0],
+        }))
+    return pd.concat(tabelas, ignore_index=True)
+
+
+if __name__ == '__main__':
+    # uso: python correlacao_defasada.py [max_defasagem] [endereco]
+    max_defasagem = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+
+    try:
+        print('Obtendo dados...')
+
+        df_ocorrencias = carregar_ocorrencias(endereco_da_linha_de_comando(2))
+        df_ocorrencias = compactar_ocorrencias(df_ocorrencias)
+
+        print('Dados obtidos com sucesso!')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print('Calculando correlação com defasagem...')
+
+        df_defasagens = defasagens_por_grupo(df_ocorrencias,
+                                             [('roubo_veiculo', 'recuperacao_veiculos')],
+                                             'cisp', max_defasagem)
+
+        print('\nDefasagem (meses) entre roubo e recuperação de veículos por CISP: ')
+        print(30*'-')
+        print(df_defasagens['melhor_defasagem'].value_counts().sort_index())
+        print(df_defasagens.sort_values(by='correlacao', ascending=False).head(10))
+
+    except Exception as e:
+        print(f'Erro ao calcular a correlação com defasagem: {e}')
+        exit()
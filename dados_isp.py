@@ -0,0 +1,124 @@
+# pandas é importado dentro das funções que leem ou transformam o CSV:
+# quem só usa as constantes e os índices de mes_ano (ex.: leitura das partições)
+# não paga o tempo de importação do pandas
+
+import sys
+
+from instrumentacao import contar
+
+# endereço da base de ocorrências por CISP do ISP
+ENDERECO_DADOS = 'https://www.ispdados.rj.gov.br/Arquivos/BaseDPEvolucaoMensalCisp.csv'
+
+# chave de uma linha da base: uma delegacia (cisp) em um mês (mes_ano)
+CHAVE = ['cisp', 'mes_ano']
+
+# colunas que descrevem a linha e não são contagens de ocorrências
+COLUNAS_DESCRITIVAS = ['cisp', 'mes', 'ano', 'mes_ano', 'aisp', 'risp',
+                       'munic', 'mcirc', 'regiao', 'fase']
+
+# colunas de nomes com poucos valores distintos (~90 municípios)
+COLUNAS_NOMES = ['munic', 'mcirc', 'regiao']
+
+# níveis de agregação usados nas análises
+NIVEIS = ['munic', 'cisp', 'aisp']
+
+
+# endereço da base nos scripts e módulos executados diretamente: o argumento da linha
+# de comando na posição indicada ou, sem ele, o CSV do ISP
+def endereco_da_linha_de_comando(posicao=1):
+    return sys.argv[posicao] if len(sys.argv) > posicao else ENDERECO_DADOS
+
+
+# a leitura é feita em fluxo (fluxo_comprimido.py): download com gzip e cópias
+# locais .gz/.zst descomprimidas aos poucos pelo parser
+# encodings principais: https://docs.python.org/3/library/codecs.html#standard-encodings
+# utf-8, iso-8859-1, latin1, cp1252 (o CSV do ISP é iso-8859-1)
+def carregar_ocorrencias(endereco=ENDERECO_DADOS):
+    from fluxo_comprimido import carregar_ocorrencias_fluxo
+
+    return carregar_ocorrencias_fluxo(endereco)
+
+
+# conteúdo bruto do CSV (url ou arquivo local), separado da leitura para que
+# o download e o parse possam ser etapas independentes
+# o conteúdo fica como veio (gzip quando o servidor comprime): ler_ocorrencias
+# descomprime em fluxo
+def baixar_dados(endereco=ENDERECO_DADOS):
+    from fluxo_comprimido import baixar_comprimido
+
+    return baixar_comprimido(endereco)
+
+
+def ler_ocorrencias(conteudo):
+    from fluxo_comprimido import ler_conteudo
+
+    return ler_conteudo(conteudo)
+
+
+# colunas numéricas de contagem (roubo_veiculo, estelionato, hom_doloso...)
+def indicadores(df):
+    import pandas as pd
+
+    return [coluna for coluna in df.columns
+            if coluna not in COLUNAS_DESCRITIVAS
+            and pd.api.types.is_numeric_dtype(df[coluna])]
+
+
+def memoria_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024**2
+
+
+# mes_ano como índice inteiro do mês: ano*12 + (mes-1)
+# meses consecutivos têm índices consecutivos, o que permite matrizes densas (grupo x mês)
+def indice_mes_ano(ano, mes):
+    return ano * 12 + (mes - 1)
+
+
+# converte o índice inteiro de volta para o rótulo do ISP (ex.: 2003m01)
+def rotulo_mes_ano(indices):
+    return [f'{indice // 12}m{indice % 12 + 1:02d}' for indice in indices]
+
+
+# reduz a memória da base carregada:
+# - contagens inteiras em int8/int16/int32
+# - munic, mcirc, regiao e demais colunas de texto como categorias (códigos inteiros + dicionário)
+# - mes_ano como índice inteiro do mês
+# os groupby passam a trabalhar sobre códigos inteiros em vez de strings
+# o que os scripts imprimem não muda: contagens com nan continuam float64 (inteiro
+# anulável imprimiria 1730 no lugar de 1730.0) e as colunas descritivas inteiras
+# (cisp, aisp, ano...) mantêm o tipo, que aparece nos totais agrupados por elas
+# a memória antes e depois vai para os contadores compactacao.memoria_antes_kb e
+# compactacao.memoria_depois_kb (somados a cada compactação; ver exibir_relatorio)
+def compactar_ocorrencias(df, exibir=True):
+    import pandas as pd
+
+    memoria_antes = memoria_mb(df)
+
+    colunas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+
+        if coluna == 'mes_ano' and 'ano' in df.columns and 'mes' in df.columns:
+            serie = pd.Series(indice_mes_ano(df['ano'].to_numpy(), df['mes'].to_numpy()),
+                              index=df.index)
+            serie = pd.to_numeric(serie, downcast='integer')
+        elif coluna in COLUNAS_NOMES or pd.api.types.is_object_dtype(serie) \
+                or pd.api.types.is_string_dtype(serie):
+            # is_string_dtype: no pandas 3 o texto lido do CSV é do tipo str, não object
+            serie = serie.astype('category')
+        elif coluna not in COLUNAS_DESCRITIVAS and pd.api.types.is_integer_dtype(serie):
+            serie = pd.to_numeric(serie, downcast='integer')
+
+        colunas[coluna] = serie
+
+    df_compacto = pd.DataFrame(colunas, index=df.index)
+    memoria_depois = memoria_mb(df_compacto)
+
+    contar('compactacao.memoria_antes_kb', round(memoria_antes * 1024))
+    contar('compactacao.memoria_depois_kb', round(memoria_depois * 1024))
+
+    if exibir:
+        print(f'Memória antes da compactação: {memoria_antes:.2f} MB')
+        print(f'Memória depois da compactação: {memoria_depois:.2f} MB')
+
+    return df_compacto
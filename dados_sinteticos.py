@@ -0,0 +1,104 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dados_isp import carregar_ocorrencias, indicadores
+
+# Bases sintéticas com o mesmo layout da base do ISP, para testar desempenho
+# sem depender do download (ex.: a base 100x usada nos benchmarks).
+
+MUNICIPIOS = ['Rio de Janeiro', 'Niterói', 'São Gonçalo', 'Duque de Caxias',
+              'Nova Iguaçu', 'Belford Roxo', 'São João de Meriti', 'Petrópolis',
+              'Volta Redonda', 'Campos dos Goytacazes', 'Macaé', 'Cabo Frio']
+
+INDICADORES_SINTETICOS = ['hom_doloso', 'lesao_corp_morte', 'latrocinio', 'cvli',
+                          'lesao_corp_dolosa', 'estupro', 'roubo_transeunte',
+                          'roubo_celular', 'roubo_veiculo', 'furto_veiculos',
+                          'estelionato', 'recuperacao_veiculos', 'registro_ocorrencias']
+
+
+# base gerada do zero: cada cisp tem uma intensidade própria (distribuição assimétrica,
+# como na base real), tendência ao longo dos anos e sazonalidade mensal
+def gerar_ocorrencias(n_cisp=140, anos=range(2003, 2025), semente=0):
+    rng = np.random.default_rng(semente)
+    anos = np.asarray(list(anos))
+
+    cisp = np.repeat(np.arange(1, n_cisp + 1), len(anos) * 12)
+    ano = np.tile(np.repeat(anos, 12), n_cisp)
+    mes = np.tile(np.arange(1, 13), n_cisp * len(anos))
+
+    municipios = np.array(MUNICIPIOS)
+    munic = municipios[np.minimum(rng.geometric(0.35, n_cisp) - 1, len(MUNICIPIOS) - 1)]
+
+    colunas = {
+        'cisp': cisp,
+        'mes': mes,
+        'ano': ano,
+        'mes_ano': [f'{a}m{m:02d}' for a, m in zip(ano, mes)],
+        'aisp': (cisp - 1) // 3 + 1,
+        'risp': (cisp - 1) // 20 + 1,
+        'munic': munic[cisp - 1],
+        'mcirc': munic[cisp - 1],
+        'regiao': np.where(munic[cisp - 1] == 'Rio de Janeiro', 'Capital', 'Interior'),
+    }
+
+    intensidade = rng.lognormal(mean=1.5, sigma=1.0, size=n_cisp)[cisp - 1]
+    tendencia = 1 + 0.03 * (ano - anos[0])
+    sazonalidade = 1 + 0.1 * np.sin(2 * np.pi * mes / 12)
+
+    for posicao, indicador in enumerate(INDICADORES_SINTETICOS):
+        peso = rng.uniform(0.05, 3.0)
+        colunas[indicador] = rng.poisson(intensidade * peso * tendencia * sazonalidade)
+
+    colunas['fase'] = np.full(len(cisp), 3)
+
+    return pd.DataFrame(colunas)
+
+
+# amplia uma base (real ou sintética) fator vezes: cada cópia recebe novos números
+# de cisp e contagens sorteadas (Poisson) em torno dos valores originais
+def ampliar_ocorrencias(df, fator=100, semente=0):
+    rng = np.random.default_rng(semente)
+    lista_indicadores = indicadores(df)
+    # int64 antes de somar o deslocamento: numa base compactada (cisp em int8/int16)
+    # os números das cópias estourariam o tipo sem aviso
+    cisp = df['cisp'].to_numpy(dtype=np.int64)
+    deslocamento = int(cisp.max()) + 1
+
+    copias = []
+    for copia in range(fator):
+        df_copia = df.copy()
+        df_copia['cisp'] = cisp + copia * deslocamento
+        if copia > 0:
+            for indicador in lista_indicadores:
+                valores = df_copia[indicador].to_numpy(dtype=float, na_value=np.nan)
+                sorteio = rng.poisson(np.nan_to_num(valores))
+                if np.isnan(valores).any():
+                    sorteio = np.where(np.isnan(valores), np.nan, sorteio)
+                df_copia[indicador] = sorteio
+        copias.append(df_copia)
+
+    return pd.concat(copias, ignore_index=True)
+
+
+if __name__ == '__main__':
+    # uso: python dados_sinteticos.py saida.csv [fator] [endereco_base]
+    try:
+        print('Gerando base sintética...')
+
+        fator = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+        if len(sys.argv) > 3:
+            df_base = carregar_ocorrencias(sys.argv[3])
+        else:
+            df_base = gerar_ocorrencias()
+
+        df_sintetico = ampliar_ocorrencias(df_base, fator)
+        df_sintetico.to_csv(sys.argv[1], sep=';', index=False, encoding='iso-8859-1')
+
+        print(f'Base sintética gerada com {len(df_sintetico)} linhas!')
+
+    except Exception as e:
+        print(f'Erro ao gerar base sintética: {e}')
+        exit()
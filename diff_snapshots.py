@@ -0,0 +1,231 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dados_isp import CHAVE, NIVEIS, carregar_ocorrencias, indicadores
+from medidas import calcular_medidas, outliers_iqr
+
+# O ISP republica o CSV inteiro e às vezes revisa meses passados.
+# Este módulo compara dois snapshots da base pela chave (cisp, mes_ano) e
+# recalcula somente os totais, medidas e outliers afetados pelas linhas
+# adicionadas, removidas ou revisadas. O resultado é um changeset com as
+# estatísticas publicadas que mudaram e o cubo de totais do snapshot novo.
+#
+# O cubo (totais de cada indicador e quantidade de linhas por grupo, em cada nível)
+# é guardado junto com a publicação e passado como cubo_antigo no próximo diff:
+# assim só as linhas alteradas são agregadas, e o snapshot antigo inteiro não é
+# percorrido de novo. Sem ele, o cubo antigo é calculado uma vez por nível.
+
+COLUNAS_CHANGESET = ['tipo', 'nivel', 'indicador', 'grupo', 'medida',
+                     'valor_antigo', 'valor_novo']
+
+# coluna do cubo com a quantidade de linhas de cada grupo
+LINHAS = 'linhas'
+
+
+# hash de cada linha (todas as colunas menos a chave), indexado por (cisp, mes_ano)
+def hash_linhas(df, colunas):
+    df_indexado = df.set_index(CHAVE)
+    if df_indexado.index.has_duplicates:
+        raise ValueError('Snapshot com chaves (cisp, mes_ano) duplicadas')
+    return pd.util.hash_pandas_object(df_indexado[colunas], index=False)
+
+
+# chaves adicionadas, removidas e revisadas entre os dois snapshots
+def comparar_snapshots(df_antigo, df_novo):
+    colunas = sorted((set(df_antigo.columns) & set(df_novo.columns)) - set(CHAVE))
+
+    hash_antigo = hash_linhas(df_antigo, colunas)
+    hash_novo = hash_linhas(df_novo, colunas)
+
+    comuns = hash_antigo.index.intersection(hash_novo.index)
+    diferentes = hash_antigo.loc[comuns].to_numpy() != hash_novo.loc[comuns].to_numpy()
+
+    return {
+        'adicionadas': hash_novo.index.difference(hash_antigo.index),
+        'removidas': hash_antigo.index.difference(hash_novo.index),
+        'revisadas': comuns[diferentes],
+    }
+
+
+# indicadores cujo valor mudou em alguma linha revisada
+def indicadores_revisados(antigas, novas, lista_indicadores):
+    diferentes = antigas[lista_indicadores].ne(novas[lista_indicadores])
+    # nan != nan conta como diferença no pandas; desconsiderar quando os dois são nan
+    diferentes &= ~(antigas[lista_indicadores].isna() & novas[lista_indicadores].isna())
+    return [indicador for indicador in lista_indicadores if diferentes[indicador].any()]
+
+
+def _mudou(antigo, novo):
+    if pd.isna(antigo) and pd.isna(novo):
+        return False
+    if pd.isna(antigo) or pd.isna(novo):
+        return True
+    return not np.isclose(antigo, novo, rtol=1e-12, atol=0)
+
+
+def _linhas_changeset(nivel, indicador, totais_antigos, totais_novos, grupos_tocados,
+                      multiplicador, metodo_quantil):
+    linhas = []
+
+    # totais dos grupos tocados
+    for grupo in grupos_tocados:
+        antigo = totais_antigos.get(grupo, np.nan)
+        novo = totais_novos.get(grupo, np.nan)
+        if _mudou(antigo, novo):
+            linhas.append(('agregado', nivel, indicador, grupo, 'total', antigo, novo))
+
+    # medidas descritivas da distribuição dos totais
+    medidas_antigas = calcular_medidas(totais_antigos, multiplicador, metodo_quantil)
+    medidas_novas = calcular_medidas(totais_novos, multiplicador, metodo_quantil)
+    for medida, antigo in medidas_antigas.items():
+        novo = medidas_novas[medida]
+        if _mudou(antigo, novo):
+            linhas.append(('medida', nivel, indicador, None, medida, antigo, novo))
+
+    # pertencimento aos outliers inferiores e superiores
+    inferiores_antigos, superiores_antigos = outliers_iqr(totais_antigos, medidas_antigas)
+    inferiores_novos, superiores_novos = outliers_iqr(totais_novos, medidas_novas)
+    for medida, mascara_antiga, mascara_nova in (
+            ('outlier_inferior', inferiores_antigos, inferiores_novos),
+            ('outlier_superior', superiores_antigos, superiores_novos)):
+        antigos = set(totais_antigos.index[mascara_antiga])
+        novos = set(totais_novos.index[mascara_nova])
+        for grupo in sorted(antigos ^ novos, key=str):
+            linhas.append(('outlier', nivel, indicador, grupo, medida,
+                           grupo in antigos, grupo in novos))
+
+    return linhas
+
+
+# cubo de totais: {nivel: DataFrame (grupo x indicadores) com a quantidade de
+# linhas de cada grupo na coluna LINHAS}
+def cubo_totais(df, niveis=NIVEIS, lista_indicadores=None):
+    if lista_indicadores is None:
+        lista_indicadores = indicadores(df)
+
+    cubo = {}
+    for nivel in niveis:
+        grupos = df.groupby(nivel, observed=True)
+        cubo[nivel] = grupos[lista_indicadores].sum()
+        cubo[nivel][LINHAS] = grupos.size()
+    return cubo
+
+
+# changeset das estatísticas publicadas que mudaram entre os dois snapshots e o cubo
+# de totais do snapshot novo (para o próximo diff)
+# cubo_antigo (opcional): cubo_totais do snapshot antigo, guardado na publicação
+# anterior; níveis ou indicadores que faltarem nele são calculados do snapshot antigo
+def diff_estatisticas(df_antigo, df_novo, niveis=NIVEIS, lista_indicadores=None,
+                      multiplicador=1.5, metodo_quantil='weibull', cubo_antigo=None):
+    if lista_indicadores is None:
+        lista_indicadores = [indicador for indicador in indicadores(df_novo)
+                             if indicador in df_antigo.columns]
+
+    cubo_antigo = dict(cubo_antigo or {})
+    for nivel in niveis:
+        colunas = lista_indicadores + [LINHAS]
+        if nivel not in cubo_antigo or not set(colunas) <= set(cubo_antigo[nivel].columns):
+            cubo_antigo[nivel] = cubo_totais(df_antigo, [nivel], lista_indicadores)[nivel]
+        cubo_antigo[nivel] = cubo_antigo[nivel][colunas]
+
+    alteracoes = comparar_snapshots(df_antigo, df_novo)
+
+    antigo_indexado = df_antigo.set_index(CHAVE)
+    novo_indexado = df_novo.set_index(CHAVE)
+
+    revisadas_antigas = antigo_indexado.loc[alteracoes['revisadas']]
+    revisadas_novas = novo_indexado.loc[alteracoes['revisadas']]
+
+    # somente as linhas alteradas entram no cálculo das diferenças
+    # a versão antiga é subtraída e a nova é somada
+    linhas_antigas = antigo_indexado.loc[alteracoes['removidas'].append(alteracoes['revisadas'])]
+    linhas_novas = novo_indexado.loc[alteracoes['adicionadas'].append(alteracoes['revisadas'])]
+
+    houve_inclusao_exclusao = len(alteracoes['adicionadas']) > 0 or len(alteracoes['removidas']) > 0
+    revisados = indicadores_revisados(revisadas_antigas, revisadas_novas, lista_indicadores)
+
+    linhas = []
+    cubo_novo = {}
+    for nivel in niveis:
+        # linha que mudou de grupo (ex.: cisp reatribuída a outra aisp) afeta todos os indicadores
+        grupo_mudou = nivel != 'cisp' and \
+            revisadas_antigas[nivel].ne(revisadas_novas[nivel]).any()
+
+        if houve_inclusao_exclusao or grupo_mudou:
+            tocados = lista_indicadores
+        else:
+            tocados = revisados
+
+        if len(tocados) == 0:
+            cubo_novo[nivel] = cubo_antigo[nivel]
+            continue
+
+        if nivel == 'cisp':
+            chave_antiga = linhas_antigas.index.get_level_values('cisp')
+            chave_nova = linhas_novas.index.get_level_values('cisp')
+        else:
+            chave_antiga = linhas_antigas[nivel]
+            chave_nova = linhas_novas[nivel]
+
+        # diferença de totais e de quantidade de linhas por grupo
+        delta = linhas_novas[tocados].groupby(chave_nova, observed=True).sum().sub(
+            linhas_antigas[tocados].groupby(chave_antiga, observed=True).sum(), fill_value=0)
+        delta_linhas = linhas_novas.groupby(chave_nova, observed=True).size().sub(
+            linhas_antigas.groupby(chave_antiga, observed=True).size(), fill_value=0)
+        delta[LINHAS] = delta_linhas
+
+        # cubo novo = antigo + diferenças, sem os grupos que ficaram sem linhas
+        df_cubo = cubo_antigo[nivel].add(delta.reindex(columns=cubo_antigo[nivel].columns,
+                                                       fill_value=0), fill_value=0)
+        cubo_novo[nivel] = df_cubo = df_cubo[df_cubo[LINHAS] > 0]
+
+        for indicador in tocados:
+            grupos_tocados = delta.index[delta[indicador] != 0].union(
+                delta_linhas.index[delta_linhas != 0])
+
+            linhas += _linhas_changeset(nivel, indicador, cubo_antigo[nivel][indicador],
+                                        df_cubo[indicador], grupos_tocados, multiplicador,
+                                        metodo_quantil)
+
+    return pd.DataFrame(linhas, columns=COLUNAS_CHANGESET), cubo_novo
+
+
+
+if __name__ == '__main__':
+    # uso: python diff_snapshots.py snapshot_antigo.csv snapshot_novo.csv [changeset.csv]
+    try:
+        print('Obtendo snapshots...')
+
+        df_antigo = carregar_ocorrencias(sys.argv[1])
+        df_novo = carregar_ocorrencias(sys.argv[2])
+
+        alteracoes = comparar_snapshots(df_antigo, df_novo)
+
+        print(f'Linhas adicionadas: {len(alteracoes["adicionadas"])}')
+        print(f'Linhas removidas: {len(alteracoes["removidas"])}')
+        print(f'Linhas revisadas: {len(alteracoes["revisadas"])}')
+
+    except Exception as e:
+        print(f'Erro ao obter snapshots: {e}')
+        exit()
+
+    try:
+        print('Calculando estatísticas alteradas...')
+
+        df_changeset, _ = diff_estatisticas(df_antigo, df_novo)
+
+        print('\nEstatísticas alteradas: ')
+        print(30*'-')
+        if len(df_changeset) == 0:
+            print('Nenhuma estatística publicada mudou!')
+        else:
+            print(df_changeset.groupby(['tipo', 'nivel']).size())
+
+        if len(sys.argv) > 3:
+            df_changeset.to_csv(sys.argv[3], sep=';', index=False, encoding='iso-8859-1')
+
+    except Exception as e:
+        print(f'Erro ao calcular estatísticas alteradas: {e}')
+        exit()
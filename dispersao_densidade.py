@@ -0,0 +1,66 @@
+import numpy as np
+
+# Gráfico de correlação agregado em uma grade de densidade.
+# Em vez de um marcador por ponto (plt.scatter), os pontos são contados em uma
+# grade de resolucao x resolucao células com numpy e a grade é desenhada como
+# imagem. O custo de desenhar não depende da quantidade de pontos, e a
+# correlação de pearson sai das mesmas somas calculadas na passagem pelos dados.
+# grade_densidade usa só numpy; o matplotlib é importado apenas para desenhar.
+
+
+# grade de contagens, limites dos eixos e correlação de pearson
+def grade_densidade(x, y, resolucao=200):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    validos = ~(np.isnan(x) | np.isnan(y))
+    x = x[validos]
+    y = y[validos]
+    n = len(x)
+    if n == 0:
+        raise ValueError('Nenhum par de valores válido para o gráfico')
+
+    x_min, x_max = x.min(), x.max()
+    y_min, y_max = y.min(), y.max()
+    # evita divisão por zero quando todos os valores são iguais
+    largura_x = (x_max - x_min) or 1.0
+    largura_y = (y_max - y_min) or 1.0
+
+    coluna = np.minimum(((x - x_min) / largura_x * resolucao).astype(np.int64), resolucao - 1)
+    linha = np.minimum(((y - y_min) / largura_y * resolucao).astype(np.int64), resolucao - 1)
+    grade = np.bincount(linha * resolucao + coluna, minlength=resolucao * resolucao) \
+        .reshape(resolucao, resolucao)
+
+    # pearson a partir das somas (centralizadas para reduzir erro numérico)
+    dx = x - x.mean()
+    dy = y - y.mean()
+    soma_xx = np.dot(dx, dx)
+    soma_yy = np.dot(dy, dy)
+    soma_xy = np.dot(dx, dy)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlacao = soma_xy / np.sqrt(soma_xx * soma_yy)
+
+    limites = (x_min, x_min + largura_x, y_min, y_min + largura_y)
+    return grade, limites, correlacao
+
+
+# desenha a grade (escala logarítmica nas contagens) e retorna a correlação
+def plotar_densidade(x, y, resolucao=200, xlabel='', ylabel='', eixo=None):
+    import matplotlib.pyplot as plt
+
+    grade, limites, correlacao = grade_densidade(x, y, resolucao)
+
+    if eixo is None:
+        eixo = plt.gca()
+
+    # células vazias ficam transparentes
+    grade_exibida = np.ma.masked_equal(grade, 0)
+    imagem = eixo.imshow(np.ma.log10(grade_exibida), origin='lower', extent=limites,
+                         aspect='auto', interpolation='nearest', cmap='viridis')
+    plt.colorbar(imagem, ax=eixo, label='log10(quantidade de pontos)')
+
+    eixo.set_title(f'Correlação: {correlacao}')
+    eixo.set_xlabel(xlabel)
+    eixo.set_ylabel(ylabel)
+
+    return correlacao
@@ -0,0 +1,186 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dados_isp import carregar_ocorrencias, compactar_ocorrencias, endereco_da_linha_de_comando, \
+    indicadores
+
+# Enriquecimento do cubo agregado com tabelas auxiliares (população por
+# município/ano, outras bases do ISP) e cálculo de taxas por 100 mil habitantes.
+# Os totais brutos por munic favorecem os municípios mais populosos (o Rio de
+# Janeiro sempre lidera o ranking de roubo_veiculo do exemplo01).
+#
+# A junção é um hash join: o índice de hash sobre as chaves da tabela auxiliar é
+# construído uma vez (construir_indice) e reaproveitado para cada cubo do mesmo
+# snapshot; as taxas de todos os indicadores são calculadas de uma vez com numpy.
+#
+# tabela de população: colunas <nivel> (ex.: munic), ano e populacao
+# Com a tabela em outro nível, a população de cada grupo é a soma das unidades da
+# tabela que aparecem nas linhas do grupo no mesmo ano. Isso só é a população do
+# grupo quando o grupo contém unidades inteiras: uma região ou um mes_ano com uma
+# tabela por munic, um munic ou uma aisp com uma tabela por cisp. Um cisp ou uma
+# aisp com uma tabela por munic receberia a população do município inteiro (o Rio
+# de Janeiro tem dezenas de cisps); nesse caso a taxa exige uma tabela de população
+# no próprio nível (ou mais fino).
+
+POR_HABITANTES = 100000
+
+
+# índice de hash sobre as chaves da tabela auxiliar + colunas de valores
+def construir_indice(df_auxiliar, chaves, colunas=None):
+    faltantes = [chave for chave in chaves if chave not in df_auxiliar.columns]
+    if faltantes:
+        raise ValueError(f'Tabela auxiliar sem as colunas de junção {faltantes}')
+    if colunas is None:
+        colunas = [coluna for coluna in df_auxiliar.columns if coluna not in chaves]
+
+    indice = pd.MultiIndex.from_frame(df_auxiliar[chaves].astype(object))
+    if indice.has_duplicates:
+        raise ValueError(f'Tabela auxiliar com chaves {chaves} duplicadas')
+
+    return {
+        'chaves': list(chaves),
+        'indice': indice,
+        'valores': {coluna: df_auxiliar[coluna].to_numpy() for coluna in colunas},
+    }
+
+
+# hash join: acrescenta ao df as colunas da tabela auxiliar (nan quando não há par)
+def juntar(df, indice):
+    consulta = pd.MultiIndex.from_frame(df[indice['chaves']].astype(object))
+    posicoes = indice['indice'].get_indexer(consulta)
+    encontrados = posicoes >= 0
+
+    df_enriquecido = df.copy()
+    for coluna, valores in indice['valores'].items():
+        resultado = np.full(len(df), np.nan)
+        resultado[encontrados] = valores[posicoes[encontrados]]
+        df_enriquecido[coluna] = resultado
+    return df_enriquecido
+
+
+# nível da tabela de população: a coluna de chave além de ano (ex.: munic)
+def nivel_populacao(df_populacao):
+    chaves = [coluna for coluna in df_populacao.columns if coluna not in ('ano', 'populacao')]
+    if 'ano' not in df_populacao.columns or 'populacao' not in df_populacao.columns \
+            or len(chaves) != 1:
+        raise ValueError('Tabela de população deve ter as colunas <nivel>, ano e populacao')
+    return chaves[0]
+
+
+# índice de hash da tabela de população sobre (<nivel da tabela>, ano)
+def construir_indice_populacao(df_populacao):
+    return construir_indice(df_populacao, [nivel_populacao(df_populacao), 'ano'], ['populacao'])
+
+
+# população de cada (nivel, ano) da base, com a tabela de população em outro nível
+# cada unidade da tabela, em cada mês, deve cair em um só grupo do nível
+# grupo com alguma unidade da tabela sem população no ano fica com nan
+def populacao_anual(df, indice_populacao, nivel):
+    chave = indice_populacao['chaves'][0]
+    if chave not in df.columns:
+        raise ValueError(f'População por {chave} não se aplica ao nível {nivel}: '
+                         f'a base não tem a coluna {chave}')
+
+    tempo = 'mes_ano' if 'mes_ano' in df.columns else 'ano'
+    colunas = list(dict.fromkeys([chave, tempo, 'ano', nivel]))
+    unidades = df[colunas].drop_duplicates()
+    if unidades.duplicated([chave, tempo]).any():
+        raise ValueError(f'População por {chave} não se aplica ao nível {nivel}: há {chave} '
+                         f'dividido entre grupos de {nivel}; use uma tabela de população '
+                         f'por {nivel}')
+
+    pares = juntar(unidades[[nivel, chave, 'ano']].drop_duplicates(), indice_populacao)
+    grupos = pares.groupby([nivel, 'ano'], observed=True)['populacao']
+    return grupos.sum().where(grupos.count() == grupos.size()).reset_index()
+
+
+# cubo (nivel, ano) com os totais de todos os indicadores e a população
+def _cubo_populacao(df, indice_populacao, nivel, lista_indicadores):
+    df_cubo = cubo_anual(df, nivel, lista_indicadores)
+    if indice_populacao['chaves'][0] == nivel:
+        return juntar(df_cubo, indice_populacao)
+
+    df_populacao = populacao_anual(df, indice_populacao, nivel)
+    return juntar(df_cubo, construir_indice(df_populacao, [nivel, 'ano'], ['populacao']))
+
+
+# cubo (nivel, ano) com os totais de todos os indicadores
+def cubo_anual(df, nivel, lista_indicadores=None):
+    if lista_indicadores is None:
+        lista_indicadores = indicadores(df)
+    return df.groupby([nivel, 'ano'], observed=True)[lista_indicadores].sum().reset_index()
+
+
+# cubo anual enriquecido com a população e as taxas por 100 mil de todos os indicadores
+def taxas_anuais(df, indice_populacao, nivel, lista_indicadores=None):
+    if lista_indicadores is None:
+        lista_indicadores = indicadores(df)
+
+    df_cubo = _cubo_populacao(df, indice_populacao, nivel, lista_indicadores)
+    populacao = df_cubo['populacao'].to_numpy(dtype=float)
+
+    contagens = df_cubo[lista_indicadores].to_numpy(dtype=float, na_value=np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        taxas = contagens / populacao[:, np.newaxis] * POR_HABITANTES
+
+    df_taxas = pd.DataFrame(taxas, columns=[f'taxa_{indicador}' for indicador in lista_indicadores],
+                            index=df_cubo.index)
+    return pd.concat([df_cubo, df_taxas], axis=1)
+
+
+# taxa por 100 mil de cada indicador no período inteiro, por grupo:
+# soma das ocorrências / soma da população dos anos (taxa anual média)
+# linhas sem população correspondente ficam fora da soma
+def taxas_periodo(df, indice_populacao, nivel, lista_indicadores=None):
+    if lista_indicadores is None:
+        lista_indicadores = indicadores(df)
+
+    df_cubo = _cubo_populacao(df, indice_populacao, nivel, lista_indicadores)
+    df_cubo = df_cubo[df_cubo['populacao'].notna()]
+    if len(df_cubo) == 0:
+        raise ValueError(f'Nenhum {nivel}/ano da base tem população correspondente')
+
+    df_somas = df_cubo.groupby([nivel], observed=True)[lista_indicadores + ['populacao']].sum()
+    taxas = df_somas[lista_indicadores].to_numpy(dtype=float, na_value=np.nan) \
+        / df_somas['populacao'].to_numpy(dtype=float)[:, np.newaxis] * POR_HABITANTES
+
+    return pd.DataFrame(taxas, index=df_somas.index, columns=lista_indicadores).reset_index()
+
+
+def carregar_populacao(endereco):
+    return pd.read_csv(endereco, sep=';', encoding='iso-8859-1')
+
+
+if __name__ == '__main__':
+    # uso: python enriquecimento.py populacao.csv [nivel] [endereco]
+    # populacao.csv: colunas <nivel da tabela>;ano;populacao (ex.: munic;ano;populacao)
+    nivel = sys.argv[2] if len(sys.argv) > 2 else 'munic'
+
+    try:
+        print('Obtendo dados...')
+
+        df_ocorrencias = carregar_ocorrencias(endereco_da_linha_de_comando(3))
+        df_ocorrencias = compactar_ocorrencias(df_ocorrencias)
+
+        indice = construir_indice_populacao(carregar_populacao(sys.argv[1]))
+
+        print('Dados obtidos com sucesso!')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print('Calculando taxas por 100 mil habitantes...')
+
+        df_taxas = taxas_periodo(df_ocorrencias, indice, nivel, ['roubo_veiculo'])
+
+        print(f'\nRoubo de veículos por 100 mil habitantes (por {nivel}): ')
+        print(30*'-')
+        print(df_taxas.sort_values(by='roubo_veiculo', ascending=False).head(10))
+
+    except Exception as e:
+        print(f'Erro ao calcular taxas: {e}')
+        exit()
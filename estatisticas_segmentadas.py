@@ -0,0 +1,197 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dados_isp import carregar_ocorrencias, compactar_ocorrencias, endereco_da_linha_de_comando, \
+    indicadores
+
+# Perfil da distribuição dentro de cada grupo (ex.: mediana, Q1/Q3, desvio e
+# assimetria do roubo_veiculo mensal de cada município, ou de cada ano), para
+# todos os grupos e indicadores de uma vez, sem groupby().apply.
+#
+# Para cada indicador os valores são ordenados uma única vez por (grupo, valor):
+# cada grupo vira um segmento contíguo do array ordenado, e os quantis saem de
+# aritmética de deslocamentos (início do segmento + posição do quantil dentro
+# dele). Médias e momentos centrais saem de np.bincount pelos códigos dos grupos.
+#
+# As medidas são as mesmas de medidas.calcular_medidas (quartis weibull,
+# variância populacional, assimetria e curtose com a correção do pandas).
+
+# posição virtual do quantil p em um segmento de n valores (base 0), como no numpy
+POSICOES_QUANTIL = {
+    'weibull': lambda p, n: p * (n + 1) - 1,
+    'linear': lambda p, n: p * (n - 1),
+}
+
+
+# quantil p de cada segmento do array ordenado
+# inicio: posição do primeiro valor de cada segmento; n: quantidade de valores válidos
+def _quantil_segmentos(ordenados, inicio, n, p, metodo_quantil):
+    with np.errstate(invalid='ignore'):
+        posicao = np.clip(POSICOES_QUANTIL[metodo_quantil](p, n), 0, np.maximum(n - 1, 0))
+    abaixo = np.floor(posicao).astype(np.int64)
+    acima = np.minimum(abaixo + 1, np.maximum(n - 1, 0))
+    fracao = posicao - abaixo
+
+    vazios = n == 0
+    indice_abaixo = np.where(vazios, 0, inicio + abaixo)
+    indice_acima = np.where(vazios, 0, inicio + acima)
+    valor_abaixo = ordenados[indice_abaixo]
+    valor_acima = ordenados[indice_acima]
+
+    # mesma interpolação do numpy (evita 0 * inf quando os vizinhos são iguais)
+    quantil = np.where(fracao == 0, valor_abaixo,
+                       valor_abaixo + fracao * (valor_acima - valor_abaixo))
+    return np.where(vazios, np.nan, quantil)
+
+
+# medidas de cada segmento para uma coluna de valores
+def _medidas_coluna(codigos, valores, n_grupos, multiplicador, metodo_quantil):
+    validos = ~np.isnan(valores)
+
+    # ordena uma vez por (grupo, valor); nan fica no fim de cada segmento
+    ordem = np.lexsort((valores, codigos))
+    ordenados = valores[ordem]
+    tamanho_segmento = np.bincount(codigos, minlength=n_grupos)
+    inicio = np.concatenate([[0], np.cumsum(tamanho_segmento)[:-1]])
+    n = np.bincount(codigos[validos], minlength=n_grupos)
+
+    q1 = _quantil_segmentos(ordenados, inicio, n, 0.25, metodo_quantil)
+    mediana = _quantil_segmentos(ordenados, inicio, n, 0.5, metodo_quantil)
+    q3 = _quantil_segmentos(ordenados, inicio, n, 0.75, metodo_quantil)
+    vazios = n == 0
+    minimo = np.where(vazios, np.nan, ordenados[np.where(vazios, 0, inicio)])
+    maximo = np.where(vazios, np.nan, ordenados[np.where(vazios, 0, inicio + n - 1)])
+
+    codigos_validos = codigos[validos]
+    x = valores[validos]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media = np.bincount(codigos_validos, weights=x, minlength=n_grupos) / n
+        desvios = x - media[codigos_validos]
+        m2 = np.bincount(codigos_validos, weights=desvios**2, minlength=n_grupos) / n
+        m3 = np.bincount(codigos_validos, weights=desvios**3, minlength=n_grupos) / n
+        m4 = np.bincount(codigos_validos, weights=desvios**4, minlength=n_grupos) / n
+
+        assimetria = np.where((n < 3) | (m2 == 0), np.nan,
+                              np.sqrt(n * (n - 1)) / (n - 2) * m3 / m2**1.5)
+        curtose = np.where((n < 4) | (m2 == 0), np.nan,
+                           ((n + 1) * (m4 / m2**2 - 3) + 6) * (n - 1) / ((n - 2) * (n - 3)))
+
+        iqr = q3 - q1
+        limite_inferior = q1 - (multiplicador * iqr)
+        limite_superior = q3 + (multiplicador * iqr)
+        desvio_padrao = np.sqrt(m2)
+
+        medidas = {
+            'n': n,
+            'media': media,
+            'mediana': mediana,
+            'distancia': np.abs((media - mediana) / mediana),
+            'minimo': minimo,
+            'maximo': maximo,
+            'amplitude': maximo - minimo,
+            'q1': q1,
+            'q3': q3,
+            'iqr': iqr,
+            'limite_inferior': limite_inferior,
+            'limite_superior': limite_superior,
+            'variancia': m2,
+            'distancia_var_media': m2 / media**2,
+            'desvio_padrao': desvio_padrao,
+            'coef_variacao': desvio_padrao / media,
+            'assimetria': assimetria,
+            'curtose': curtose,
+        }
+
+    # quantidade de valores fora dos limites em cada segmento
+    medidas['outliers_inferiores'] = np.bincount(
+        codigos_validos, weights=x < limite_inferior[codigos_validos],
+        minlength=n_grupos).astype(np.int64)
+    medidas['outliers_superiores'] = np.bincount(
+        codigos_validos, weights=x > limite_superior[codigos_validos],
+        minlength=n_grupos).astype(np.int64)
+    return medidas
+
+
+# medidas de cada grupo para cada coluna de uma matriz (linhas x indicadores)
+# codigos: grupo de cada linha (0..n_grupos-1)
+# retorna {medida: array (grupos x indicadores)}
+def medidas_segmentadas(codigos, matriz, n_grupos=None, multiplicador=1.5,
+                        metodo_quantil='weibull'):
+    if metodo_quantil not in POSICOES_QUANTIL:
+        raise ValueError(f'Método de quantil não suportado: {metodo_quantil}. '
+                         f'Opções: {", ".join(POSICOES_QUANTIL)}')
+    codigos = np.asarray(codigos, dtype=np.int64)
+    matriz = np.asarray(matriz, dtype=float)
+    if matriz.ndim == 1:
+        matriz = matriz[:, np.newaxis]
+    if n_grupos is None:
+        n_grupos = int(codigos.max()) + 1 if len(codigos) else 0
+
+    colunas = [_medidas_coluna(codigos, matriz[:, j], n_grupos, multiplicador, metodo_quantil)
+               for j in range(matriz.shape[1])]
+    return {medida: np.column_stack([coluna[medida] for coluna in colunas])
+            for medida in colunas[0]}
+
+
+# perfil dentro de cada grupo: os valores de cada grupo são os totais por unidade
+# (padrão: por mês) e cada linha do resultado é um par (grupo, indicador)
+# ex.: perfil_por_grupo(df, 'munic', ['roubo_veiculo']) -> roubo_veiculo mensal de cada munic
+#      perfil_por_grupo(df, 'ano', ['roubo_veiculo']) -> roubo_veiculo mensal do estado em cada ano
+def perfil_por_grupo(df, nivel, lista_indicadores=None, unidade=('ano', 'mes'),
+                     multiplicador=1.5, metodo_quantil='weibull'):
+    if lista_indicadores is None:
+        lista_indicadores = indicadores(df)
+
+    chaves = [nivel] + [coluna for coluna in unidade if coluna != nivel]
+    # min_count=1: unidade sem nenhum valor continua nan (e fica fora do perfil)
+    df_totais = df.groupby(chaves, observed=True)[lista_indicadores].sum(min_count=1)
+
+    codigos, grupos = pd.factorize(df_totais.index.get_level_values(nivel), sort=True)
+    matriz = df_totais.to_numpy(dtype=float, na_value=np.nan)
+    medidas = medidas_segmentadas(codigos, matriz, len(grupos), multiplicador, metodo_quantil)
+
+    # linhas na ordem (grupo, indicador)
+    n_indicadores = len(lista_indicadores)
+    df_perfil = pd.DataFrame({
+        nivel: np.repeat(np.asarray(grupos), n_indicadores),
+        'indicador': np.tile(np.asarray(lista_indicadores, dtype=object), len(grupos)),
+    })
+    for medida, valores in medidas.items():
+        df_perfil[medida] = valores.ravel()
+    return df_perfil
+
+
+if __name__ == '__main__':
+    # uso: python estatisticas_segmentadas.py [nivel] [indicador] [endereco]
+    nivel = sys.argv[1] if len(sys.argv) > 1 else 'munic'
+    indicador = sys.argv[2] if len(sys.argv) > 2 else 'roubo_veiculo'
+
+    try:
+        print('Obtendo dados...')
+
+        df_ocorrencias = carregar_ocorrencias(endereco_da_linha_de_comando(3))
+        df_ocorrencias = compactar_ocorrencias(df_ocorrencias)
+
+        print('Dados obtidos com sucesso!')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print('Calculando perfis por grupo...')
+
+        df_perfil = perfil_por_grupo(df_ocorrencias, nivel, [indicador])
+
+        print(f'\nDistribuição mensal de {indicador} por {nivel}: ')
+        print(30*'-')
+        colunas = [nivel, 'n', 'mediana', 'q1', 'q3', 'desvio_padrao', 'assimetria',
+                   'outliers_superiores']
+        print(df_perfil.sort_values(by='mediana', ascending=False)[colunas].head(20)
+              .to_string(index=False))
+
+    except Exception as e:
+        print(f'Erro ao calcular perfis: {e}')
+        exit()
@@ -0,0 +1,132 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from instrumentacao import contar, cronometrar
+
+# Executor de etapas declaradas como um grafo acíclico (DAG).
+# Cada etapa tem um nome, uma função e a lista de etapas das quais depende;
+# a função recebe os resultados das dependências na ordem declarada.
+# O nome identifica o resultado: declarar duas vezes a mesma etapa não duplica
+# o cálculo, e cada etapa roda uma única vez por execução. Etapas sem
+# dependência entre si rodam ao mesmo tempo em threads.
+# Uma etapa que falha não interrompe as outras: só as etapas que dependem dela
+# deixam de rodar.
+
+
+# valores capturados por uma função (padrões dos parâmetros e variáveis do closure)
+def _capturados(funcao):
+    padroes = tuple(getattr(funcao, '__defaults__', None) or ())
+    closure = tuple(celula.cell_contents for celula in getattr(funcao, '__closure__', None) or ())
+    return padroes + closure
+
+
+def _mesmo_valor(a, b):
+    if a is b:
+        return True
+    if isinstance(a, (str, int, float, tuple)) and type(a) is type(b):
+        return a == b
+    return False
+
+
+# mesma função: o mesmo objeto, ou o mesmo código (ex.: lambda declarada no mesmo
+# ponto do programa) capturando os mesmos valores
+def _mesma_funcao(a, b):
+    if a is b:
+        return True
+    codigo = getattr(a, '__code__', None)
+    if codigo is None or codigo is not getattr(b, '__code__', None):
+        return False
+    capturados_a, capturados_b = _capturados(a), _capturados(b)
+    return len(capturados_a) == len(capturados_b) \
+        and all(map(_mesmo_valor, capturados_a, capturados_b))
+
+
+# etapas: {nome: (funcao, dependencias)}
+# se a etapa já existe com a mesma função e as mesmas dependências, a declaração
+# anterior é reaproveitada (memoização pelo nome); com outra função ou outras
+# dependências o nome estaria ligado a dois resultados diferentes, e é um erro
+def adicionar_etapa(etapas, nome, funcao, dependencias=()):
+    dependencias = tuple(dependencias)
+    if nome not in etapas:
+        etapas[nome] = (funcao, dependencias)
+        return nome
+
+    funcao_existente, dependencias_existentes = etapas[nome]
+    if dependencias != dependencias_existentes or not _mesma_funcao(funcao, funcao_existente):
+        raise ValueError(f'Etapa {nome} já declarada com outra função ou outras dependências')
+    contar('dag.etapas_reaproveitadas')
+    return nome
+
+
+# etapas necessárias para chegar aos alvos (os alvos e todas as dependências)
+def _necessarias(etapas, alvos):
+    necessarias = set()
+    pilha = list(alvos)
+    while pilha:
+        nome = pilha.pop()
+        if nome in necessarias:
+            continue
+        if nome not in etapas:
+            raise ValueError(f'Etapa não declarada: {nome}')
+        necessarias.add(nome)
+        pilha.extend(etapas[nome][1])
+    return necessarias
+
+
+def _rodar(nome, funcao, argumentos):
+    with cronometrar(f'etapa.{nome}'):
+        return funcao(*argumentos)
+
+
+# executa as etapas necessárias para os alvos e retorna {nome: resultado}
+# de todas as etapas executadas
+# erros: dicionário que recebe {nome: exceção} das etapas que falharam e das que
+# não rodaram por depender delas; sem ele, a primeira falha é lançada ao fim da
+# execução (depois de rodar tudo o que não depende dela)
+def executar(etapas, alvos, max_threads=None, erros=None):
+    pendentes = _necessarias(etapas, alvos)
+    resultados = {}
+    falhas = {}
+    em_execucao = {}
+
+    with ThreadPoolExecutor(max_workers=max_threads) as executor:
+        while pendentes or em_execucao:
+            # etapas que dependem de uma etapa que falhou não rodam
+            bloqueadas = [nome for nome in pendentes
+                          if any(dependencia in falhas for dependencia in etapas[nome][1])]
+            for nome in bloqueadas:
+                dependencia = next(dependencia for dependencia in etapas[nome][1]
+                                   if dependencia in falhas)
+                falhas[nome] = falhas[dependencia]
+                pendentes.remove(nome)
+                contar('dag.etapas_ignoradas')
+
+            prontas = [nome for nome in pendentes
+                       if all(dependencia in resultados for dependencia in etapas[nome][1])]
+            for nome in prontas:
+                funcao, dependencias = etapas[nome]
+                argumentos = [resultados[dependencia] for dependencia in dependencias]
+                em_execucao[executor.submit(_rodar, nome, funcao, argumentos)] = nome
+                pendentes.remove(nome)
+
+            if not em_execucao:
+                if bloqueadas:
+                    continue
+                raise ValueError(f'Dependência circular entre as etapas: {sorted(pendentes)}')
+
+            concluidas, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for futuro in concluidas:
+                nome = em_execucao.pop(futuro)
+                try:
+                    resultados[nome] = futuro.result()
+                except Exception as e:
+                    falhas[nome] = RuntimeError(f'Erro na etapa {nome}: {e}')
+                    falhas[nome].__cause__ = e
+                    contar('dag.etapas_com_erro')
+                    continue
+                contar('dag.etapas_executadas')
+
+    if erros is not None:
+        erros.update(falhas)
+    elif falhas:
+        raise next(iter(falhas.values()))
+    return resultados
@@ -1,21 +1,19 @@
-import pandas as pd
 import numpy as np
 
+from analises import executar_analises
+from dados_isp import endereco_da_linha_de_comando
+
+# uso: python exemplo01_2408.py [endereco]
+ENDERECO_DADOS = endereco_da_linha_de_comando()
+
 # obter dados
 try:
     print('Obtendo dados...')
 
-    ENDERECO_DADOS = 'https://www.ispdados.rj.gov.br/Arquivos/BaseDPEvolucaoMensalCisp.csv'
-    
-    # encodings principais: https://docs.python.org/3/library/codecs.html#standard-encodings
-    # utf-8, iso-8859-1, latin1, cp1252
-    df_ocorrencias = pd.read_csv(ENDERECO_DADOS, sep=';', encoding='iso-8859-1')
-    
-    # demilitando somente as variáveis do Exemplo01: munic e roubo_veiculo
-    df_roubo_veiculo = df_ocorrencias[['munic', 'roubo_veiculo']]
-
-    # Totalizar roubo_veiculo por munic
-    df_roubo_veiculo = df_roubo_veiculo.groupby(['munic']).sum(['roubo_veiculo']).reset_index()
+    resultado = executar_analises(['exemplo01'], ENDERECO_DADOS)['exemplo01']
+
+    # roubo_veiculo totalizado por munic
+    df_roubo_veiculo = resultado['total']
 
     print(df_roubo_veiculo.head())
 
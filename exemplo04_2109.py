@@ -1,22 +1,19 @@
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+
+from analises import executar_analises
+from dados_isp import endereco_da_linha_de_comando
+
+# uso: python exemplo04_2109.py [endereco]
+ENDERECO_DADOS = endereco_da_linha_de_comando()
 
 # obter dados
 try:
     print('Obtendo dados...')
 
-    ENDERECO_DADOS = 'https://www.ispdados.rj.gov.br/Arquivos/BaseDPEvolucaoMensalCisp.csv'
-    
-    # encodings principais: https://docs.python.org/3/library/codecs.html#standard-encodings
-    # utf-8, iso-8859-1, latin1, cp1252
-    df_ocorrencias = pd.read_csv(ENDERECO_DADOS, sep=';', encoding='iso-8859-1')
-    
-    # demilitando somente as variáveis do Exemplo01: munic e roubo_veiculo
-    df_roubo_veiculo = df_ocorrencias[['munic', 'roubo_veiculo']]
+    resultado = executar_analises(['exemplo04'], ENDERECO_DADOS)['exemplo04']
 
-    # Totalizar roubo_veiculo por munic
-    df_roubo_veiculo = df_roubo_veiculo.groupby(['munic']).sum(['roubo_veiculo']).reset_index()
+    # roubo_veiculo totalizado por munic
+    df_roubo_veiculo = resultado['total']
 
     print(df_roubo_veiculo.head())
 
@@ -196,6 +193,9 @@ except Exception as e:
 try:
     print('Visualizando os dados...')
 
+    # matplotlib só é carregado quando a visualização é executada
+    import matplotlib.pyplot as plt
+
     # matplotlib é uma biblioteca para visualização de dados
     # site é https://matplotlib.org/
     # pip install matplotlib
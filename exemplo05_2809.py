@@ -1,22 +1,26 @@
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+
+from analises import executar_analises
+from dados_isp import endereco_da_linha_de_comando
+from dispersao_densidade import plotar_densidade
+from permutacao import teste_permutacao
+
+# modo do gráfico de correlação
+# 'pontos': um marcador por cisp (plt.scatter)
+# 'densidade': pontos agregados em uma grade; indicado para cisp x mês ou bases ampliadas
+MODO_GRAFICO = 'pontos'
+
+# uso: python exemplo05_2809.py [endereco]
+ENDERECO_DADOS = endereco_da_linha_de_comando()
 
 # obter dados
 try:
     print('Obtendo dados...')
 
-    ENDERECO_DADOS = 'https://www.ispdados.rj.gov.br/Arquivos/BaseDPEvolucaoMensalCisp.csv'
-    
-    # encodings principais: https://docs.python.org/3/library/codecs.html#standard-encodings
-    # utf-8, iso-8859-1, latin1, cp1252
-    df_ocorrencias = pd.read_csv(ENDERECO_DADOS, sep=';', encoding='iso-8859-1')
-    
-    # demilitando somente as variáveis
-    df_veiculos = df_ocorrencias[['cisp', 'roubo_veiculo','recuperacao_veiculos']]
+    resultado = executar_analises(['exemplo05'], ENDERECO_DADOS)['exemplo05']
 
-    # Totalizar
-    df_total_veiculos = df_veiculos.groupby(['cisp']).sum(['roubo_veiculo','recuperacao_veiculos']).reset_index()
+    # roubo_veiculo e recuperacao_veiculos totalizados por cisp
+    df_total_veiculos = resultado['total']
 
     print(df_total_veiculos.head())
 
@@ -30,16 +34,33 @@ except Exception as e:
 try:
     print('Calculando a correlação...')
 
-    # correlação de pearson
-    correlacao = np.corrcoef(df_total_veiculos['roubo_veiculo'], df_total_veiculos['recuperacao_veiculos'])[0,1]
+    # matplotlib só é carregado quando a visualização é executada
+    import matplotlib.pyplot as plt
+
+    if MODO_GRAFICO == 'densidade':
+        # a correlação de pearson sai da mesma passagem que monta a grade
+        correlacao = plotar_densidade(df_total_veiculos['roubo_veiculo'], df_total_veiculos['recuperacao_veiculos'],
+                                      xlabel='Roubo de Veículos', ylabel='Recuperação de Veículos')
+
+        print(f'Correlação: {correlacao}')
+    else:
+        # correlação de pearson
+        correlacao = np.corrcoef(df_total_veiculos['roubo_veiculo'], df_total_veiculos['recuperacao_veiculos'])[0,1]
+
+        print(f'Correlação: {correlacao}')
+
+        # plotar gráfico
+        plt.scatter(df_total_veiculos['roubo_veiculo'], df_total_veiculos['recuperacao_veiculos'])
+        plt.title(f'Correlação: {correlacao}')
+        plt.xlabel('Roubo de Veículos')
+        plt.ylabel('Recuperação de Veículos')
 
-    print(f'Correlação: {correlacao}')
+    # significância por permutação das cisps (sem supor distribuição normal)
+    # processos=1: sem o bloco if __name__ == '__main__' o script não pode criar processos
+    # no Windows e no macOS
+    teste = teste_permutacao(df_total_veiculos['roubo_veiculo'], df_total_veiculos['recuperacao_veiculos'], processos=1)
 
-    # plotar gráfico
-    plt.scatter(df_total_veiculos['roubo_veiculo'], df_total_veiculos['recuperacao_veiculos'])
-    plt.title(f'Correlação: {correlacao}')
-    plt.xlabel('Roubo de Veículos')
-    plt.ylabel('Recuperação de Veículos')
+    print(f'P-valor (permutação): {teste["p_valor"]}')
 
     plt.show()
 
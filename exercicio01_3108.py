@@ -1,21 +1,22 @@
-import pandas as pd
 import numpy as np
 
+from analises import executar_analises
+from dados_isp import endereco_da_linha_de_comando, rotulo_mes_ano
+
+# uso: python exercicio01_3108.py [endereco]
+ENDERECO_DADOS = endereco_da_linha_de_comando()
+
 # obter dados
 try:
     print('Obtendo dados...')
 
-    ENDERECO_DADOS = 'https://www.ispdados.rj.gov.br/Arquivos/BaseDPEvolucaoMensalCisp.csv'
-    
-    # encodings principais: https://docs.python.org/3/library/codecs.html#standard-encodings
-    # utf-8, iso-8859-1, latin1, cp1252
-    df_ocorrencias = pd.read_csv(ENDERECO_DADOS, sep=';', encoding='iso-8859-1')
-    
-    # demilitando somente as variáveis do Exemplo01: munic e roubo_veiculo
-    df_estelionato = df_ocorrencias[['mes_ano', 'estelionato']]
-
-    # Totalizar roubo_veiculo por munic
-    df_estelionato = df_estelionato.groupby(['mes_ano']).sum(['estelionato']).reset_index()
+    resultado = executar_analises(['exercicio01'], ENDERECO_DADOS)['exercicio01']
+
+    # estelionato totalizado por mes_ano
+    df_estelionato = resultado['total']
+
+    # voltar o índice inteiro do mês para o rótulo do ISP (ex.: 2003m01)
+    df_estelionato['mes_ano'] = rotulo_mes_ano(df_estelionato['mes_ano'])
 
     #print(df_estelionato.head())
 
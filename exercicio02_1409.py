@@ -1,22 +1,20 @@
-import pandas as pd
 import numpy as np
 
+from analises import executar_analises
+from dados_isp import endereco_da_linha_de_comando
+
+
+# uso: python exercicio02_1409.py [endereco]
+ENDERECO_DADOS = endereco_da_linha_de_comando()
 
 # obter dados
 try:
     print('Obtendo dados...')
 
-    ENDERECO_DADOS = 'https://www.ispdados.rj.gov.br/Arquivos/BaseDPEvolucaoMensalCisp.csv'
-    
-    # encodings principais: https://docs.python.org/3/library/codecs.html#standard-encodings
-    # utf-8, iso-8859-1, latin1, cp1252
-    df_ocorrencias = pd.read_csv(ENDERECO_DADOS, sep=';', encoding='iso-8859-1')
-    
-    # demilitando somente as variáveis
-    df_recup_veiculo = df_ocorrencias[['cisp', 'recuperacao_veiculos']]
-
-    # Totalizar
-    df_recup_veiculo = df_recup_veiculo.groupby(['cisp']).sum(['recuperacao_veiculos']).reset_index()
+    resultado = executar_analises(['exercicio02'], ENDERECO_DADOS)['exercicio02']
+
+    # recuperacao_veiculos totalizado por cisp
+    df_recup_veiculo = resultado['total']
 
     print(df_recup_veiculo.head())
 
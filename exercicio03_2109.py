@@ -1,22 +1,19 @@
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+
+from analises import executar_analises
+from dados_isp import endereco_da_linha_de_comando
+
+# uso: python exercicio03_2109.py [endereco]
+ENDERECO_DADOS = endereco_da_linha_de_comando()
 
 # obter dados
 try:
     print('Obtendo dados...')
 
-    ENDERECO_DADOS = 'https://www.ispdados.rj.gov.br/Arquivos/BaseDPEvolucaoMensalCisp.csv'
-    
-    # encodings principais: https://docs.python.org/3/library/codecs.html#standard-encodings
-    # utf-8, iso-8859-1, latin1, cp1252
-    df_ocorrencias = pd.read_csv(ENDERECO_DADOS, sep=';', encoding='iso-8859-1')
-    
-    # demilitando somente as variáveis
-    df_cvli = df_ocorrencias[['aisp', 'cvli']]
+    resultado = executar_analises(['exercicio03'], ENDERECO_DADOS)['exercicio03']
 
-    # Totalizar
-    df_total_cvli = df_cvli.groupby(['aisp']).sum(['cvli']).reset_index()
+    # cvli totalizado por aisp
+    df_total_cvli = resultado['total']
 
     print(df_total_cvli.head())
 
@@ -82,6 +79,9 @@ except Exception as e:
 # visualizando dados
 try: 
     print('Visualizando dados...')
+
+    # matplotlib só é carregado quando a visualização é executada
+    import matplotlib.pyplot as plt
  
     plt.subplots(1,3,figsize=(15,5))
 
@@ -1,27 +1,35 @@
-import pandas as pd
+import os
+import sys
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+from analises import executar_analises
+from dados_isp import endereco_da_linha_de_comando
+from particoes import carregar_particoes, preparar_particoes
+
+# uso: python exercicio04_2809.py [endereco] [diretorio_particoes]
+ENDERECO_DADOS = endereco_da_linha_de_comando()
+
+# armazenamento local particionado por ano, por padrão ao lado deste script
+# (python particoes.py <diretorio> [endereco]); só é usado se foi gravado a partir
+# da mesma base, e é regravado quando a base é mais nova que ele
+DIRETORIO_PARTICOES = sys.argv[2] if len(sys.argv) > 2 else \
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados_particionados')
 
 # obter dados
 try:
     print('Obtendo dados...')
 
-    ENDERECO_DADOS = 'https://www.ispdados.rj.gov.br/Arquivos/BaseDPEvolucaoMensalCisp.csv'
-    
-    # encodings principais: https://docs.python.org/3/library/codecs.html#standard-encodings
-    # utf-8, iso-8859-1, latin1, cp1252
-    df_ocorrencias = pd.read_csv(ENDERECO_DADOS, sep=';', encoding='iso-8859-1')
-
-    # filtrar os anos
-    # \ significa que haverá uma quebra de linha
-    df_ocorrencias = df_ocorrencias[(df_ocorrencias['ano'] >= 2022) \
-                                    & (df_ocorrencias['ano'] <= 2023)]
-    
-    # demilitando somente as variáveis
-    df_hom_doloso = df_ocorrencias[['aisp', 'hom_doloso']]
+    if preparar_particoes(DIRETORIO_PARTICOES, ENDERECO_DADOS):
+        # só as partições de 2022 e 2023, e só as colunas usadas
+        df_ocorrencias = carregar_particoes(DIRETORIO_PARTICOES, anos=(2022, 2023),
+                                            colunas=['ano', 'aisp', 'hom_doloso'])
+        resultado = executar_analises(['exercicio04'], ocorrencias=df_ocorrencias)['exercicio04']
+    else:
+        resultado = executar_analises(['exercicio04'], ENDERECO_DADOS)['exercicio04']
 
-    # Totalizar
-    df_total_hom_doloso = df_hom_doloso.groupby(['aisp']).sum(['hom_doloso']).reset_index()
+    # hom_doloso totalizado por aisp
+    df_total_hom_doloso = resultado['total']
 
     print(df_total_hom_doloso.head())
 
@@ -116,6 +124,9 @@ except Exception as e:
 try: 
     print('Visualizando dados...')
 
+    # matplotlib só é carregado quando a visualização é executada
+    import matplotlib.pyplot as plt
+
     plt.subplots(1,3,figsize=(16,6))
     plt.suptitle('Análise de Homicídios Dolosos por AISP', fontsize=18)
 
@@ -1,22 +1,26 @@
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+
+from analises import executar_analises
+from dados_isp import endereco_da_linha_de_comando
+from dispersao_densidade import plotar_densidade
+from permutacao import teste_permutacao
+
+# modo do gráfico de correlação
+# 'pontos': um marcador por cisp (plt.scatter)
+# 'densidade': pontos agregados em uma grade; indicado para cisp x mês ou bases ampliadas
+MODO_GRAFICO = 'pontos'
+
+# uso: python exercicio05_2809.py [endereco]
+ENDERECO_DADOS = endereco_da_linha_de_comando()
 
 # obter dados
 try:
     print('Obtendo dados...')
 
-    ENDERECO_DADOS = 'https://www.ispdados.rj.gov.br/Arquivos/BaseDPEvolucaoMensalCisp.csv'
-    
-    # encodings principais: https://docs.python.org/3/library/codecs.html#standard-encodings
-    # utf-8, iso-8859-1, latin1, cp1252
-    df_ocorrencias = pd.read_csv(ENDERECO_DADOS, sep=';', encoding='iso-8859-1')
-    
-    # demilitando somente as variáveis
-    df_lesoes = df_ocorrencias[['cisp', 'lesao_corp_dolosa','lesao_corp_morte']]
+    resultado = executar_analises(['exercicio05'], ENDERECO_DADOS)['exercicio05']
 
-    # Totalizar
-    df_total_lesoes = df_lesoes.groupby(['cisp']).sum(['lesao_corp_dolosa','lesao_corp_morte']).reset_index()
+    # lesao_corp_dolosa e lesao_corp_morte totalizados por cisp
+    df_total_lesoes = resultado['total']
 
     print(df_total_lesoes.head())
 
@@ -30,16 +34,33 @@ except Exception as e:
 try:
     print('Calculando a correlação...')
 
-    # correlação de pearson
-    correlacao = np.corrcoef(df_total_lesoes['lesao_corp_dolosa'], df_total_lesoes['lesao_corp_morte'])[0,1]
+    # matplotlib só é carregado quando a visualização é executada
+    import matplotlib.pyplot as plt
+
+    if MODO_GRAFICO == 'densidade':
+        # a correlação de pearson sai da mesma passagem que monta a grade
+        correlacao = plotar_densidade(df_total_lesoes['lesao_corp_dolosa'], df_total_lesoes['lesao_corp_morte'],
+                                      xlabel='Lesão corporal dolosa', ylabel='Lesão corporal seguida de morte')
+
+        print(f'Correlação: {correlacao}')
+    else:
+        # correlação de pearson
+        correlacao = np.corrcoef(df_total_lesoes['lesao_corp_dolosa'], df_total_lesoes['lesao_corp_morte'])[0,1]
+
+        print(f'Correlação: {correlacao}')
+
+        # plotar gráfico
+        plt.scatter(df_total_lesoes['lesao_corp_dolosa'], df_total_lesoes['lesao_corp_morte'])
+        plt.title(f'Correlação: {correlacao}')
+        plt.xlabel('Lesão corporal dolosa')
+        plt.ylabel('Lesão corporal seguida de morte')
 
-    print(f'Correlação: {correlacao}')
+    # significância por permutação das cisps (sem supor distribuição normal)
+    # processos=1: sem o bloco if __name__ == '__main__' o script não pode criar processos
+    # no Windows e no macOS
+    teste = teste_permutacao(df_total_lesoes['lesao_corp_dolosa'], df_total_lesoes['lesao_corp_morte'], processos=1)
 
-    # plotar gráfico
-    plt.scatter(df_total_lesoes['lesao_corp_dolosa'], df_total_lesoes['lesao_corp_morte'])
-    plt.title(f'Correlação: {correlacao}')
-    plt.xlabel('Lesão corporal dolosa')
-    plt.ylabel('Lesão corporal seguida de morte')
+    print(f'P-valor (permutação): {teste["p_valor"]}')
 
     plt.show()
 
@@ -0,0 +1,183 @@
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from anomalias import cubo_grupo_mes
+from dados_isp import NIVEIS, carregar_ocorrencias, compactar_ocorrencias, \
+    endereco_da_linha_de_comando, indicadores, rotulo_mes_ano
+from medidas import calcular_medidas
+from outliers import detectar_outliers, matriz_totais
+
+# Exporta os agregados para um SQLite local, para as outras equipes consultarem
+# sem recarregar o CSV:
+#
+# cubo: total de cada (nivel, grupo, indicador, mes)
+# perfis: medidas descritivas dos totais de cada (nivel, indicador) no histórico completo
+# outliers: grupos fora dos limites de cada detector, por (nivel, indicador)
+#
+# A carga é feita em uma única transação por tabela e os índices são criados depois
+# da carga. mes é o índice inteiro do mês (ano*12 + mes-1); mes_ano traz o rótulo do ISP.
+
+METODOS_OUTLIERS = ('iqr', 'mad', 'zscore_modificado')
+
+ESQUEMA = '''
+CREATE TABLE cubo (
+    nivel TEXT NOT NULL,
+    grupo TEXT NOT NULL,
+    indicador TEXT NOT NULL,
+    mes INTEGER NOT NULL,
+    mes_ano TEXT NOT NULL,
+    valor REAL NOT NULL
+);
+CREATE TABLE perfis (
+    nivel TEXT NOT NULL,
+    indicador TEXT NOT NULL,
+    medida TEXT NOT NULL,
+    valor REAL
+);
+CREATE TABLE outliers (
+    nivel TEXT NOT NULL,
+    indicador TEXT NOT NULL,
+    metodo TEXT NOT NULL,
+    grupo TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    valor REAL NOT NULL,
+    pontuacao REAL
+);
+'''
+
+INDICES = '''
+CREATE UNIQUE INDEX idx_cubo ON cubo (nivel, grupo, indicador, mes);
+CREATE INDEX idx_cubo_indicador_mes ON cubo (nivel, indicador, mes);
+CREATE UNIQUE INDEX idx_perfis ON perfis (nivel, indicador, medida);
+CREATE INDEX idx_outliers ON outliers (nivel, indicador, metodo, grupo);
+CREATE INDEX idx_outliers_grupo ON outliers (nivel, grupo, indicador);
+'''
+
+
+def _linhas_cubo(df, nivel, lista_indicadores):
+    grupos, meses, lista_indicadores, cubo = cubo_grupo_mes(df, nivel, lista_indicadores)
+    rotulos = rotulo_mes_ano(meses)
+    grupos = [str(grupo) for grupo in grupos]
+
+    for i, indicador in enumerate(lista_indicadores):
+        g, m = np.nonzero(~np.isnan(cubo[i]))
+        valores = cubo[i][g, m]
+        for grupo, mes, valor in zip(g.tolist(), m.tolist(), valores.tolist()):
+            yield nivel, grupos[grupo], indicador, int(meses[mes]), rotulos[mes], valor
+
+
+def _linhas_perfis_outliers(df, nivel, lista_indicadores):
+    grupos, lista_indicadores, matriz = matriz_totais(df, nivel, lista_indicadores)
+    grupos = np.array([str(grupo) for grupo in grupos])
+
+    perfis = []
+    for j, indicador in enumerate(lista_indicadores):
+        for medida, valor in calcular_medidas(matriz[:, j]).items():
+            perfis.append((nivel, indicador, medida, None if np.isnan(valor) else float(valor)))
+
+    lista_outliers = []
+    for metodo, resultado in detectar_outliers(matriz, METODOS_OUTLIERS).items():
+        for tipo in ('inferiores', 'superiores'):
+            g, j = np.nonzero(resultado[tipo])
+            for grupo, indicador in zip(g.tolist(), j.tolist()):
+                pontuacao = float(resultado['pontuacao'][grupo, indicador])
+                lista_outliers.append((nivel, lista_indicadores[indicador], metodo,
+                                       grupos[grupo], tipo, float(matriz[grupo, indicador]),
+                                       pontuacao if np.isfinite(pontuacao) else None))
+    return perfis, lista_outliers
+
+
+def exportar(df, caminho, niveis=NIVEIS, lista_indicadores=None):
+    if lista_indicadores is None:
+        lista_indicadores = indicadores(df)
+
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+    conexao = sqlite3.connect(caminho, isolation_level=None)
+    try:
+        # carga em massa: sem journal nem fsync; o arquivo é recriado do zero se falhar
+        conexao.execute('PRAGMA journal_mode=OFF')
+        conexao.execute('PRAGMA synchronous=OFF')
+        conexao.executescript(ESQUEMA)
+
+        for nivel in niveis:
+            conexao.execute('BEGIN')
+            conexao.executemany('INSERT INTO cubo VALUES (?, ?, ?, ?, ?, ?)',
+                                _linhas_cubo(df, nivel, lista_indicadores))
+            conexao.execute('COMMIT')
+
+            perfis, lista_outliers = _linhas_perfis_outliers(df, nivel, lista_indicadores)
+            conexao.execute('BEGIN')
+            conexao.executemany('INSERT INTO perfis VALUES (?, ?, ?, ?)', perfis)
+            conexao.executemany('INSERT INTO outliers VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                lista_outliers)
+            conexao.execute('COMMIT')
+
+        conexao.executescript(INDICES)
+        conexao.execute('ANALYZE')
+    finally:
+        conexao.close()
+
+
+# série de um grupo entre dois meses (índices inteiros, inclusive)
+def consultar_serie(conexao, nivel, grupo, indicador, mes_inicial, mes_final):
+    return conexao.execute(
+        'SELECT mes_ano, valor FROM cubo '
+        'WHERE nivel = ? AND grupo = ? AND indicador = ? AND mes BETWEEN ? AND ? '
+        'ORDER BY mes',
+        (nivel, str(grupo), indicador, mes_inicial, mes_final)).fetchall()
+
+
+# total de cada grupo de um nível entre dois meses
+def consultar_totais(conexao, nivel, indicador, mes_inicial, mes_final):
+    return conexao.execute(
+        'SELECT grupo, SUM(valor) FROM cubo '
+        'WHERE nivel = ? AND indicador = ? AND mes BETWEEN ? AND ? '
+        'GROUP BY grupo ORDER BY SUM(valor) DESC',
+        (nivel, indicador, mes_inicial, mes_final)).fetchall()
+
+
+if __name__ == '__main__':
+    # uso: python exportar_sqlite.py saida.sqlite [endereco]
+    try:
+        print('Obtendo dados...')
+
+        df_ocorrencias = carregar_ocorrencias(endereco_da_linha_de_comando(2))
+        df_ocorrencias = compactar_ocorrencias(df_ocorrencias)
+
+        print('Dados obtidos com sucesso!')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print('Exportando para SQLite...')
+
+        inicio = time.perf_counter()
+        exportar(df_ocorrencias, sys.argv[1])
+        print(f'Exportação concluída em {time.perf_counter() - inicio:.2f}s')
+
+        conexao = sqlite3.connect(sys.argv[1])
+        cisp = int(df_ocorrencias['cisp'].iloc[0])
+        ultimo_mes = int(df_ocorrencias['mes_ano'].max())
+
+        inicio = time.perf_counter()
+        serie = consultar_serie(conexao, 'cisp', cisp, 'roubo_veiculo', ultimo_mes - 11, ultimo_mes)
+        print(f'\nSérie de 12 meses da CISP {cisp}: {len(serie)} linhas em '
+              f'{(time.perf_counter() - inicio) * 1000:.2f} ms')
+
+        inicio = time.perf_counter()
+        totais = consultar_totais(conexao, 'munic', 'roubo_veiculo', ultimo_mes - 23, ultimo_mes)
+        print(f'Totais de 24 meses por município: {len(totais)} linhas em '
+              f'{(time.perf_counter() - inicio) * 1000:.2f} ms')
+        conexao.close()
+
+    except Exception as e:
+        print(f'Erro ao exportar para SQLite: {e}')
+        exit()
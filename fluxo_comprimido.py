@@ -0,0 +1,253 @@
+import gzip
+import io
+import os
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from dados_isp import ENDERECO_DADOS
+
+# zstandard é opcional: sem ele só as cópias .gz (e o CSV sem compressão) são lidas
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Leitura do CSV do ISP como fluxo comprimido.
+# pd.read_csv(URL) baixa o arquivo inteiro sem compressão para a memória antes
+# do parse. Aqui a requisição pede Accept-Encoding: gzip (o texto do CSV comprime
+# muito) ou lê uma cópia local .gz/.zst; os bytes são descomprimidos aos poucos,
+# decodificados como Latin-1 e entregues ao parser, sem nunca manter o arquivo
+# descomprimido inteiro em memória.
+# dados_isp.carregar_ocorrencias, baixar_dados e ler_ocorrencias (e com eles o DAG
+# de analises.py e os scripts) leem por aqui: baixar_dados guarda os bytes como
+# vieram da rede (gzip, ~5x menores) e ler_ocorrencias os descomprime em fluxo.
+
+CODIFICACAO = 'iso-8859-1'
+TAMANHO_BLOCO = 100000
+
+# bytes iniciais de cada formato comprimido
+ASSINATURAS = {b'\x1f\x8b': 'gzip', b'\x28\xb5\x2f\xfd': 'zstd'}
+
+
+def _descomprimir(bruto, compressao):
+    if compressao is None:
+        return bruto
+    if compressao == 'gzip':
+        return gzip.GzipFile(fileobj=bruto, mode='rb')
+    if compressao == 'zstd':
+        if zstandard is None:
+            raise ImportError('Leitura de arquivos .zst requer o pacote zstandard '
+                              '(pip install zstandard)')
+        return zstandard.ZstdDecompressor().stream_reader(bruto)
+    raise ValueError(f'Compressão não suportada: {compressao}')
+
+
+# bytes como chegam da rede ou do disco (url ou arquivo .csv/.gz/.zst)
+# retorna (fluxo bruto, compressão a desfazer)
+def abrir_bruto(endereco=ENDERECO_DADOS):
+    if endereco.startswith(('http://', 'https://')):
+        requisicao = urllib.request.Request(endereco, headers={'Accept-Encoding': 'gzip'})
+        resposta = urllib.request.urlopen(requisicao)
+        # o servidor pode ignorar o pedido e mandar o CSV sem compressão
+        compressao = 'gzip' if resposta.headers.get('Content-Encoding') == 'gzip' else None
+        if compressao is None and endereco.endswith('.gz'):
+            compressao = 'gzip'
+        return resposta, compressao
+
+    compressao = {'.gz': 'gzip', '.zst': 'zstd'}.get(os.path.splitext(endereco)[1])
+    return open(endereco, 'rb'), compressao
+
+
+def _texto(bruto, compressao):
+    return io.TextIOWrapper(_descomprimir(bruto, compressao), encoding=CODIFICACAO, newline='')
+
+
+# compressão de um conteúdo já baixado, pelos bytes iniciais (None: CSV sem compressão)
+def compressao_conteudo(conteudo):
+    for assinatura, compressao in ASSINATURAS.items():
+        if conteudo.startswith(assinatura):
+            return compressao
+    return None
+
+
+# leitor do CSV sobre o fluxo comprimido (pd.read_csv com iterator=True):
+# leitor.get_chunk(n) lê as próximas n linhas, e n pode mudar a cada bloco
+@contextmanager
+def abrir_leitor(endereco=ENDERECO_DADOS, **opcoes):
+    bruto, compressao = abrir_bruto(endereco)
+    with bruto, _texto(bruto, compressao) as texto, \
+            pd.read_csv(texto, sep=';', iterator=True, **opcoes) as leitor:
+        yield leitor
+
+
+# blocos de linhas do CSV (DataFrames) lidos direto do fluxo comprimido
+def ler_em_blocos(endereco=ENDERECO_DADOS, tamanho_bloco=TAMANHO_BLOCO, **opcoes):
+    bruto, compressao = abrir_bruto(endereco)
+    with bruto, _texto(bruto, compressao) as texto, \
+            pd.read_csv(texto, sep=';', chunksize=tamanho_bloco, **opcoes) as leitor:
+        yield from leitor
+
+
+# DataFrame inteiro lido do fluxo: o parser consome o texto descomprimido aos poucos
+def carregar_ocorrencias_fluxo(endereco=ENDERECO_DADOS, **opcoes):
+    bruto, compressao = abrir_bruto(endereco)
+    with bruto, _texto(bruto, compressao) as texto:
+        return pd.read_csv(texto, sep=';', **opcoes)
+
+
+# bytes do CSV como chegam da rede ou do disco, ainda comprimidos quando for o caso
+def baixar_comprimido(endereco=ENDERECO_DADOS):
+    bruto, compressao = abrir_bruto(endereco)
+    with bruto:
+        conteudo = bruto.read()
+    # .gz servido sem Content-Encoding e arquivos locais já trazem a assinatura
+    if compressao is not None and compressao_conteudo(conteudo) != compressao:
+        raise ValueError(f'Conteúdo de {endereco} não está em {compressao}')
+    return conteudo
+
+
+# DataFrame a partir do conteúdo baixado (comprimido ou não), descomprimido em fluxo
+def ler_conteudo(conteudo, **opcoes):
+    with _texto(io.BytesIO(conteudo), compressao_conteudo(conteudo)) as texto:
+        return pd.read_csv(texto, sep=';', **opcoes)
+
+
+# cópia local comprimida do CSV (destino .gz ou .zst), sem carregar o arquivo inteiro
+def comprimir_arquivo(origem, destino, nivel=None):
+    with open(origem, 'rb') as entrada:
+        if destino.endswith('.gz'):
+            with gzip.open(destino, 'wb', compresslevel=nivel or 9) as saida:
+                shutil.copyfileobj(entrada, saida)
+        elif destino.endswith('.zst'):
+            if zstandard is None:
+                raise ImportError('Gravação de arquivos .zst requer o pacote zstandard '
+                                  '(pip install zstandard)')
+            compressor = zstandard.ZstdCompressor(level=nivel or 19)
+            with open(destino, 'wb') as saida:
+                compressor.copy_stream(entrada, saida)
+        else:
+            raise ValueError('O destino deve terminar em .gz ou .zst')
+
+
+# servidor HTTP local que imita o do ISP: responde com gzip quando o cliente
+# pede (Accept-Encoding) e conta os bytes enviados
+def _servidor_local(conteudo):
+    comprimido = gzip.compress(conteudo, compresslevel=6)
+    enviados = {'bytes': 0}
+
+    class Manipulador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            corpo = conteudo
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv')
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                corpo = comprimido
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+            enviados['bytes'] += len(corpo)
+
+        def log_message(self, *argumentos):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manipulador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, enviados
+
+
+def _medir(funcao):
+    tracemalloc.start()
+    try:
+        inicio = time.perf_counter()
+        resultado = funcao()
+        duracao = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return resultado, duracao, pico / 1024**2
+
+
+# compara pd.read_csv(url) com a leitura em fluxo gzip no servidor local, com a
+# mesma saída dos dois lados:
+# - base inteira: o DataFrame que carregar_ocorrencias entrega aos scripts
+# - totais por cisp: só as colunas usadas; o fluxo soma bloco a bloco
+def medir_transferencia(endereco_csv, tamanho_bloco=TAMANHO_BLOCO, indicador='roubo_veiculo'):
+    with open(endereco_csv, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    servidor, enviados = _servidor_local(conteudo)
+    url = f'http://127.0.0.1:{servidor.server_address[1]}/ocorrencias.csv'
+    colunas = ['cisp', indicador]
+
+    def totais_direto():
+        df = pd.read_csv(url, sep=';', encoding=CODIFICACAO, usecols=colunas)
+        return df.groupby('cisp')[indicador].sum()
+
+    def totais_em_fluxo():
+        parciais = [bloco.groupby('cisp')[indicador].sum()
+                    for bloco in ler_em_blocos(url, tamanho_bloco, usecols=colunas)]
+        return pd.concat(parciais).groupby(level=0).sum()
+
+    comparacoes = {
+        'base inteira': (lambda: pd.read_csv(url, sep=';', encoding=CODIFICACAO),
+                         lambda: carregar_ocorrencias_fluxo(url)),
+        'totais por cisp': (totais_direto, totais_em_fluxo),
+    }
+
+    resultados = {}
+    try:
+        for saida, funcoes in comparacoes.items():
+            for nome, funcao in zip(('read_csv(url)', 'fluxo gzip'), funcoes):
+                enviados['bytes'] = 0
+                valor, duracao, pico_mb = _medir(funcao)
+                resultados[f'{saida}, {nome}'] = {'segundos': duracao,
+                                                  'bytes_rede': enviados['bytes'],
+                                                  'pico_mb': pico_mb, 'saida': valor}
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    for saida in comparacoes:
+        if not resultados[f'{saida}, read_csv(url)']['saida'].equals(
+                resultados[f'{saida}, fluxo gzip']['saida']):
+            raise RuntimeError(f'Leitura em fluxo divergiu da leitura direta ({saida})')
+    return resultados
+
+
+if __name__ == '__main__':
+    # uso: python fluxo_comprimido.py arquivo.csv [tamanho_bloco]
+    endereco_csv = sys.argv[1]
+    tamanho_bloco = int(sys.argv[2]) if len(sys.argv) > 2 else TAMANHO_BLOCO
+
+    try:
+        print('Medindo leitura em fluxo comprimido...')
+
+        resultados = medir_transferencia(endereco_csv, tamanho_bloco)
+
+        print('\nTransferência (servidor HTTP local): ')
+        print(30*'-')
+        for nome, resultado in resultados.items():
+            print(f'{nome}: {resultado["segundos"]:.2f}s, '
+                  f'{resultado["bytes_rede"] / 1024**2:.2f} MB na rede, '
+                  f'pico de {resultado["pico_mb"]:.2f} MB')
+
+        print('\nCópias locais: ')
+        print(30*'-')
+        print(f'csv: {os.path.getsize(endereco_csv) / 1024**2:.2f} MB')
+        destinos = [endereco_csv + '.gz'] + ([endereco_csv + '.zst'] if zstandard else [])
+        for destino in destinos:
+            comprimir_arquivo(endereco_csv, destino)
+            formato = os.path.splitext(destino)[1][1:]
+            print(f'{formato}: {os.path.getsize(destino) / 1024**2:.2f} MB')
+
+    except Exception as e:
+        print(f'Erro ao medir leitura em fluxo: {e}')
+        exit()
@@ -0,0 +1,162 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from dados_isp import carregar_ocorrencias, compactar_ocorrencias, indicadores
+from dados_sinteticos import ampliar_ocorrencias, gerar_ocorrencias
+from medidas import calcular_medidas
+
+# Agregação paralela por indicador sem copiar o DataFrame para cada processo.
+# Os códigos do grupo e a matriz (indicadores x linhas) vão uma única vez para
+# memória compartilhada (multiprocessing.shared_memory). Cada processo se conecta
+# aos blocos pelo nome, lê sem cópia e calcula totais e medidas de uma fatia
+# de indicadores.
+
+# blocos de memória compartilhada abertos em cada processo (preenchido pelo initializer)
+_compartilhado = {}
+
+
+def _criar_bloco(array):
+    bloco = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    destino = np.ndarray(array.shape, dtype=array.dtype, buffer=bloco.buf)
+    destino[...] = array
+    return bloco
+
+
+def _conectar(nome_codigos, nome_valores, n_linhas, n_indicadores, n_grupos):
+    bloco_codigos = shared_memory.SharedMemory(name=nome_codigos)
+    bloco_valores = shared_memory.SharedMemory(name=nome_valores)
+
+    _compartilhado['blocos'] = (bloco_codigos, bloco_valores)
+    _compartilhado['codigos'] = np.ndarray((n_linhas,), dtype=np.int64, buffer=bloco_codigos.buf)
+    _compartilhado['valores'] = np.ndarray((n_indicadores, n_linhas), dtype=np.float64,
+                                           buffer=bloco_valores.buf)
+    _compartilhado['n_grupos'] = n_grupos
+
+
+# totais por grupo e medidas descritivas de uma fatia [inicio, fim) dos indicadores
+def _agregar_fatia(inicio, fim, multiplicador, metodo_quantil):
+    codigos = _compartilhado['codigos']
+    valores = _compartilhado['valores']
+    n_grupos = _compartilhado['n_grupos']
+
+    totais = np.empty((fim - inicio, n_grupos))
+    lista_medidas = []
+    for posicao in range(inicio, fim):
+        linha = valores[posicao]
+        # soma por grupo ignorando nan, como o groupby().sum() do pandas
+        validos = ~np.isnan(linha)
+        totais[posicao - inicio] = np.bincount(codigos[validos], weights=linha[validos],
+                                               minlength=n_grupos)
+        lista_medidas.append(calcular_medidas(totais[posicao - inicio],
+                                              multiplicador, metodo_quantil))
+
+    return inicio, totais, lista_medidas
+
+
+def agregar_paralelo(df, nivel, lista_indicadores=None, processos=None,
+                     multiplicador=1.5, metodo_quantil='weibull'):
+    if lista_indicadores is None:
+        lista_indicadores = indicadores(df)
+    if processos is None:
+        processos = os.cpu_count() or 1
+
+    # códigos inteiros do grupo (categorias já têm códigos; as demais colunas são fatoradas)
+    codigos, grupos = pd.factorize(df[nivel], sort=True)
+    if (codigos < 0).any():
+        raise ValueError(f'Coluna {nivel} com valores vazios')
+
+    valores = np.empty((len(lista_indicadores), len(df)), dtype=np.float64)
+    for posicao, indicador in enumerate(lista_indicadores):
+        valores[posicao] = df[indicador].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    bloco_codigos = _criar_bloco(codigos.astype(np.int64))
+    bloco_valores = _criar_bloco(valores)
+    del valores
+
+    try:
+        # fatias contíguas de indicadores, algumas por processo para equilibrar a carga
+        n_indicadores = len(lista_indicadores)
+        n_fatias = min(n_indicadores, processos * 4)
+        limites = np.linspace(0, n_indicadores, n_fatias + 1).astype(int)
+
+        argumentos = (bloco_codigos.name, bloco_valores.name, len(df), n_indicadores, len(grupos))
+        with ProcessPoolExecutor(max_workers=processos, initializer=_conectar,
+                                 initargs=argumentos) as executor:
+            futuros = [executor.submit(_agregar_fatia, inicio, fim, multiplicador, metodo_quantil)
+                       for inicio, fim in zip(limites[:-1], limites[1:]) if fim > inicio]
+            resultados = [futuro.result() for futuro in futuros]
+    finally:
+        bloco_codigos.close()
+        bloco_codigos.unlink()
+        bloco_valores.close()
+        bloco_valores.unlink()
+
+    totais = np.empty((n_indicadores, len(grupos)))
+    lista_medidas = [None] * n_indicadores
+    for inicio, totais_fatia, medidas_fatia in resultados:
+        totais[inicio:inicio + len(totais_fatia)] = totais_fatia
+        lista_medidas[inicio:inicio + len(medidas_fatia)] = medidas_fatia
+
+    df_totais = pd.DataFrame(totais.T, index=pd.Index(grupos, name=nivel), columns=lista_indicadores)
+    df_medidas = pd.DataFrame(lista_medidas, index=pd.Index(lista_indicadores, name='indicador'))
+
+    return df_totais, df_medidas
+
+
+# mede a vazão (linhas x indicadores por segundo) para cada quantidade de processos
+def medir_escalabilidade(df, nivel, lista_processos=None):
+    if lista_processos is None:
+        maximo = os.cpu_count() or 1
+        lista_processos = sorted({1, 2, 4, 8, 16, maximo} & set(range(1, maximo + 1)))
+
+    n_celulas = len(df) * len(indicadores(df))
+    resultados = []
+    for processos in lista_processos:
+        inicio = time.perf_counter()
+        agregar_paralelo(df, nivel, processos=processos)
+        duracao = time.perf_counter() - inicio
+        resultados.append({'processos': processos, 'segundos': duracao,
+                           'celulas_por_segundo': n_celulas / duracao})
+
+    return pd.DataFrame(resultados)
+
+
+if __name__ == '__main__':
+    # uso: python groupby_paralelo.py [nivel] [fator] [endereco_base]
+    nivel = sys.argv[1] if len(sys.argv) > 1 else 'cisp'
+    fator = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    try:
+        print('Obtendo dados...')
+
+        if len(sys.argv) > 3:
+            df_base = carregar_ocorrencias(sys.argv[3])
+        else:
+            df_base = gerar_ocorrencias()
+
+        df_ocorrencias = compactar_ocorrencias(ampliar_ocorrencias(df_base, fator))
+
+        print(f'Base {fator}x com {len(df_ocorrencias)} linhas')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print('Medindo escalabilidade...')
+
+        df_escalabilidade = medir_escalabilidade(df_ocorrencias, nivel)
+
+        print('\nVazão por quantidade de processos: ')
+        print(30*'-')
+        print(df_escalabilidade)
+
+    except Exception as e:
+        print(f'Erro ao medir escalabilidade: {e}')
+        exit()
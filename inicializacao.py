@@ -0,0 +1,130 @@
+import glob
+import os
+import subprocess
+import sys
+import time
+
+# Tempo de inicialização (cold start) de cada ponto de entrada das análises.
+# Cada entrada roda em um processo novo com python -X importtime; o relatório
+# mostra o tempo total do processo, o tempo gasto em importações e quanto
+# numpy, pandas e matplotlib custaram (ou "-" quando não foram carregados).
+# Além da importação dos módulos, os scripts exemploNN/exercicioNN e as análises
+# (analises.py) rodam de ponta a ponta sobre a base de regressão, sem rede e sem
+# janelas de gráfico: o total inclui leitura, cálculo e gráficos.
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_FIXTURE = os.path.join(DIRETORIO, 'regressao', 'fixture_ocorrencias.csv')
+
+PACOTES_PESADOS = ['numpy', 'pandas', 'matplotlib']
+
+SCRIPTS = sorted(os.path.basename(caminho)
+                 for padrao in ('exemplo*_*.py', 'exercicio*_*.py')
+                 for caminho in glob.glob(os.path.join(DIRETORIO, padrao)))
+
+# nome da entrada: código executado no processo novo (python -c) ou
+# lista de argumentos do python (script e seus argumentos)
+ENTRADAS = {
+    'analises': 'import analises',
+    'outliers': 'import outliers',
+    'anomalias': 'import anomalias',
+    'dispersao_densidade': 'import dispersao_densidade',
+    'paineis': 'import paineis',
+    'particoes': 'import particoes',
+    'analises.py (todas)': ['analises.py', ARQUIVO_FIXTURE],
+    **{script: [script, ARQUIVO_FIXTURE] for script in SCRIPTS},
+}
+
+
+# linhas "import time: self [us] | cumulative | pacote" do -X importtime
+# retorna [(nível de aninhamento, pacote, acumulado em segundos)]
+def ler_importtime(saida):
+    importacoes = []
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:'):
+            continue
+        partes = linha[len('import time:'):].split('|')
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        nome = partes[2]
+        nivel = (len(nome) - len(nome.lstrip()) - 1) // 2
+        importacoes.append((nivel, nome.strip(), int(partes[1]) / 1e6))
+    return importacoes
+
+
+def medir_inicializacao(entrada, repeticoes=5):
+    argumentos = ['-c', entrada] if isinstance(entrada, str) else list(entrada)
+    ambiente = dict(os.environ, MPLBACKEND='Agg')
+    medicoes = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        processo = subprocess.run([sys.executable, '-X', 'importtime'] + argumentos,
+                                  cwd=DIRETORIO, env=ambiente, capture_output=True, text=True)
+        duracao = time.perf_counter() - inicio
+        if processo.returncode != 0:
+            raise RuntimeError(f'Falha ao executar "{" ".join(argumentos)}": '
+                               f'{processo.stderr.strip()[-500:]}')
+
+        importacoes = ler_importtime(processo.stderr)
+
+        # o -X importtime lista os filhos antes do pai; de trás para frente cada
+        # linha vem depois dos seus ancestrais. Soma os submódulos de cada pacote
+        # (matplotlib, matplotlib.figure...) que não estão dentro do próprio pacote
+        pacotes = {}
+        ancestrais = []
+        for nivel, nome, acumulado in reversed(importacoes):
+            raiz = nome.split('.')[0]
+            del ancestrais[nivel:]
+            if raiz in PACOTES_PESADOS and raiz not in ancestrais:
+                pacotes[raiz] = pacotes.get(raiz, 0.0) + acumulado
+            ancestrais.append(raiz)
+        medicoes.append({
+            'total_s': duracao,
+            'importacoes_s': sum(acumulado for nivel, _, acumulado in importacoes if nivel == 0),
+            'pacotes': pacotes,
+        })
+
+    # a menor medição de cada valor (menos ruído do sistema)
+    return {
+        'total_s': min(medicao['total_s'] for medicao in medicoes),
+        'importacoes_s': min(medicao['importacoes_s'] for medicao in medicoes),
+        'pacotes': {pacote: min((medicao['pacotes'][pacote] for medicao in medicoes
+                                 if pacote in medicao['pacotes']), default=None)
+                    for pacote in PACOTES_PESADOS},
+    }
+
+
+def medir_entradas(entradas=None, repeticoes=5):
+    if entradas is None:
+        entradas = ENTRADAS
+    return {nome: medir_inicializacao(entrada, repeticoes) for nome, entrada in entradas.items()}
+
+
+if __name__ == '__main__':
+    # uso: python inicializacao.py [repeticoes] [diretorio_particoes nivel:indicador]
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    entradas = dict(ENTRADAS)
+    if len(sys.argv) > 3:
+        # perfil lido das partições: deve carregar só numpy
+        nivel, indicador = sys.argv[3].split(':')
+        entradas['particoes (perfil)'] = (
+            f'import particoes; particoes.perfil_particoes({sys.argv[2]!r}, {nivel!r}, '
+            f'{indicador!r})')
+
+    try:
+        print('Medindo inicialização...')
+
+        resultados = medir_entradas(entradas, repeticoes)
+
+        print('\nInicialização por entrada (menor de '
+              f'{repeticoes} execuções): ')
+        print(30*'-')
+        for nome, resultado in resultados.items():
+            pacotes = ', '.join(f'{pacote}: {tempo:.3f}s' if tempo is not None else f'{pacote}: -'
+                                for pacote, tempo in resultado['pacotes'].items())
+            print(f'{nome}: total {resultado["total_s"]:.3f}s, '
+                  f'importações {resultado["importacoes_s"]:.3f}s ({pacotes})')
+
+    except Exception as e:
+        print(f'Erro ao medir inicialização: {e}')
+        exit()
@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Contadores e tempos por etapa, compartilhados pelos módulos da análise
+# (acertos de cache, duração de cada etapa, etc.). Valores por processo.
+
+_trava = threading.Lock()
+_contadores = defaultdict(int)
+_tempos = defaultdict(list)
+
+
+def contar(nome, quantidade=1):
+    with _trava:
+        _contadores[nome] += quantidade
+
+
+# uso: with cronometrar('carregar'): ...
+@contextmanager
+def cronometrar(nome):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        with _trava:
+            _tempos[nome].append(duracao)
+
+
+def contadores():
+    with _trava:
+        return dict(_contadores)
+
+
+# resumo dos tempos: quantidade de chamadas, total e maior duração (segundos)
+def tempos():
+    with _trava:
+        return {nome: {'chamadas': len(duracoes),
+                       'total': sum(duracoes),
+                       'maximo': max(duracoes)}
+                for nome, duracoes in _tempos.items()}
+
+
+def zerar():
+    with _trava:
+        _contadores.clear()
+        _tempos.clear()
+
+
+def exibir_relatorio():
+    print('\nContadores: ')
+    print(30*'-')
+    for nome, valor in sorted(contadores().items()):
+        print(f'{nome}: {valor}')
+
+    print('\nTempos por etapa (s): ')
+    print(30*'-')
+    for nome, resumo in sorted(tempos().items()):
+        print(f'{nome}: {resumo["total"]:.4f} em {resumo["chamadas"]} chamada(s)')
@@ -0,0 +1,72 @@
+import numpy as np
+
+# medidas descritivas dos exemplos, calculadas sobre um array de totais
+# quartis pelo método weibull e limites de multiplicador * IQR (1.5 nos exemplos)
+
+
+# assimetria e curtose com a mesma correção de viés do pandas (skew() e kurtosis())
+def assimetria_curtose(array):
+    n = len(array)
+    desvios = array - np.mean(array)
+    m2 = np.mean(desvios**2)
+    m3 = np.mean(desvios**3)
+    m4 = np.mean(desvios**4)
+
+    if n < 3 or m2 == 0:
+        assimetria = np.nan
+    else:
+        assimetria = np.sqrt(n * (n - 1)) / (n - 2) * m3 / m2**1.5
+
+    if n < 4 or m2 == 0:
+        curtose = np.nan
+    else:
+        curtose = ((n + 1) * (m4 / m2**2 - 3) + 6) * (n - 1) / ((n - 2) * (n - 3))
+
+    return assimetria, curtose
+
+
+def calcular_medidas(valores, multiplicador=1.5, metodo_quantil='weibull'):
+    array = np.asarray(valores, dtype=float)
+
+    media = np.mean(array)
+    mediana = np.median(array)
+    q1 = np.quantile(array, 0.25, method=metodo_quantil)
+    q3 = np.quantile(array, 0.75, method=metodo_quantil)
+    iqr = q3 - q1
+    minimo = np.min(array)
+    maximo = np.max(array)
+    variancia = np.var(array)
+    desvio_padrao = np.std(array)
+    assimetria, curtose = assimetria_curtose(array)
+
+    # mediana ou média iguais a zero geram infinito/nan, como nos scripts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        distancia = abs((media - mediana) / mediana)
+        distancia_var_media = variancia / (media**2)
+        coef_variacao = desvio_padrao / media
+
+    return {
+        'media': media,
+        'mediana': mediana,
+        'distancia': distancia,
+        'minimo': minimo,
+        'maximo': maximo,
+        'amplitude': maximo - minimo,
+        'q1': q1,
+        'q3': q3,
+        'iqr': iqr,
+        'limite_inferior': q1 - (multiplicador * iqr),
+        'limite_superior': q3 + (multiplicador * iqr),
+        'variancia': variancia,
+        'distancia_var_media': distancia_var_media,
+        'desvio_padrao': desvio_padrao,
+        'coef_variacao': coef_variacao,
+        'assimetria': assimetria,
+        'curtose': curtose,
+    }
+
+
+# máscaras dos outliers inferiores e superiores segundo os limites calculados
+def outliers_iqr(valores, medidas):
+    array = np.asarray(valores, dtype=float)
+    return array < medidas['limite_inferior'], array > medidas['limite_superior']
@@ -0,0 +1,175 @@
+import resource
+import sys
+import tracemalloc
+
+from dados_isp import COLUNAS_NOMES, ENDERECO_DADOS, endereco_da_linha_de_comando
+from fluxo_comprimido import abrir_leitor
+from medidas import calcular_medidas
+
+# Execução com orçamento de memória, para os workers compartilhados de batch.
+# Em vez de pd.read_csv da base inteira seguido de cópias intermediárias
+# (df_ocorrencias[...], groupby().reset_index(), np.array(...), .copy()),
+# a base é lida em blocos só com as colunas necessárias (projeção), cada bloco é
+# agregado e descartado, e só os totais parciais por grupo ficam em memória.
+# O download também é em fluxo (fluxo_comprimido.abrir_leitor): pd.read_csv(url)
+# carregaria o corpo HTTP inteiro em memória antes do primeiro bloco.
+#
+# O tamanho do bloco sai do orçamento; a memória alocada é acompanhada com
+# tracemalloc e, se o pico se aproxima do orçamento, o bloco seguinte é menor.
+# Se nem o menor bloco cabe, a execução para com OrcamentoMemoriaExcedido
+# (em vez de deixar o processo ser morto pelo OOM killer).
+#
+# Limitação: o tracemalloc vê as alocações do Python e do numpy/pandas, mas não os
+# buffers internos do parser C do read_csv. Por isso o crescimento do RSS do
+# processo (/proc/self/statm, no Linux) também é acompanhado; o maior dos dois
+# reduz o bloco e interrompe a execução como acima. As duas medições são feitas
+# entre um bloco e outro: um único bloco pode passar do orçamento antes de ser
+# detectado. Para um limite rígido, rode o worker com
+# resource.setrlimit(RLIMIT_AS) ou um cgroup de memória.
+
+# memória estimada por valor lido (valor + buffers do parser + cópia do filtro)
+# o parser C tokeniza a linha inteira mesmo com usecols: medido pelo RSS, cada
+# valor das colunas lidas custa ~2,5x o que o tracemalloc registra
+BYTES_POR_VALOR = 160
+MENOR_BLOCO = 1000
+# fração do orçamento a partir da qual o bloco seguinte é reduzido à metade
+FRACAO_ALERTA = 0.8
+
+
+class OrcamentoMemoriaExcedido(MemoryError):
+    pass
+
+
+def _pico_rss_mb():
+    # ru_maxrss é em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# RSS atual do processo em bytes (None fora do Linux)
+def _rss_atual():
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def agregar_com_orcamento(nivel, lista_indicadores, orcamento_mb, endereco=ENDERECO_DADOS,
+                          anos=None, multiplicador=1.5, metodo_quantil='weibull'):
+    orcamento = orcamento_mb * 1024**2
+
+    colunas = [nivel] + list(lista_indicadores) + (['ano'] if anos is not None else [])
+    tipos = {indicador: 'float32' for indicador in lista_indicadores}
+    if nivel in COLUNAS_NOMES:
+        tipos[nivel] = 'category'
+
+    tamanho_bloco = int(orcamento / (BYTES_POR_VALOR * len(colunas)))
+    if tamanho_bloco < MENOR_BLOCO:
+        raise OrcamentoMemoriaExcedido(
+            f'Orçamento de {orcamento_mb} MB insuficiente: o menor bloco de {MENOR_BLOCO} '
+            f'linhas x {len(colunas)} colunas precisa de cerca de '
+            f'{MENOR_BLOCO * len(colunas) * BYTES_POR_VALOR / 1024**2:.2f} MB')
+
+    tracemalloc.start()
+    try:
+        inicial = tracemalloc.get_traced_memory()[0]
+        rss_inicial = _rss_atual()
+        maior_pico = 0
+        maior_rss = 0
+        blocos = 0
+        totais = None
+
+        with abrir_leitor(endereco, usecols=colunas, dtype=tipos) as leitor:
+            while True:
+                try:
+                    bloco = leitor.get_chunk(tamanho_bloco)
+                except StopIteration:
+                    break
+
+                if anos is not None:
+                    bloco = bloco[(bloco['ano'] >= anos[0]) & (bloco['ano'] <= anos[1])]
+
+                # soma parcial em float64 para não perder precisão ao acumular
+                parcial = bloco.groupby(nivel, observed=True)[list(lista_indicadores)] \
+                    .sum().astype('float64')
+                del bloco
+                if totais is None:
+                    totais = parcial
+                else:
+                    totais = totais.add(parcial, fill_value=0)
+                del parcial
+                blocos += 1
+
+                pico = tracemalloc.get_traced_memory()[1] - inicial
+                maior_pico = max(maior_pico, pico)
+                if rss_inicial is not None:
+                    # inclui os buffers do parser C, que o tracemalloc não vê
+                    rss = _rss_atual() - rss_inicial
+                    maior_rss = max(maior_rss, rss)
+                    pico = max(pico, rss)
+                if pico > orcamento:
+                    raise OrcamentoMemoriaExcedido(
+                        f'Pico de {pico / 1024**2:.2f} MB acima do orçamento de '
+                        f'{orcamento_mb} MB com blocos de {tamanho_bloco} linhas')
+                if pico > orcamento * FRACAO_ALERTA:
+                    if tamanho_bloco // 2 < MENOR_BLOCO:
+                        raise OrcamentoMemoriaExcedido(
+                            f'Pico de {pico / 1024**2:.2f} MB próximo do orçamento de '
+                            f'{orcamento_mb} MB mesmo com o menor bloco ({MENOR_BLOCO} linhas)')
+                    tamanho_bloco //= 2
+                tracemalloc.reset_peak()
+    finally:
+        tracemalloc.stop()
+
+    if totais is None or len(totais) == 0:
+        raise ValueError('Nenhuma linha lida dentro do filtro informado')
+
+    medidas = {indicador: calcular_medidas(totais[indicador].to_numpy(), multiplicador,
+                                           metodo_quantil)
+               for indicador in lista_indicadores}
+
+    relatorio = {
+        'orcamento_mb': orcamento_mb,
+        'pico_mb': maior_pico / 1024**2,
+        'crescimento_rss_mb': maior_rss / 1024**2 if rss_inicial is not None else None,
+        'pico_rss_mb': _pico_rss_mb(),
+        'blocos': blocos,
+        'tamanho_bloco_final': tamanho_bloco,
+    }
+    return totais.reset_index(), medidas, relatorio
+
+
+if __name__ == '__main__':
+    # uso: python orcamento_memoria.py orcamento_mb [nivel] [indicador] [endereco]
+    orcamento_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 64
+    nivel = sys.argv[2] if len(sys.argv) > 2 else 'aisp'
+    indicador = sys.argv[3] if len(sys.argv) > 3 else 'hom_doloso'
+    endereco = endereco_da_linha_de_comando(4)
+
+    try:
+        print(f'Agregando com orçamento de {orcamento_mb} MB...')
+
+        df_totais, medidas, relatorio = agregar_com_orcamento(nivel, [indicador], orcamento_mb,
+                                                              endereco)
+
+        print(df_totais.head())
+
+        print('\nMedidas: ')
+        print(30*'-')
+        for medida, valor in medidas[indicador].items():
+            print(f'{medida}: {valor}')
+
+        print('\nMemória: ')
+        print(30*'-')
+        print(f'Orçamento: {relatorio["orcamento_mb"]} MB')
+        print(f'Pico alocado: {relatorio["pico_mb"]:.2f} MB em {relatorio["blocos"]} blocos')
+        if relatorio['crescimento_rss_mb'] is not None:
+            print(f'Crescimento do RSS: {relatorio["crescimento_rss_mb"]:.2f} MB')
+        print(f'Pico de RSS do processo: {relatorio["pico_rss_mb"]:.2f} MB')
+
+    except OrcamentoMemoriaExcedido as e:
+        print(f'Orçamento de memória insuficiente: {e}')
+        exit(1)
+    except Exception as e:
+        print(f'Erro ao agregar com orçamento de memória: {e}')
+        exit()
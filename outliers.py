@@ -0,0 +1,183 @@
+import sys
+
+import numpy as np
+
+from dados_isp import carregar_ocorrencias, endereco_da_linha_de_comando, indicadores
+
+# Detectores de outliers calculados coluna a coluna sobre um array 2-D
+# (linhas = grupos ou meses, colunas = indicadores), todos de uma vez.
+#
+# iqr: limites q1 - 1.5*IQR e q3 + 1.5*IQR (regra usada desde o exemplo02)
+# mad: distância até a mediana maior que limite * MAD (escalado para o desvio padrão)
+# zscore_modificado: 0.6745 * (x - mediana) / MAD acima de 3.5 (Iglewicz e Hoaglin)
+# hampel: mediana e MAD móveis ao longo das linhas (série mensal, eixo 0 = meses)
+
+# fator que torna o MAD comparável ao desvio padrão em dados normais
+ESCALA_MAD = 1.4826
+
+LIMITES_PADRAO = {
+    'iqr': 1.5,
+    'mad': 3.0,
+    'zscore_modificado': 3.5,
+    'hampel': 3.0,
+}
+
+
+def _como_matriz(valores):
+    matriz = np.asarray(valores, dtype=float)
+    if matriz.ndim == 1:
+        matriz = matriz[:, np.newaxis]
+    if matriz.ndim != 2:
+        raise ValueError('Esperado um array 1-D ou 2-D de totais')
+    return matriz
+
+
+# mediana e MAD por coluna
+# quando o MAD é zero (mais da metade dos valores iguais, comum em contagens
+# com muitos zeros), usa o desvio médio absoluto * 1.2533 no lugar
+def _mediana_mad(matriz, eixo=0):
+    mediana = np.nanmedian(matriz, axis=eixo, keepdims=True)
+    desvios = np.abs(matriz - mediana)
+    mad = np.nanmedian(desvios, axis=eixo, keepdims=True)
+    desvio_medio = np.nanmean(desvios, axis=eixo, keepdims=True) * 1.2533
+    mad = np.where(mad == 0, desvio_medio / ESCALA_MAD, mad)
+    return mediana, mad
+
+
+def _resultado(pontuacao, inferiores, superiores):
+    return {
+        'pontuacao': pontuacao,
+        'inferiores': inferiores,
+        'superiores': superiores,
+    }
+
+
+# quartis de cada coluna da matriz (medidas.outliers_iqr usa os limites já calculados
+# de uma série)
+def outliers_iqr_grupos(matriz, limite=1.5, metodo_quantil='weibull'):
+    q1 = np.nanquantile(matriz, 0.25, axis=0, method=metodo_quantil, keepdims=True)
+    q3 = np.nanquantile(matriz, 0.75, axis=0, method=metodo_quantil, keepdims=True)
+    iqr = q3 - q1
+    limite_inferior = q1 - (limite * iqr)
+    limite_superior = q3 + (limite * iqr)
+
+    # pontuação: quantos IQRs o valor está além do quartil mais próximo
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pontuacao = np.where(matriz > q3, (matriz - q3) / iqr,
+                             np.where(matriz < q1, (matriz - q1) / iqr, 0.0))
+
+    return _resultado(pontuacao, matriz < limite_inferior, matriz > limite_superior)
+
+
+def outliers_mad(matriz, limite=3.0):
+    mediana, mad = _mediana_mad(matriz)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pontuacao = (matriz - mediana) / (ESCALA_MAD * mad)
+    return _resultado(pontuacao, pontuacao < -limite, pontuacao > limite)
+
+
+def outliers_zscore_modificado(matriz, limite=3.5):
+    mediana, mad = _mediana_mad(matriz)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pontuacao = 0.6745 * (matriz - mediana) / mad
+    return _resultado(pontuacao, pontuacao < -limite, pontuacao > limite)
+
+
+# filtro de Hampel: cada mês é comparado com a mediana da janela centrada nele
+# janela = quantidade de meses de cada lado
+def outliers_hampel(matriz, limite=3.0, janela=6):
+    n_meses = matriz.shape[0]
+    if n_meses == 0:
+        return _resultado(matriz.copy(), matriz > 0, matriz > 0)
+
+    # repete as bordas para que todo mês tenha uma janela completa
+    estendida = np.pad(matriz, ((janela, janela), (0, 0)), mode='edge')
+    janelas = np.lib.stride_tricks.sliding_window_view(estendida, 2 * janela + 1, axis=0)
+
+    # janelas tem forma (meses, colunas, tamanho da janela)
+    mediana, mad = _mediana_mad(janelas, eixo=2)
+    mediana = mediana[..., 0]
+    mad = mad[..., 0]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pontuacao = (matriz - mediana) / (ESCALA_MAD * mad)
+    return _resultado(pontuacao, pontuacao < -limite, pontuacao > limite)
+
+
+DETECTORES = {
+    'iqr': outliers_iqr_grupos,
+    'mad': outliers_mad,
+    'zscore_modificado': outliers_zscore_modificado,
+    'hampel': outliers_hampel,
+}
+
+
+# executa os detectores escolhidos pelo nome sobre a mesma matriz
+# limites: {nome: limite} para substituir os valores de LIMITES_PADRAO
+# opcoes: {nome: {parâmetro: valor}}, ex.: {'hampel': {'janela': 3}}
+def detectar_outliers(valores, metodos=('iqr',), limites=None, opcoes=None):
+    matriz = _como_matriz(valores)
+    limites = {**LIMITES_PADRAO, **(limites or {})}
+    opcoes = opcoes or {}
+
+    resultados = {}
+    for metodo in metodos:
+        if metodo not in DETECTORES:
+            raise ValueError(f'Detector de outliers desconhecido: {metodo}. '
+                             f'Opções: {", ".join(DETECTORES)}')
+        resultados[metodo] = DETECTORES[metodo](matriz, limites[metodo],
+                                                **opcoes.get(metodo, {}))
+    return resultados
+
+
+# matriz (grupos x indicadores) de totais por nivel, com um único groupby
+def matriz_totais(df, nivel, lista_indicadores=None):
+    if lista_indicadores is None:
+        lista_indicadores = indicadores(df)
+    df_totais = df.groupby(nivel, observed=True)[lista_indicadores].sum()
+    return df_totais.index, lista_indicadores, df_totais.to_numpy(dtype=float)
+
+
+# matriz (meses x indicadores) de totais mensais, para o filtro de Hampel
+def matriz_mensal(df, lista_indicadores=None):
+    if lista_indicadores is None:
+        lista_indicadores = indicadores(df)
+    df_totais = df.groupby(['ano', 'mes'])[lista_indicadores].sum().sort_index()
+    return df_totais.index, lista_indicadores, df_totais.to_numpy(dtype=float)
+
+
+if __name__ == '__main__':
+    # uso: python outliers.py [nivel] [endereco]
+    nivel = sys.argv[1] if len(sys.argv) > 1 else 'munic'
+
+    try:
+        print('Obtendo dados...')
+
+        df_ocorrencias = carregar_ocorrencias(endereco_da_linha_de_comando(2))
+
+        grupos, lista_indicadores, matriz = matriz_totais(df_ocorrencias, nivel)
+        meses, _, matriz_meses = matriz_mensal(df_ocorrencias, lista_indicadores)
+
+        print('Dados obtidos com sucesso!')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print('Detectando outliers...')
+
+        resultados = detectar_outliers(matriz, metodos=('iqr', 'mad', 'zscore_modificado'))
+        resultado_hampel = detectar_outliers(matriz_meses, metodos=('hampel',))['hampel']
+
+        print(f'\nQuantidade de outliers superiores por {nivel}: ')
+        print(30*'-')
+        for posicao, indicador in enumerate(lista_indicadores):
+            contagens = ', '.join(f'{metodo}: {resultado["superiores"][:, posicao].sum()}'
+                                  for metodo, resultado in resultados.items())
+            meses_hampel = resultado_hampel['superiores'][:, posicao].sum()
+            print(f'{indicador}: {contagens}, hampel (meses): {meses_hampel}')
+
+    except Exception as e:
+        print(f'Erro ao detectar outliers: {e}')
+        exit()
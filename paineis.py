@@ -0,0 +1,204 @@
+import os
+import sys
+import time
+
+import numpy as np
+from matplotlib import cbook
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from dados_isp import carregar_ocorrencias, compactar_ocorrencias, endereco_da_linha_de_comando, \
+    indicadores
+from medidas import calcular_medidas, outliers_iqr
+
+# Modelo de painel reutilizável para renderizar um painel por indicador.
+# O painel do exemplo04 (boxplot, histograma, ranking dos outliers superiores e
+# medidas descritivas) é montado uma única vez: grade de subplots, artistas do
+# boxplot, barras do histograma, barras do ranking e textos das medidas.
+# Para cada indicador só os dados dos artistas são atualizados antes de salvar;
+# nada de recriar subplots, chamar plt.text de novo ou rodar tight_layout.
+
+# posição (x, y) e medida de cada texto do quadro de medidas, como no exemplo04
+TEXTOS_MEDIDAS = [
+    (0.1, 0.9, 'Média', 'media'),
+    (0.1, 0.8, 'Mediana', 'mediana'),
+    (0.1, 0.7, 'Distância', 'distancia'),
+    (0.1, 0.6, 'Menor valor', 'minimo'),
+    (0.1, 0.5, 'Limite inferior', 'limite_inferior'),
+    (0.1, 0.4, 'Q1', 'q1'),
+    (0.1, 0.3, 'Q3', 'q3'),
+    (0.1, 0.2, 'Limite superior', 'limite_superior'),
+    (0.1, 0.1, 'Maior valor', 'maximo'),
+    (0.1, 0.0, 'Amplitude Total', 'amplitude'),
+    (0.7, 0.9, 'Assimetria', 'assimetria'),
+    (0.7, 0.8, 'Curtose', 'curtose'),
+    (0.7, 0.7, 'Variância', 'variancia'),
+    (0.7, 0.6, 'Distância var x média', 'distancia_var_media'),
+    (0.7, 0.5, 'Desvio padrão', 'desvio_padrao'),
+    (0.7, 0.4, 'Coef. variação', 'coef_variacao'),
+]
+
+
+def criar_painel(max_barras=20, bins=100, figsize=(16, 7)):
+    figura = Figure(figsize=figsize)
+    FigureCanvasAgg(figura)
+    eixos = figura.subplots(2, 2)
+    titulo = figura.suptitle(' ')
+
+    # posição 1: boxplot com outliers (dados provisórios, substituídos a cada indicador)
+    eixo_box = eixos[0, 0]
+    boxplot = eixo_box.boxplot(np.arange(5.0), orientation='horizontal', showmeans=True,
+                               meanline=True)
+    eixo_box.set_title('Boxplot com outliers')
+
+    # posição 2: histograma
+    eixo_hist = eixos[0, 1]
+    _, _, barras_hist = eixo_hist.hist(np.arange(float(bins)), bins=bins, edgecolor='black')
+
+    # posição 3: ranking dos outliers superiores
+    eixo_ranking = eixos[1, 0]
+    barras_ranking = eixo_ranking.barh(np.arange(max_barras), np.zeros(max_barras))
+    eixo_ranking.set_title('Ranking com outliers superiores')
+
+    # posição 4: medidas descritivas
+    eixo_medidas = eixos[1, 1]
+    textos = [eixo_medidas.text(x, y, f'{rotulo}: 0.0000000000000000', fontsize=12)
+              for x, y, rotulo, _ in TEXTOS_MEDIDAS]
+    eixo_medidas.axis('off')
+
+    figura.tight_layout()
+
+    return {
+        'figura': figura,
+        'titulo': titulo,
+        'eixo_box': eixo_box,
+        'boxplot': boxplot,
+        'eixo_hist': eixo_hist,
+        'barras_hist': barras_hist,
+        'bins': bins,
+        'eixo_ranking': eixo_ranking,
+        'barras_ranking': barras_ranking,
+        'textos': textos,
+    }
+
+
+# redesenha as linhas do boxplot horizontal com as estatísticas do matplotlib
+def _atualizar_boxplot(painel, array):
+    estatisticas = cbook.boxplot_stats(array)[0]
+    boxplot = painel['boxplot']
+    y0, y1 = 0.75, 1.25
+
+    boxplot['boxes'][0].set_data([estatisticas['q1'], estatisticas['q3'], estatisticas['q3'],
+                                  estatisticas['q1'], estatisticas['q1']],
+                                 [y0, y0, y1, y1, y0])
+    boxplot['medians'][0].set_data([estatisticas['med'], estatisticas['med']], [y0, y1])
+    boxplot['means'][0].set_data([estatisticas['mean'], estatisticas['mean']], [y0, y1])
+    boxplot['whiskers'][0].set_data([estatisticas['q1'], estatisticas['whislo']], [1, 1])
+    boxplot['whiskers'][1].set_data([estatisticas['q3'], estatisticas['whishi']], [1, 1])
+    boxplot['caps'][0].set_data([estatisticas['whislo']] * 2, [0.875, 1.125])
+    boxplot['caps'][1].set_data([estatisticas['whishi']] * 2, [0.875, 1.125])
+    boxplot['fliers'][0].set_data(estatisticas['fliers'], np.ones(len(estatisticas['fliers'])))
+
+    minimo, maximo = np.min(array), np.max(array)
+    margem = (maximo - minimo) * 0.05 or 1.0
+    painel['eixo_box'].set_xlim(minimo - margem, maximo + margem)
+
+
+def _atualizar_histograma(painel, array):
+    alturas, bordas = np.histogram(array, bins=painel['bins'])
+    for barra, altura, inicio, fim in zip(painel['barras_hist'], alturas, bordas[:-1], bordas[1:]):
+        barra.set_x(inicio)
+        barra.set_width(fim - inicio)
+        barra.set_height(altura)
+
+    eixo = painel['eixo_hist']
+    eixo.set_xlim(bordas[0], bordas[-1])
+    eixo.set_ylim(0, max(alturas.max(), 1) * 1.05)
+
+
+# rotulos e valores em ordem crescente (como o barh do exemplo04)
+def _atualizar_ranking(painel, rotulos, valores):
+    barras = painel['barras_ranking']
+    quantidade = min(len(valores), len(barras))
+    rotulos = list(rotulos)[-quantidade:] if quantidade else []
+    valores = np.asarray(valores, dtype=float)[-quantidade:] if quantidade else []
+
+    for posicao, barra in enumerate(barras):
+        if posicao < quantidade:
+            barra.set_width(valores[posicao])
+            barra.set_visible(True)
+        else:
+            barra.set_visible(False)
+
+    eixo = painel['eixo_ranking']
+    eixo.set_yticks(np.arange(quantidade), labels=[str(rotulo) for rotulo in rotulos])
+    eixo.set_ylim(-0.5, max(quantidade, 1) - 0.5)
+    eixo.set_xlim(0, (max(valores) if quantidade else 1) * 1.05)
+
+
+def atualizar_painel(painel, titulo, array, rotulos_ranking, valores_ranking, medidas):
+    array = np.asarray(array, dtype=float)
+
+    painel['titulo'].set_text(titulo)
+    _atualizar_boxplot(painel, array)
+    _atualizar_histograma(painel, array)
+    _atualizar_ranking(painel, rotulos_ranking, valores_ranking)
+
+    for texto, (_, _, rotulo, medida) in zip(painel['textos'], TEXTOS_MEDIDAS):
+        texto.set_text(f'{rotulo}: {medidas[medida]}')
+
+
+# um painel por indicador, todos a partir do mesmo modelo
+def renderizar_paineis(df, nivel, lista_indicadores, diretorio, formato='png'):
+    os.makedirs(diretorio, exist_ok=True)
+    painel = criar_painel()
+    arquivos = []
+
+    for indicador in lista_indicadores:
+        df_total = df[[nivel, indicador]].groupby([nivel], observed=True).sum().reset_index()
+        array = df_total[indicador].to_numpy(dtype=float)
+
+        medidas = calcular_medidas(array)
+        _, superiores = outliers_iqr(array, medidas)
+        df_superiores = df_total[superiores].sort_values(by=indicador, ascending=True)
+
+        atualizar_painel(painel, f'Análise de {indicador} por {nivel}', array,
+                         df_superiores[nivel], df_superiores[indicador], medidas)
+
+        arquivo = os.path.join(diretorio, f'{indicador}_{nivel}.{formato}')
+        painel['figura'].savefig(arquivo)
+        arquivos.append(arquivo)
+
+    return arquivos
+
+
+if __name__ == '__main__':
+    # uso: python paineis.py diretorio_saida [nivel] [endereco]
+    nivel = sys.argv[2] if len(sys.argv) > 2 else 'munic'
+
+    try:
+        print('Obtendo dados...')
+
+        df_ocorrencias = carregar_ocorrencias(endereco_da_linha_de_comando(3))
+        df_ocorrencias = compactar_ocorrencias(df_ocorrencias)
+
+        print('Dados obtidos com sucesso!')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print('Renderizando painéis...')
+
+        lista_indicadores = indicadores(df_ocorrencias)
+        inicio = time.perf_counter()
+        arquivos = renderizar_paineis(df_ocorrencias, nivel, lista_indicadores, sys.argv[1])
+        duracao = time.perf_counter() - inicio
+
+        print(f'{len(arquivos)} painéis em {duracao:.2f}s '
+              f'({duracao / len(arquivos):.3f}s por painel)')
+
+    except Exception as e:
+        print(f'Erro ao renderizar painéis: {e}')
+        exit()
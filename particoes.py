@@ -0,0 +1,375 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import urllib.request
+from email.utils import parsedate_to_datetime
+
+import numpy as np
+
+from dados_isp import ENDERECO_DADOS, carregar_ocorrencias, compactar_ocorrencias
+from instrumentacao import contar
+from medidas import calcular_medidas, outliers_iqr
+
+# Armazenamento local da base particionado por ano.
+# Cada partição é um diretório ano=AAAA com um arquivo .npy por coluna (colunar),
+# e o manifesto.json guarda, para cada partição, a quantidade de linhas e o
+# mínimo/máximo de cada coluna numérica. Colunas de nomes (munic, mcirc, regiao)
+# são gravadas como códigos inteiros e o dicionário fica no manifesto.
+#
+# Um carregamento com intervalo de anos abre só as partições cujo min/max de ano
+# cruza o intervalo, e de cada partição só as colunas pedidas: uma análise de dois
+# anos lê aproximadamente dois anos de bytes, e não a base inteira.
+#
+# O manifesto também guarda a versão do formato e a origem (endereço da base e
+# a data de modificação dela na gravação). preparar_particoes só reaproveita
+# partições da mesma base, na versão atual e gravadas depois da última modificação
+# da origem; partições desatualizadas da mesma base são regravadas. Para a base
+# remota, a data de modificação (HEAD) é consultada no máximo uma vez a cada
+# INTERVALO_VERIFICACAO segundos; o resultado fica em verificacao.json.
+#
+# A gravação é feita em um diretório temporário ao lado do destino e trocada no
+# lugar dele ao fim: uma falha no meio não deixa o armazenamento pela metade. Um
+# destino existente só é substituído se estiver vazio ou for um armazenamento
+# (tiver manifesto.json); outros diretórios não são apagados.
+
+MANIFESTO = 'manifesto.json'
+# versão do formato das partições: armazenamentos de outra versão são regravados
+VERSAO = 2
+VERIFICACAO = 'verificacao.json'
+INTERVALO_VERIFICACAO = 24 * 3600
+# maior inteiro representado exatamente em float32
+LIMITE_FLOAT32 = 2**24
+
+
+def _nome_particao(ano):
+    return f'ano={ano}'
+
+
+# endereço da base como fica no manifesto (arquivos locais pelo caminho absoluto)
+def _endereco_origem(endereco):
+    if endereco.startswith(('http://', 'https://')):
+        return endereco
+    return os.path.abspath(endereco)
+
+
+# data da última modificação da base (timestamp) ou None quando não se sabe
+# arquivo local: mtime; url: cabeçalho Last-Modified de uma requisição HEAD
+def modificacao_origem(endereco):
+    if not endereco.startswith(('http://', 'https://')):
+        return os.path.getmtime(endereco)
+    try:
+        requisicao = urllib.request.Request(endereco, method='HEAD')
+        with urllib.request.urlopen(requisicao, timeout=10) as resposta:
+            modificacao = resposta.headers.get('Last-Modified')
+        return parsedate_to_datetime(modificacao).timestamp() if modificacao else None
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+# float32 só para inteiros exatos em float32; coluna toda ausente também cabe
+def _tipo_float(serie):
+    valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+    valores = valores[~np.isnan(valores)]
+    if np.all(np.abs(valores) < LIMITE_FLOAT32) and np.all(valores == np.round(valores)):
+        return 'float32'
+    return 'float64'
+
+
+# o destino pode ser substituído: não existe, está vazio ou é um armazenamento
+def _verificar_destino(diretorio):
+    if not os.path.exists(diretorio):
+        return
+    if not os.path.isdir(diretorio):
+        raise ValueError(f'{diretorio} existe e não é um diretório')
+    conteudo = os.listdir(diretorio)
+    if conteudo and MANIFESTO not in conteudo:
+        raise ValueError(f'{diretorio} não está vazio e não é um armazenamento de partições '
+                         f'(sem {MANIFESTO}); escolha outro diretório')
+
+
+# troca o destino pelo diretório gravado; o antigo só é apagado depois da troca
+def _substituir(temporario, diretorio):
+    if not os.path.exists(diretorio):
+        os.replace(temporario, diretorio)
+        return
+
+    antigo = tempfile.mkdtemp(prefix=f'.{os.path.basename(diretorio)}-antigo-',
+                              dir=os.path.dirname(diretorio))
+    os.rmdir(antigo)
+    os.replace(diretorio, antigo)
+    try:
+        os.replace(temporario, diretorio)
+    except OSError:
+        os.replace(antigo, diretorio)
+        raise
+    shutil.rmtree(antigo)
+
+
+# endereco: base de origem, registrada no manifesto para preparar_particoes
+def gravar_particoes(df, diretorio, endereco=None):
+    if 'ano' not in df.columns:
+        raise ValueError('A base precisa da coluna ano para ser particionada')
+
+    diretorio = os.path.abspath(diretorio)
+    _verificar_destino(diretorio)
+
+    df = compactar_ocorrencias(df, exibir=False)
+
+    origem = None
+    if endereco is not None:
+        origem = {'endereco': _endereco_origem(endereco),
+                  'modificacao': modificacao_origem(endereco)}
+
+    os.makedirs(os.path.dirname(diretorio), exist_ok=True)
+    temporario = tempfile.mkdtemp(prefix=f'.{os.path.basename(diretorio)}-',
+                                  dir=os.path.dirname(diretorio))
+    # mkdtemp cria o diretório só para o dono; o armazenamento segue o padrão
+    os.chmod(temporario, 0o755)
+    try:
+        _gravar(df, temporario, origem)
+        _substituir(temporario, diretorio)
+    finally:
+        if os.path.exists(temporario):
+            shutil.rmtree(temporario)
+
+
+# partições e manifesto em um diretório vazio
+def _gravar(df, diretorio, origem):
+    import pandas as pd
+
+    colunas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            colunas[coluna] = {'tipo': str(serie.cat.codes.dtype),
+                               'dicionario': [str(valor) for valor in serie.cat.categories]}
+        elif serie.hasnans or pd.api.types.is_extension_array_dtype(serie):
+            # inteiros anuláveis viram float com nan
+            colunas[coluna] = {'tipo': _tipo_float(serie)}
+        else:
+            colunas[coluna] = {'tipo': str(serie.dtype)}
+
+    particoes = []
+    for ano, df_ano in df.groupby('ano', sort=True):
+        caminho = os.path.join(diretorio, _nome_particao(ano))
+        os.makedirs(caminho)
+
+        estatisticas = {}
+        for coluna, descricao in colunas.items():
+            serie = df_ano[coluna]
+            if 'dicionario' in descricao:
+                valores = serie.cat.codes.to_numpy()
+            else:
+                valores = serie.to_numpy(dtype=descricao['tipo'], na_value=np.nan) \
+                    if descricao['tipo'].startswith('float') else serie.to_numpy()
+                if len(valores) and not np.isnan(valores.astype(float)).all():
+                    estatisticas[coluna] = [float(np.nanmin(valores)), float(np.nanmax(valores))]
+            np.save(os.path.join(caminho, f'{coluna}.npy'), valores)
+
+        particoes.append({'nome': _nome_particao(ano), 'linhas': len(df_ano),
+                          'estatisticas': estatisticas})
+
+    with open(os.path.join(diretorio, MANIFESTO), 'w', encoding='utf-8') as arquivo:
+        json.dump({'versao': VERSAO, 'origem': origem, 'colunas': colunas,
+                   'particoes': particoes}, arquivo, ensure_ascii=False)
+
+
+def ler_manifesto(diretorio):
+    with open(os.path.join(diretorio, MANIFESTO), encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+# modificacao_origem com cache em disco para a base remota: a consulta HEAD ao
+# servidor é refeita só depois de INTERVALO_VERIFICACAO segundos
+def _modificacao_verificada(diretorio, endereco):
+    if not endereco.startswith(('http://', 'https://')):
+        return modificacao_origem(endereco)
+
+    caminho = os.path.join(diretorio, VERIFICACAO)
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            verificacao = json.load(arquivo)
+        if verificacao['endereco'] == endereco \
+                and time.time() - verificacao['verificado_em'] < INTERVALO_VERIFICACAO:
+            return verificacao['modificacao']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    modificacao = modificacao_origem(endereco)
+    try:
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump({'endereco': endereco, 'verificado_em': time.time(),
+                       'modificacao': modificacao}, arquivo)
+    except OSError:
+        pass
+    return modificacao
+
+
+# deixa o armazenamento do diretório pronto para a base do endereço
+# retorna True se as partições podem ser lidas (regravadas se estavam na versão
+# antiga ou são anteriores à última modificação da origem) e False se não há
+# partições dessa base no diretório (partições de outra base não são tocadas)
+def preparar_particoes(diretorio, endereco):
+    try:
+        manifesto = ler_manifesto(diretorio)
+    except (OSError, ValueError):
+        return False
+
+    origem = manifesto.get('origem') or {}
+    if origem.get('endereco') != _endereco_origem(endereco):
+        return False
+
+    modificacao = _modificacao_verificada(diretorio, endereco)
+    desatualizada = modificacao is not None and (origem.get('modificacao') is None
+                                                 or modificacao > origem['modificacao'])
+    if manifesto.get('versao') != VERSAO or desatualizada:
+        contar('particoes.regravadas')
+        gravar_particoes(carregar_ocorrencias(endereco), diretorio, endereco)
+    return True
+
+
+# partições cujo intervalo [min, max] de cada coluna filtrada cruza o filtro
+# filtros: {coluna: (minimo, maximo)}
+def podar_particoes(manifesto, filtros):
+    selecionadas = []
+    for particao in manifesto['particoes']:
+        estatisticas = particao['estatisticas']
+        if all(coluna in estatisticas
+               and estatisticas[coluna][1] >= minimo and estatisticas[coluna][0] <= maximo
+               for coluna, (minimo, maximo) in filtros.items()):
+            selecionadas.append(particao)
+    return selecionadas
+
+
+# lê as colunas pedidas das partições do intervalo de anos
+# retorna {coluna: array}; colunas de nomes vêm como códigos (ver manifesto['colunas'])
+def ler_particoes(diretorio, anos=None, colunas=None):
+    manifesto = ler_manifesto(diretorio)
+    if colunas is None:
+        colunas = list(manifesto['colunas'])
+    desconhecidas = [coluna for coluna in colunas if coluna not in manifesto['colunas']]
+    if desconhecidas:
+        raise ValueError(f'Colunas inexistentes no armazenamento: {desconhecidas}')
+
+    filtros = {'ano': anos} if anos is not None else {}
+    particoes = podar_particoes(manifesto, filtros)
+    contar('particoes.lidas', len(particoes))
+    contar('particoes.podadas', len(manifesto['particoes']) - len(particoes))
+
+    arrays = {coluna: [] for coluna in colunas}
+    for particao in particoes:
+        for coluna in colunas:
+            caminho = os.path.join(diretorio, particao['nome'], f'{coluna}.npy')
+            contar('particoes.bytes_lidos', os.path.getsize(caminho))
+            arrays[coluna].append(np.load(caminho))
+
+    tipos = {coluna: manifesto['colunas'][coluna]['tipo'] for coluna in colunas}
+    return {coluna: np.concatenate(partes) if partes else np.empty(0, dtype=tipos[coluna])
+            for coluna, partes in arrays.items()}, manifesto
+
+
+# DataFrame com as colunas de nomes de volta como categorias
+# contagens gravadas em float32 voltam como float64, o tipo da leitura do CSV: as
+# somas e medidas saem iguais às calculadas sobre o CSV
+def carregar_particoes(diretorio, anos=None, colunas=None):
+    import pandas as pd
+
+    arrays, manifesto = ler_particoes(diretorio, anos, colunas)
+
+    colunas_df = {}
+    for coluna, valores in arrays.items():
+        descricao = manifesto['colunas'][coluna]
+        if 'dicionario' in descricao:
+            colunas_df[coluna] = pd.Categorical.from_codes(valores, descricao['dicionario'])
+        elif descricao['tipo'] == 'float32':
+            colunas_df[coluna] = valores.astype('float64')
+        else:
+            colunas_df[coluna] = valores
+    return pd.DataFrame(colunas_df)
+
+
+# totais de um indicador por nível direto das partições, sem pandas
+# retorna (grupos, totais); grupos são os nomes para colunas com dicionário
+def totalizar_particoes(diretorio, nivel, indicador, anos=None):
+    arrays, manifesto = ler_particoes(diretorio, anos, [nivel, indicador])
+    chaves, posicoes = np.unique(arrays[nivel], return_inverse=True)
+    valores = arrays[indicador].astype(float)
+    presentes = ~np.isnan(valores)
+    totais = np.bincount(posicoes[presentes], weights=valores[presentes], minlength=len(chaves))
+
+    descricao = manifesto['colunas'][nivel]
+    if 'dicionario' in descricao:
+        chaves = np.array(descricao['dicionario'], dtype=object)[chaves]
+    return chaves, totais
+
+
+# medidas e outliers de um indicador totalizado, como no perfil de analises.py
+def perfil_particoes(diretorio, nivel, indicador, anos=None, multiplicador=1.5,
+                     metodo_quantil='weibull'):
+    grupos, totais = totalizar_particoes(diretorio, nivel, indicador, anos)
+    medidas = calcular_medidas(totais, multiplicador, metodo_quantil)
+    inferiores, superiores = outliers_iqr(totais, medidas)
+    ordem = np.argsort(-totais[superiores], kind='stable')
+
+    return {
+        'medidas': medidas,
+        'outliers_inferiores': list(zip(grupos[inferiores], totais[inferiores])),
+        'outliers_superiores': list(zip(grupos[superiores][ordem], totais[superiores][ordem])),
+    }
+
+
+def tamanho_bytes(diretorio):
+    return sum(os.path.getsize(os.path.join(raiz, arquivo))
+               for raiz, _, arquivos in os.walk(diretorio) for arquivo in arquivos)
+
+
+if __name__ == '__main__':
+    # uso: python particoes.py diretorio [endereco]
+    #      python particoes.py diretorio --perfil=nivel:indicador [--anos=inicio-fim]
+    argumentos = [argumento for argumento in sys.argv[1:] if not argumento.startswith('--')]
+    opcoes = dict(argumento[2:].split('=', 1) for argumento in sys.argv[1:]
+                  if argumento.startswith('--'))
+    diretorio = argumentos[0]
+
+    if 'perfil' in opcoes:
+        # só numpy: lê as partições gravadas, sem CSV
+        try:
+            nivel, indicador = opcoes['perfil'].split(':')
+            anos = tuple(int(ano) for ano in opcoes['anos'].split('-')) if 'anos' in opcoes \
+                else None
+            resultado = perfil_particoes(diretorio, nivel, indicador, anos)
+
+            print(f'\nMedidas de {indicador} por {nivel}: ')
+            print(30*'-')
+            for medida, valor in resultado['medidas'].items():
+                print(f'{medida}: {valor}')
+
+            print('\nOutliers superiores: ')
+            print(30*'-')
+            for grupo, total in resultado['outliers_superiores']:
+                print(f'{grupo}: {total}')
+
+        except Exception as e:
+            print(f'Erro ao ler partições: {e}')
+            exit()
+
+    else:
+        try:
+            print('Obtendo dados...')
+
+            endereco = argumentos[1] if len(argumentos) > 1 else ENDERECO_DADOS
+            df_ocorrencias = carregar_ocorrencias(endereco)
+
+            print('Gravando partições por ano...')
+            gravar_particoes(df_ocorrencias, diretorio, endereco)
+
+            manifesto = ler_manifesto(diretorio)
+            print(f'{len(manifesto["particoes"])} partições, '
+                  f'{tamanho_bytes(diretorio) / 1024**2:.2f} MB')
+
+        except Exception as e:
+            print(f'Erro ao gravar partições: {e}')
+            exit()
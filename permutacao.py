@@ -0,0 +1,221 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dados_isp import carregar_ocorrencias, compactar_ocorrencias, endereco_da_linha_de_comando, \
+    indicadores
+from outliers import matriz_totais
+
+# Teste de permutação para as correlações de pearson e spearman.
+# Com ~140 CISPs e contagens assimétricas o teste pela distribuição normal não é
+# confiável; aqui a distribuição da correlação sob a hipótese nula sai de
+# permutações das linhas de uma das variáveis.
+#
+# As colunas são padronizadas (média 0, norma 1), de modo que a correlação é um
+# produto escalar. Um lote de permutações é um array de índices (lote x linhas);
+# cada coluna permutada (lote x linhas) multiplicada pela matriz dá, de uma vez,
+# as correlações dessa coluna com todas as outras em todas as permutações do lote.
+# Uma coluna por vez: o tensor (lote x linhas x colunas) nunca é montado.
+#
+# O lote é percorrido em sublotes que cabem em orcamento_mb (índices repetidos,
+# índices permutados e coluna permutada: 3 valores por linha, mais as correlações
+# da coluna); como em orcamento_memoria.py, o tamanho do bloco sai do orçamento.
+#
+# Os lotes são distribuídos entre processos; cada lote tem sua própria semente
+# (SeedSequence.spawn), então o resultado não depende da quantidade de processos
+# nem do orçamento (os sublotes consomem o mesmo gerador, em sequência).
+#
+# spearman: pearson sobre os postos (empates recebem o posto médio)
+
+METODOS = ['pearson', 'spearman']
+CORRECOES = ['holm', 'bh']
+
+# memória por processo para os índices e as colunas permutadas de um sublote
+ORCAMENTO_MB = 64
+BYTES_POR_VALOR = 8
+
+
+# postos médios por coluna (1..n)
+def postos(matriz):
+    matriz = np.asarray(matriz, dtype=float)
+    resultado = np.empty_like(matriz)
+    for coluna in range(matriz.shape[1]):
+        ordenada = np.sort(matriz[:, coluna])
+        esquerda = np.searchsorted(ordenada, matriz[:, coluna], side='left')
+        direita = np.searchsorted(ordenada, matriz[:, coluna], side='right')
+        resultado[:, coluna] = (esquerda + direita + 1) / 2
+    return resultado
+
+
+# colunas com média 0 e norma 1: correlação = produto escalar
+def _padronizar(matriz, metodo):
+    if metodo not in METODOS:
+        raise ValueError(f'Método de correlação desconhecido: {metodo}. '
+                         f'Opções: {", ".join(METODOS)}')
+    matriz = np.asarray(matriz, dtype=float)
+    if np.isnan(matriz).any():
+        raise ValueError('Valores ausentes na matriz; remova as linhas com nan antes do teste')
+    if metodo == 'spearman':
+        matriz = postos(matriz)
+
+    centrada = matriz - matriz.mean(axis=0)
+    norma = np.sqrt((centrada**2).sum(axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return centrada / norma
+
+
+# permutações por sublote que cabem no orçamento (ao menos uma)
+def _tamanho_sublote(n_linhas, n_colunas, orcamento_mb):
+    por_permutacao = BYTES_POR_VALOR * (3 * n_linhas + n_colunas)
+    return max(1, int(orcamento_mb * 1024**2 // por_permutacao))
+
+
+# quantas correlações permutadas, em módulo, alcançam a observada (por par)
+# roda em um processo: gera o lote com a própria semente, em sublotes, e faz um
+# produto de matrizes por coluna permutada
+def _contar_lote(padronizada, observada, semente, tamanho_lote, orcamento_mb=ORCAMENTO_MB):
+    gerador = np.random.default_rng(semente)
+    n_linhas, n_colunas = padronizada.shape
+    sublote = _tamanho_sublote(n_linhas, n_colunas, orcamento_mb)
+
+    # tolerância para que a permutação identidade conte como "alcança"
+    limite = np.abs(observada) - 1e-12
+    excedentes = np.zeros(observada.shape, dtype=np.int64)
+    for inicio in range(0, tamanho_lote, sublote):
+        tamanho = min(sublote, tamanho_lote - inicio)
+        indices = gerador.permuted(np.tile(np.arange(n_linhas), (tamanho, 1)), axis=1)
+
+        for coluna in range(n_colunas):
+            # (sublote, linhas) @ (linhas, colunas) -> (sublote, colunas)
+            permutadas = padronizada[indices, coluna] @ padronizada
+            excedentes[coluna] += (np.abs(permutadas) >= limite[coluna]).sum(axis=0)
+    return excedentes
+
+
+# correlações observadas e p-valores bilaterais de todos os pares de colunas
+def _permutar(padronizada, permutacoes, tamanho_lote, processos, semente,
+              orcamento_mb=ORCAMENTO_MB):
+    observada = padronizada.T @ padronizada
+
+    n_lotes = -(-permutacoes // tamanho_lote)
+    tamanhos = [tamanho_lote] * (n_lotes - 1) + [permutacoes - tamanho_lote * (n_lotes - 1)]
+    sementes = np.random.SeedSequence(semente).spawn(n_lotes)
+
+    argumentos = ([padronizada] * n_lotes, [observada] * n_lotes, sementes, tamanhos,
+                  [orcamento_mb] * n_lotes)
+    if processos == 1:
+        excedentes = sum(map(_contar_lote, *argumentos))
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            excedentes = sum(executor.map(_contar_lote, *argumentos))
+
+    # p-valor com a correção +1 (a amostra observada é uma das permutações)
+    with np.errstate(invalid='ignore'):
+        p_valores = (excedentes + 1) / (permutacoes + 1)
+    p_valores = np.where(np.isnan(observada), np.nan, p_valores)
+    return observada, p_valores
+
+
+def teste_permutacao(x, y, metodo='pearson', permutacoes=9999, tamanho_lote=1000,
+                     processos=None, semente=0, orcamento_mb=ORCAMENTO_MB):
+    matriz = np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float)])
+    observada, p_valores = _permutar(_padronizar(matriz, metodo), permutacoes, tamanho_lote,
+                                     processos, semente, orcamento_mb)
+    return {
+        'correlacao': observada[0, 1],
+        'p_valor': p_valores[0, 1],
+        'permutacoes': permutacoes,
+    }
+
+
+# correção para múltiplas comparações (valores nan são ignorados)
+# holm: controla a taxa de erro da família (FWER)
+# bh: Benjamini-Hochberg, controla a taxa de falsas descobertas (FDR)
+def corrigir_p_valores(p_valores, metodo='holm'):
+    if metodo not in CORRECOES:
+        raise ValueError(f'Correção desconhecida: {metodo}. Opções: {", ".join(CORRECOES)}')
+
+    p_valores = np.asarray(p_valores, dtype=float)
+    corrigidos = np.full(p_valores.shape, np.nan)
+    validos = ~np.isnan(p_valores)
+    p = p_valores[validos]
+    m = len(p)
+    if m == 0:
+        return corrigidos
+
+    ordem = np.argsort(p, kind='stable')
+    ordenados = p[ordem]
+    if metodo == 'holm':
+        ajustados = np.maximum.accumulate((m - np.arange(m)) * ordenados)
+    else:
+        ajustados = np.minimum.accumulate((m / np.arange(1, m + 1) * ordenados)[::-1])[::-1]
+
+    resultado = np.empty(m)
+    resultado[ordem] = np.minimum(ajustados, 1.0)
+    corrigidos[validos] = resultado
+    return corrigidos
+
+
+# todos os pares de colunas de uma matriz (linhas = grupos, colunas = indicadores)
+# retorna um DataFrame com um par por linha, ordenado pelo p-valor corrigido
+def teste_permutacao_matriz(matriz, nomes, metodo='pearson', permutacoes=9999,
+                            tamanho_lote=1000, processos=None, semente=0, correcao='holm',
+                            alfa=0.05, orcamento_mb=ORCAMENTO_MB):
+    observada, p_valores = _permutar(_padronizar(matriz, metodo), permutacoes, tamanho_lote,
+                                     processos, semente, orcamento_mb)
+
+    linhas, colunas = np.triu_indices(len(nomes), k=1)
+    p_pares = p_valores[linhas, colunas]
+    corrigidos = corrigir_p_valores(p_pares, correcao)
+
+    # menor p-valor corrigido primeiro; empates pela correlação mais forte
+    ordem = np.lexsort((-np.abs(observada[linhas, colunas]), corrigidos))
+    linhas, colunas = linhas[ordem], colunas[ordem]
+
+    return pd.DataFrame({
+        'indicador_x': np.asarray(nomes, dtype=object)[linhas],
+        'indicador_y': np.asarray(nomes, dtype=object)[colunas],
+        'correlacao': observada[linhas, colunas],
+        'p_valor': p_pares[ordem],
+        'p_valor_corrigido': corrigidos[ordem],
+        'significativo': corrigidos[ordem] < alfa,
+    })
+
+
+if __name__ == '__main__':
+    # uso: python permutacao.py [nivel] [metodo] [endereco]
+    nivel = sys.argv[1] if len(sys.argv) > 1 else 'cisp'
+    metodo = sys.argv[2] if len(sys.argv) > 2 else 'spearman'
+
+    try:
+        print('Obtendo dados...')
+
+        df_ocorrencias = carregar_ocorrencias(endereco_da_linha_de_comando(3))
+        df_ocorrencias = compactar_ocorrencias(df_ocorrencias)
+
+        # indicadores sem valores ausentes em nenhuma linha
+        lista_indicadores = [indicador for indicador in indicadores(df_ocorrencias)
+                             if df_ocorrencias[indicador].notna().all()]
+        grupos, lista_indicadores, matriz = matriz_totais(df_ocorrencias, nivel,
+                                                          lista_indicadores)
+
+        print('Dados obtidos com sucesso!')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print(f'Testando {metodo} de todos os pares por permutação...')
+
+        df_pares = teste_permutacao_matriz(matriz, lista_indicadores, metodo)
+
+        print(f'\nPares com correlação significativa (holm, 5%) por {nivel}: ')
+        print(30*'-')
+        print(df_pares[df_pares['significativo']].to_string(index=False))
+
+    except Exception as e:
+        print(f'Erro ao testar correlações: {e}')
+        exit()
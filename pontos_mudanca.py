@@ -0,0 +1,190 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from anomalias import cubo_grupo_mes
+from dados_isp import carregar_ocorrencias, compactar_ocorrencias, endereco_da_linha_de_comando, \
+    rotulo_mes_ano
+from outliers import ESCALA_MAD
+
+# Pontos de mudança de nível nas séries mensais (ex.: o crescimento de estelionato).
+# Segmentação binária com custo de mudança na média: o custo de um segmento
+# [a, b) é a soma dos quadrados dos desvios em relação à média do segmento,
+# calculada em O(1) com as somas acumuladas da série e dos quadrados:
+#
+#   custo(a, b) = (S2[b] - S2[a]) - (S1[b] - S1[a])**2 / (b - a)
+#
+# A cada passo o segmento com o maior ganho é dividido, enquanto o ganho passar
+# da penalidade (padrão: 2 * sigma**2 * log(n), com sigma estimado pelo MAD das
+# diferenças mês a mês, que não é afetado pelas próprias mudanças de nível).
+#
+# Cada linha da matriz (grupo x mês) é uma série; os grupos são divididos entre
+# processos. Meses em que o grupo não tem registro (nan) são ignorados.
+
+
+# desvio padrão do ruído estimado pelas diferenças consecutivas
+def _sigma_ruido(serie):
+    diferencas = np.diff(serie)
+    if len(diferencas) == 0:
+        return 0.0
+    sigma = ESCALA_MAD * np.median(np.abs(diferencas - np.median(diferencas))) / np.sqrt(2)
+    if sigma == 0:
+        sigma = np.std(diferencas) / np.sqrt(2)
+    return sigma
+
+
+def _custo(s1, s2, inicio, fim):
+    return (s2[fim] - s2[inicio]) - (s1[fim] - s1[inicio])**2 / (fim - inicio)
+
+
+# melhor divisão de [inicio, fim) com todos os candidatos avaliados de uma vez
+def _melhor_divisao(s1, s2, inicio, fim, minimo_segmento):
+    candidatos = np.arange(inicio + minimo_segmento, fim - minimo_segmento + 1)
+    if len(candidatos) == 0:
+        return None, 0.0
+    ganhos = _custo(s1, s2, inicio, fim) - _custo(s1, s2, inicio, candidatos) \
+        - _custo(s1, s2, candidatos, fim)
+    melhor = np.argmax(ganhos)
+    return int(candidatos[melhor]), float(ganhos[melhor])
+
+
+# posições (na série sem nan) onde começa cada novo segmento
+def segmentar(serie, penalidade=None, minimo_segmento=6, max_mudancas=None):
+    serie = np.asarray(serie, dtype=float)
+    n = len(serie)
+    if n < 2 * minimo_segmento:
+        return []
+
+    if penalidade is None:
+        sigma = _sigma_ruido(serie)
+        if sigma == 0:
+            return []
+        penalidade = 2 * sigma**2 * np.log(n)
+
+    s1 = np.concatenate([[0.0], np.cumsum(serie)])
+    s2 = np.concatenate([[0.0], np.cumsum(serie**2)])
+
+    # segmentos ainda não divididos: (inicio, fim, melhor divisão, ganho)
+    pendentes = [(0, n) + _melhor_divisao(s1, s2, 0, n, minimo_segmento)]
+    mudancas = []
+    while pendentes and (max_mudancas is None or len(mudancas) < max_mudancas):
+        posicao = max(range(len(pendentes)), key=lambda k: pendentes[k][3])
+        inicio, fim, divisao, ganho = pendentes.pop(posicao)
+        if divisao is None or ganho <= penalidade:
+            break
+
+        mudancas.append(divisao)
+        for novo_inicio, novo_fim in ((inicio, divisao), (divisao, fim)):
+            pendentes.append((novo_inicio, novo_fim)
+                             + _melhor_divisao(s1, s2, novo_inicio, novo_fim, minimo_segmento))
+
+    return sorted(mudancas)
+
+
+# mudanças de cada linha da matriz, como posições no eixo dos meses
+def _segmentar_linhas(matriz, penalidade, minimo_segmento, max_mudancas):
+    resultado = []
+    for linha in matriz:
+        meses_validos = np.flatnonzero(~np.isnan(linha))
+        mudancas = segmentar(linha[meses_validos], penalidade, minimo_segmento, max_mudancas)
+        resultado.append(meses_validos[mudancas].tolist() if mudancas else [])
+    return resultado
+
+
+# matriz (grupos x meses) -> lista com as posições das mudanças de cada grupo
+def pontos_mudanca(matriz, penalidade=None, minimo_segmento=6, max_mudancas=None,
+                   processos=None):
+    matriz = np.asarray(matriz, dtype=float)
+    if processos == 1 or len(matriz) < 2:
+        return _segmentar_linhas(matriz, penalidade, minimo_segmento, max_mudancas)
+
+    if processos is None:
+        processos = os.cpu_count() or 1
+
+    # blocos de grupos para diluir o custo de enviar cada tarefa
+    blocos = np.array_split(matriz, min(len(matriz), processos * 4))
+    n_blocos = len(blocos)
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        resultados = executor.map(_segmentar_linhas, blocos, [penalidade] * n_blocos,
+                                  [minimo_segmento] * n_blocos, [max_mudancas] * n_blocos)
+        return [mudancas for bloco in resultados for mudancas in bloco]
+
+
+# mudanças de nível de todos os indicadores para cada grupo
+# retorna (df_mudancas, df_segmentos): uma linha por mudança (mês em que o novo
+# nível começa, médias antes e depois) e uma linha por segmento (início, fim, média)
+def detectar_mudancas(df, nivel='cisp', lista_indicadores=None, penalidade=None,
+                      minimo_segmento=6, max_mudancas=None, processos=None):
+    grupos, meses, lista_indicadores, cubo = cubo_grupo_mes(df, nivel, lista_indicadores)
+
+    # as séries de todos os indicadores vão juntas para o mesmo conjunto de processos
+    n_grupos = len(grupos)
+    posicoes = pontos_mudanca(cubo.reshape(-1, cubo.shape[-1]), penalidade, minimo_segmento,
+                              max_mudancas, processos)
+
+    mudancas = []
+    segmentos = []
+    for i, indicador in enumerate(lista_indicadores):
+        for g in range(n_grupos):
+            mudancas_grupo = posicoes[i * n_grupos + g]
+            linha = cubo[i, g]
+            validos = np.flatnonzero(~np.isnan(linha))
+            if len(validos) == 0:
+                continue
+
+            limites = [validos[0]] + mudancas_grupo + [validos[-1] + 1]
+            intervalos = list(zip(limites[:-1], limites[1:]))
+            medias = [np.nanmean(linha[inicio:fim]) for inicio, fim in intervalos]
+
+            for k, (inicio, fim) in enumerate(intervalos):
+                segmentos.append((indicador, grupos[g], k, meses[inicio], meses[fim - 1],
+                                  np.count_nonzero(~np.isnan(linha[inicio:fim])), medias[k]))
+            for k, mes in enumerate(mudancas_grupo):
+                mudancas.append((indicador, grupos[g], meses[mes], medias[k], medias[k + 1]))
+
+    colunas_mudancas = ['indicador', nivel, 'mes_ano', 'media_antes', 'media_depois']
+    df_mudancas = pd.DataFrame(mudancas, columns=colunas_mudancas)
+    df_mudancas['mes_ano'] = rotulo_mes_ano(df_mudancas['mes_ano'])
+    df_mudancas['variacao'] = df_mudancas['media_depois'] - df_mudancas['media_antes']
+
+    colunas_segmentos = ['indicador', nivel, 'segmento', 'inicio', 'fim', 'meses', 'media']
+    df_segmentos = pd.DataFrame(segmentos, columns=colunas_segmentos)
+    df_segmentos['inicio'] = rotulo_mes_ano(df_segmentos['inicio'])
+    df_segmentos['fim'] = rotulo_mes_ano(df_segmentos['fim'])
+
+    return df_mudancas, df_segmentos
+
+
+if __name__ == '__main__':
+    # uso: python pontos_mudanca.py [nivel] [indicador] [endereco]
+    nivel = sys.argv[1] if len(sys.argv) > 1 else 'munic'
+    indicador = sys.argv[2] if len(sys.argv) > 2 else 'estelionato'
+
+    try:
+        print('Obtendo dados...')
+
+        df_ocorrencias = carregar_ocorrencias(endereco_da_linha_de_comando(3))
+        df_ocorrencias = compactar_ocorrencias(df_ocorrencias)
+
+        print('Dados obtidos com sucesso!')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print('Detectando mudanças de nível...')
+
+        df_mudancas, df_segmentos = detectar_mudancas(df_ocorrencias, nivel, [indicador])
+
+        print(f'\nMaiores mudanças de nível de {indicador} por {nivel}: ')
+        print(30*'-')
+        ordem = np.argsort(-np.abs(df_mudancas['variacao'].to_numpy()), kind='stable')
+        print(df_mudancas.iloc[ordem].head(20).to_string(index=False))
+
+    except Exception as e:
+        print(f'Erro ao detectar mudanças de nível: {e}')
+        exit()
@@ -0,0 +1,238 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from anomalias import cubo_grupo_mes
+from dados_isp import carregar_ocorrencias, compactar_ocorrencias, endereco_da_linha_de_comando, \
+    rotulo_mes_ano
+
+# Previsão dos próximos meses de cada grupo (ex.: cada CISP) para todos os
+# indicadores. Em vez de ajustar um modelo por série, cada modelo é ajustado à
+# matriz (grupo x mês) inteira de um indicador com operações vetorizadas:
+#
+# sazonal_ingenuo: o valor do mesmo mês do ano anterior
+# suavizacao_exponencial: nível suavizado; o alfa de cada série é escolhido em uma
+#     grade (todas as séries e todos os alfas atualizados juntos, mês a mês)
+# tendencia_sazonal: reta + efeito de cada mês do ano nos últimos `janela_ajuste`
+#     meses; mínimos quadrados em forma fechada (equações normais de todas as
+#     séries resolvidas em lote), ignorando meses sem registro
+#
+# O backtest refaz a previsão de um passo em cada um dos últimos `meses_teste`
+# meses usando só os meses anteriores. Os indicadores são divididos entre processos.
+
+MODELOS = ['sazonal_ingenuo', 'suavizacao_exponencial', 'tendencia_sazonal']
+ALFAS = np.linspace(0.05, 0.95, 19)
+# meses mínimos com registro para ajustar a reta + 11 efeitos de mês
+MINIMO_MESES_TENDENCIA = 24
+
+
+# previsões de um passo do sazonal ingênuo para todos os meses (nan nos 12 primeiros)
+def _um_passo_ingenuo(matriz):
+    previsto = np.full(matriz.shape, np.nan)
+    previsto[:, 12:] = matriz[:, :-12]
+    return previsto
+
+
+# nível suavizado mês a mês de cada série; meses sem registro não alteram o nível
+# retorna o nível final e as previsões de um passo de cada mês
+def _suavizar(matriz, alfas):
+    nivel = np.full(len(matriz), np.nan)
+    previsto = np.full(matriz.shape, np.nan)
+    for mes in range(matriz.shape[1]):
+        previsto[:, mes] = nivel
+        valor = matriz[:, mes]
+        presente = ~np.isnan(valor)
+        iniciar = presente & np.isnan(nivel)
+        atualizar = presente & ~iniciar
+        nivel = np.where(iniciar, valor, nivel)
+        nivel = np.where(atualizar, alfas * valor + (1 - alfas) * nivel, nivel)
+    return nivel, previsto
+
+
+# alfa de cada série com o menor erro quadrático de um passo em `treino` meses
+# (os erros são acumulados mês a mês, sem guardar as previsões de todos os alfas)
+def _escolher_alfas(matriz, treino):
+    alfas = np.repeat(ALFAS[:, np.newaxis], len(matriz), axis=1)
+    nivel = np.full(alfas.shape, np.nan)
+    soma_erros = np.zeros(alfas.shape)
+    contagem = np.zeros(alfas.shape)
+    for mes in range(treino):
+        valor = np.broadcast_to(matriz[:, mes], alfas.shape)
+        presente = ~np.isnan(valor)
+        avaliado = presente & ~np.isnan(nivel)
+        soma_erros += np.where(avaliado, (valor - nivel)**2, 0.0)
+        contagem += avaliado
+        nivel = np.where(presente & np.isnan(nivel), valor, nivel)
+        nivel = np.where(avaliado, alfas * valor + (1 - alfas) * nivel, nivel)
+
+    with np.errstate(invalid='ignore'):
+        erros = np.where(contagem > 0, soma_erros / contagem, np.inf)
+    return ALFAS[np.argmin(erros, axis=0)]
+
+
+# matriz de delineamento: intercepto, tendência e efeito dos meses 2..12
+def _delineamento(meses, referencia):
+    colunas = [np.ones(len(meses)), (meses - referencia) / 12.0]
+    mes_do_ano = meses % 12
+    colunas += [(mes_do_ano == mes).astype(float) for mes in range(1, 12)]
+    return np.column_stack(colunas)
+
+
+# coeficientes (grupos x 13) da reta + meses com os meses [inicio, fim) de cada série
+def _ajustar_tendencia(matriz, meses, inicio, fim):
+    janela = matriz[:, inicio:fim]
+    pesos = (~np.isnan(janela)).astype(float)
+    valores = np.nan_to_num(janela)
+    delineamento = _delineamento(meses[inicio:fim], meses[fim - 1])
+
+    # equações normais de todas as séries de uma vez: (X' W X) b = X' W y
+    # X' W X de cada série é a soma dos produtos externos das linhas de X ponderada
+    # pelos pesos da série: um único produto de matrizes (grupos x meses) @ (meses x 13²)
+    n_meses, n_coeficientes = delineamento.shape
+    externos = delineamento[:, :, np.newaxis] * delineamento[:, np.newaxis, :]
+    normal = (pesos @ externos.reshape(n_meses, -1)).reshape(-1, n_coeficientes, n_coeficientes)
+    direita = (pesos * valores) @ delineamento
+    # regularização mínima para meses do ano ausentes na janela
+    normal += 1e-8 * np.eye(delineamento.shape[1])
+    coeficientes = np.linalg.solve(normal, direita[..., np.newaxis])[..., 0]
+
+    coeficientes[pesos.sum(axis=1) < MINIMO_MESES_TENDENCIA] = np.nan
+    return coeficientes, meses[fim - 1]
+
+
+def _prever_tendencia(coeficientes, referencia, meses_futuros):
+    return coeficientes @ _delineamento(meses_futuros, referencia).T
+
+
+# previsões dos próximos `horizonte` meses e erros do backtest de um indicador
+def _prever_indicador(matriz, meses, horizonte, meses_teste, janela_ajuste):
+    n_meses = matriz.shape[1]
+    treino = n_meses - meses_teste
+    meses_futuros = meses[-1] + np.arange(1, horizonte + 1)
+
+    previsoes = {}
+    um_passo = {}
+
+    # sazonal ingênuo: meses além de 12 à frente repetem o ciclo
+    ingenuo = _um_passo_ingenuo(matriz)
+    previsoes['sazonal_ingenuo'] = matriz[:, n_meses - 12 + (np.arange(horizonte) % 12)]
+    um_passo['sazonal_ingenuo'] = ingenuo[:, treino:]
+
+    # suavização exponencial: alfa escolhido só com os meses de treino
+    alfas = _escolher_alfas(matriz, treino)
+    nivel, previsto = _suavizar(matriz, alfas)
+    previsoes['suavizacao_exponencial'] = np.repeat(nivel[:, np.newaxis], horizonte, axis=1)
+    um_passo['suavizacao_exponencial'] = previsto[:, treino:]
+
+    # reta + meses: reajustada em cada origem do backtest
+    tendencia = np.full((len(matriz), meses_teste), np.nan)
+    for posicao, fim in enumerate(range(treino, n_meses)):
+        coeficientes, referencia = _ajustar_tendencia(matriz, meses, max(fim - janela_ajuste, 0),
+                                                      fim)
+        tendencia[:, posicao] = _prever_tendencia(coeficientes, referencia,
+                                                  meses[fim:fim + 1])[:, 0]
+    coeficientes, referencia = _ajustar_tendencia(matriz, meses, max(n_meses - janela_ajuste, 0),
+                                                  n_meses)
+    previsoes['tendencia_sazonal'] = _prever_tendencia(coeficientes, referencia, meses_futuros)
+    um_passo['tendencia_sazonal'] = tendencia
+
+    reais = matriz[:, treino:]
+    erros = {modelo: um_passo[modelo] - reais for modelo in MODELOS}
+    return {'previsoes': previsoes, 'erros': erros}
+
+
+# previsões e métricas de backtest de todos os grupos e indicadores
+# retorna (df_previsoes, df_metricas):
+#   df_previsoes: indicador, grupo, modelo, mes_ano e previsão de cada mês do horizonte
+#   df_metricas: indicador, grupo, modelo, mae, rmse, viés e meses avaliados no backtest
+def prever(df, nivel='cisp', lista_indicadores=None, horizonte=1, meses_teste=12,
+           janela_ajuste=60, processos=None):
+    grupos, meses, lista_indicadores, cubo = cubo_grupo_mes(df, nivel, lista_indicadores)
+    if cubo.shape[-1] < meses_teste + 24:
+        raise ValueError(f'São necessários ao menos {meses_teste + 24} meses de histórico')
+
+    n_indicadores = len(lista_indicadores)
+    argumentos = (list(cubo), [meses] * n_indicadores, [horizonte] * n_indicadores,
+                  [meses_teste] * n_indicadores, [janela_ajuste] * n_indicadores)
+    if processos == 1 or n_indicadores == 1:
+        resultados = list(map(_prever_indicador, *argumentos))
+    else:
+        processos = processos or min(n_indicadores, os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(_prever_indicador, *argumentos))
+
+    n_grupos = len(grupos)
+    rotulos_futuros = np.asarray(rotulo_mes_ano(meses[-1] + np.arange(1, horizonte + 1)))
+    grupos = np.asarray(grupos)
+
+    previsoes = []
+    metricas = []
+    for indicador, resultado in zip(lista_indicadores, resultados):
+        for modelo in MODELOS:
+            valores = resultado['previsoes'][modelo]
+            previsoes.append(pd.DataFrame({
+                'indicador': indicador,
+                nivel: np.repeat(grupos, horizonte),
+                'modelo': modelo,
+                'mes_ano': np.tile(rotulos_futuros, n_grupos),
+                'previsao': valores.ravel(),
+            }))
+
+            erros = resultado['erros'][modelo]
+            avaliados = np.count_nonzero(~np.isnan(erros), axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mae = np.nansum(np.abs(erros), axis=1) / avaliados
+                rmse = np.sqrt(np.nansum(erros**2, axis=1) / avaliados)
+                vies = np.nansum(erros, axis=1) / avaliados
+            metricas.append(pd.DataFrame({
+                'indicador': indicador,
+                nivel: grupos,
+                'modelo': modelo,
+                'mae': mae,
+                'rmse': rmse,
+                'vies': vies,
+                'meses_avaliados': avaliados,
+            }))
+
+    return pd.concat(previsoes, ignore_index=True), pd.concat(metricas, ignore_index=True)
+
+
+if __name__ == '__main__':
+    # uso: python previsao.py [nivel] [horizonte] [endereco]
+    nivel = sys.argv[1] if len(sys.argv) > 1 else 'cisp'
+    horizonte = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    try:
+        print('Obtendo dados...')
+
+        df_ocorrencias = carregar_ocorrencias(endereco_da_linha_de_comando(3))
+        df_ocorrencias = compactar_ocorrencias(df_ocorrencias)
+
+        print('Dados obtidos com sucesso!')
+
+    except Exception as e:
+        print(f'Erro ao obter dados: {e}')
+        exit()
+
+    try:
+        print('Prevendo os próximos meses...')
+
+        df_previsoes, df_metricas = prever(df_ocorrencias, nivel, horizonte=horizonte)
+
+        print(f'\nErro médio do backtest por modelo (um passo, por {nivel}): ')
+        print(30*'-')
+        print(df_metricas.groupby(['indicador', 'modelo'])[['mae', 'rmse']].mean().unstack()
+              .round(2).to_string())
+
+        print('\nPrevisões de roubo_veiculo (tendencia_sazonal): ')
+        print(30*'-')
+        selecao = (df_previsoes['indicador'] == 'roubo_veiculo') \
+            & (df_previsoes['modelo'] == 'tendencia_sazonal')
+        print(df_previsoes[selecao].head(10).to_string(index=False))
+
+    except Exception as e:
+        print(f'Erro ao prever: {e}')
+        exit()
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agrupamento import agrupar, kmeans_minilote, matriz_perfis, silhueta
+
+# Agrupamento comparado com casos de resposta conhecida: k-means em minilotes sobre
+# nuvens separadas recupera as nuvens, a silhueta é igual à calculada ponto a ponto,
+# e com um cluster por grupo os centróides voltam exatamente aos totais originais.
+#
+# uso: python -m pytest test_agrupamento.py
+
+ARQUIVO_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regressao',
+                               'fixture_ocorrencias.csv')
+CENTROS = np.array([[0.0, 0.0, 0.0], [10.0, 0.0, 0.0], [0.0, 10.0, 0.0], [0.0, 0.0, 10.0]])
+
+
+def _nuvens(n_por_nuvem=500, semente=0):
+    rng = np.random.default_rng(semente)
+    rotulos = np.repeat(np.arange(len(CENTROS)), n_por_nuvem)
+    return CENTROS[rotulos] + rng.normal(0, 1, (len(rotulos), 3)), rotulos
+
+
+def _silhueta_direta(matriz, rotulos):
+    distancias = np.sqrt(((matriz[:, np.newaxis] - matriz[np.newaxis]) ** 2).sum(axis=2))
+    valores = []
+    for i in range(len(matriz)):
+        proprio = rotulos == rotulos[i]
+        if proprio.sum() == 1:
+            valores.append(0.0)
+            continue
+        a = distancias[i, proprio].sum() / (proprio.sum() - 1)
+        b = min(distancias[i, rotulos == c].mean() for c in np.unique(rotulos) if c != rotulos[i])
+        valores.append((b - a) / max(a, b))
+    return np.mean(valores)
+
+
+@pytest.mark.parametrize('tamanho_lote', [128, 5000])
+def test_nuvens_separadas(tamanho_lote):
+    matriz, verdadeiros = _nuvens()
+    rotulos, centroides, inercia = kmeans_minilote(matriz, 4, tamanho_lote=tamanho_lote)
+
+    # cada cluster é exatamente uma nuvem
+    pares = set(zip(rotulos.tolist(), verdadeiros.tolist()))
+    assert len(pares) == 4 and len({c for c, _ in pares}) == 4
+    for cluster, nuvem in pares:
+        assert np.abs(centroides[cluster] - CENTROS[nuvem]).max() < 0.3
+
+    assert np.isclose(inercia, ((matriz - centroides[rotulos]) ** 2).sum())
+    assert silhueta(matriz, rotulos) > 0.7
+
+
+def test_silhueta_igual_a_direta():
+    matriz, _ = _nuvens(n_por_nuvem=40, semente=1)
+    rotulos, _, _ = kmeans_minilote(matriz, 3)
+    # um grupo com um único ponto tem silhueta 0
+    rotulos = np.where(np.arange(len(matriz)) == 7, 3, rotulos)
+
+    esperada = _silhueta_direta(matriz, rotulos)
+    assert np.isclose(silhueta(matriz, rotulos, tamanho_bloco=25), esperada)
+    # com amostra a silhueta é a direta sobre os pontos sorteados
+    amostrada = silhueta(matriz, rotulos, amostra=60, semente=3)
+    selecionados = np.sort(np.random.default_rng(3).choice(len(matriz), 60, replace=False))
+    assert np.isclose(amostrada, _silhueta_direta(matriz[selecionados], rotulos[selecionados]))
+    assert np.isnan(silhueta(matriz, np.zeros(len(matriz), dtype=int)))
+
+
+def test_agrupar_na_fixture():
+    df = pd.read_csv(ARQUIVO_FIXTURE, sep=';', encoding='iso-8859-1')
+    lista_indicadores = ['roubo_veiculo', 'hom_doloso', 'estelionato']
+    totais = df.groupby('munic')[lista_indicadores].sum()
+    n = len(totais)
+
+    perfis = matriz_perfis(df, 'munic', lista_indicadores)
+    np.testing.assert_allclose(perfis['matriz'].mean(axis=0), 0, atol=1e-12)
+    np.testing.assert_allclose(perfis['matriz'].std(axis=0), 1)
+
+    df_resumo, df_atribuicoes, centroides = agrupar(df, 'munic', lista_indicadores,
+                                                    faixa_k=[2, n, n + 1], processos=1)
+    assert df_resumo['k'].tolist() == [2, n]
+    assert list(df_atribuicoes.columns) == ['munic', 'k2', f'k{n}']
+
+    # um cluster por munic: cada centróide, na escala original, é o total de um munic
+    atribuicoes = df_atribuicoes.set_index('munic')[f'k{n}']
+    assert atribuicoes.nunique() == n
+    for munic, cluster in atribuicoes.items():
+        np.testing.assert_allclose(centroides[n].loc[cluster].to_numpy(),
+                                   totais.loc[munic].to_numpy(dtype=float))
+
+
+def test_erros():
+    with pytest.raises(ValueError, match='k deve estar'):
+        kmeans_minilote(np.zeros((3, 2)), 4)
+
+    df = pd.read_csv(ARQUIVO_FIXTURE, sep=';', encoding='iso-8859-1')
+    df['estelionato'] = df['estelionato'].astype(float)
+    df.loc[df['munic'] == df['munic'].iloc[0], 'estelionato'] = np.nan
+    with pytest.raises(ValueError, match='sem valores'):
+        matriz_perfis(df, 'munic', ['estelionato'])
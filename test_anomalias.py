@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomalias import cubo_grupo_mes, detectar_anomalias, pontuar_anomalias
+
+# Anomalias mensais comparadas com cálculos diretos: o cubo (grupo x mês) com o
+# groupby do pandas, as linhas de base móvel e sazonal com laços mês a mês, e um
+# pico plantado na fixture aparecendo em primeiro lugar.
+#
+# uso: python -m pytest test_anomalias.py
+
+ARQUIVO_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regressao',
+                               'fixture_ocorrencias.csv')
+
+
+def _fixture():
+    return pd.read_csv(ARQUIVO_FIXTURE, sep=';', encoding='iso-8859-1')
+
+
+def _matriz():
+    rng = np.random.default_rng(0)
+    matriz = rng.poisson(20, (4, 60)).astype(float)
+    matriz[0, 10:14] = np.nan
+    matriz[2, :30] = np.nan
+    return matriz
+
+
+def test_cubo_igual_ao_groupby():
+    df = _fixture()
+    # meses sem linha do grupo ficam nan; valores ausentes ficam fora da soma
+    df = df.drop(df.index[(df['cisp'] == 2) & (df['ano'] == 2021) & (df['mes'] == 5)])
+    df['estupro'] = df['estupro'].astype(float)
+    df.loc[df['cisp'] == 3, 'estupro'] = np.nan
+
+    grupos, meses, lista_indicadores, cubo = cubo_grupo_mes(df, 'aisp', ['hom_doloso',
+                                                                         'estupro'])
+    esperado = df.assign(indice=df['ano'] * 12 + df['mes'] - 1) \
+        .groupby(['aisp', 'indice'])[lista_indicadores].sum()
+
+    assert meses[0] == esperado.index.get_level_values('indice').min()
+    for i, indicador in enumerate(lista_indicadores):
+        tabela = esperado[indicador].unstack().reindex(index=grupos, columns=meses)
+        np.testing.assert_array_equal(cubo[i], tabela.to_numpy())
+
+
+def test_linha_base_movel():
+    matriz = _matriz()
+    janela, minimo_meses = 12, 6
+    esperado, zscore = pontuar_anomalias(matriz, 'movel', janela=janela,
+                                         minimo_meses=minimo_meses)
+
+    for g in range(matriz.shape[0]):
+        for t in range(matriz.shape[1]):
+            anteriores = matriz[g, max(t - janela, 0):t]
+            anteriores = anteriores[~np.isnan(anteriores)]
+            if len(anteriores) < minimo_meses:
+                assert np.isnan(esperado[g, t])
+                continue
+            assert np.isclose(esperado[g, t], anteriores.mean())
+            desvio = max(anteriores.std(), 1.0)
+            assert np.isclose(zscore[g, t], (matriz[g, t] - anteriores.mean()) / desvio,
+                              equal_nan=True)
+
+
+def test_linha_base_sazonal():
+    matriz = _matriz()
+    anos_base = 3
+    esperado, zscore = pontuar_anomalias(matriz, 'sazonal', anos_base=anos_base)
+
+    for g in range(matriz.shape[0]):
+        referencia = np.full(matriz.shape[1], np.nan)
+        for t in range(matriz.shape[1]):
+            mesmos_meses = [matriz[g, t - 12 * k] for k in range(1, anos_base + 1)
+                            if t - 12 * k >= 0]
+            if mesmos_meses and not np.isnan(mesmos_meses).all():
+                referencia[t] = np.nanmedian(mesmos_meses)
+        np.testing.assert_allclose(esperado[g], referencia)
+
+        residuo = matriz[g] - referencia
+        escala = 1.4826 * np.nanmedian(np.abs(residuo - np.nanmedian(residuo)))
+        np.testing.assert_allclose(zscore[g], residuo / max(escala, 1.0))
+
+
+@pytest.mark.parametrize('metodo', ['movel', 'sazonal'])
+def test_pico_plantado(metodo):
+    df = _fixture()
+    linha = (df['cisp'] == 7) & (df['mes_ano'] == '2022m03')
+    df.loc[linha, 'roubo_veiculo'] = df['roubo_veiculo'].max() * 10
+
+    df_anomalias = detectar_anomalias(df, 'cisp', ['roubo_veiculo'], metodo)
+    primeira = df_anomalias.iloc[0]
+    assert (primeira['cisp'], primeira['mes_ano']) == (7, '2022m03')
+    assert primeira['zscore'] > 3
+    assert df_anomalias['zscore'].abs().is_monotonic_decreasing
+
+
+def test_metodo_desconhecido():
+    with pytest.raises(ValueError, match='desconhecido'):
+        pontuar_anomalias(_matriz(), 'media')
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from aproximado import MEDIDAS_APROXIMADAS, correlacao_aproximada, medidas_aproximadas
+from dados_isp import compactar_ocorrencias
+from dados_sinteticos import gerar_ocorrencias
+from medidas import calcular_medidas
+
+# Cobertura dos intervalos do modo aproximado na base sintética, na ordem do arquivo
+# (por cisp e mês) e com as linhas embaralhadas: a amostra é estratificada por
+# (cisp, ano) e não pode depender da ordem. Para várias sementes, o intervalo de 95%
+# de cada passo (blocos lidos) deve conter o valor exato perto de 95% das vezes, e a
+# leitura completa deve dar o valor exato.
+#
+# uso: python -m pytest test_aproximado.py
+
+SEMENTES = 60
+PASSOS = (2, 3, 4, 8)
+COBERTURA_MINIMA = 0.9
+
+
+def _base(embaralhada=False):
+    df = compactar_ocorrencias(gerar_ocorrencias(), exibir=False)
+    if embaralhada:
+        df = df.sample(frac=1, random_state=7).reset_index(drop=True)
+    return df
+
+
+# fração dos passos em que o intervalo de cada nome contém o valor exato
+def _cobertura(resultados, exatos):
+    acertos = {nome: 0 for nome in exatos}
+    passos = 0
+    for semente in range(SEMENTES):
+        for resultado in resultados(semente):
+            if resultado['blocos'] in PASSOS:
+                passos += 1
+                for nome, exato in exatos.items():
+                    _, inferior, superior = resultado[nome]
+                    acertos[nome] += inferior <= exato <= superior
+            if resultado['blocos'] == max(PASSOS):
+                break
+    return {nome: acerto / passos for nome, acerto in acertos.items()}
+
+
+@pytest.mark.parametrize('embaralhada', [False, True])
+def test_cobertura_correlacao(embaralhada):
+    df = _base(embaralhada)
+    for x, y in [('roubo_veiculo', 'recuperacao_veiculos'),
+                 ('lesao_corp_dolosa', 'lesao_corp_morte')]:
+        total = df.groupby('cisp', observed=True)[[x, y]].sum().to_numpy(dtype=float)
+        exato = np.corrcoef(total.T)[0, 1]
+
+        cobertura = _cobertura(lambda semente: correlacao_aproximada(df, x, y, semente=semente),
+                               {'correlacao': exato})
+        assert cobertura['correlacao'] >= COBERTURA_MINIMA, f'{x} x {y}: {cobertura}'
+
+
+@pytest.mark.parametrize('embaralhada', [False, True])
+def test_cobertura_medidas(embaralhada):
+    df = _base(embaralhada)
+    total = df.groupby('munic', observed=True)['roubo_veiculo'].sum()
+    medidas = calcular_medidas(total)
+    exatos = {nome: medidas[nome] for nome in MEDIDAS_APROXIMADAS}
+
+    cobertura = _cobertura(lambda semente: medidas_aproximadas(df, 'roubo_veiculo',
+                                                               semente=semente),
+                           exatos)
+    baixas = {nome: valor for nome, valor in cobertura.items() if valor < COBERTURA_MINIMA}
+    assert not baixas, f'cobertura abaixo de {COBERTURA_MINIMA}: {baixas}'
+
+
+def test_leitura_completa_exata():
+    df = _base()
+    total = df.groupby('munic', observed=True)['roubo_veiculo'].sum()
+    medidas = calcular_medidas(total)
+
+    *_, ultimo = medidas_aproximadas(df, 'roubo_veiculo')
+    assert ultimo['fracao_amostrada'] == 1.0
+    for nome in MEDIDAS_APROXIMADAS:
+        estimativa, inferior, superior = ultimo[nome]
+        assert np.isclose(estimativa, medidas[nome]) and inferior == superior == estimativa, nome
+
+    total = df.groupby('cisp', observed=True)[['roubo_veiculo', 'recuperacao_veiculos']].sum()
+    *_, ultimo = correlacao_aproximada(df, 'roubo_veiculo', 'recuperacao_veiculos')
+    assert np.isclose(ultimo['correlacao'][0], np.corrcoef(total.to_numpy(dtype=float).T)[0, 1])
+
+
+# mesma semente: mesmos estratos e meses lidos em qualquer ordem das linhas
+def test_independente_da_ordem():
+    df = _base()
+    embaralhada = _base(embaralhada=True)
+    for ordenado, misturado in zip(correlacao_aproximada(df, 'roubo_veiculo', 'estupro'),
+                                   correlacao_aproximada(embaralhada, 'roubo_veiculo',
+                                                         'estupro')):
+        assert ordenado['fracao_amostrada'] == misturado['fracao_amostrada']
+        assert np.allclose(ordenado['correlacao'], misturado['correlacao'])
+
+
+def test_nivel_que_divide_estratos():
+    with pytest.raises(ValueError, match='divide estratos'):
+        next(medidas_aproximadas(_base(), 'roubo_veiculo', 'mes_ano'))
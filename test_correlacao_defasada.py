@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomalias import cubo_grupo_mes
+from correlacao_defasada import correlacao_defasada, defasagens_por_grupo, melhor_defasagem
+
+# Correlação com defasagem comparada com o np.corrcoef de x[t] e y[t + d] em cada
+# defasagem, uma série com atraso conhecido e a tabela por grupo da fixture.
+#
+# uso: python -m pytest test_correlacao_defasada.py
+
+ARQUIVO_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regressao',
+                               'fixture_ocorrencias.csv')
+
+
+def _corrcoef(x, y, max_defasagem):
+    n = len(x)
+    return np.array([np.corrcoef(x[:n - d], y[d:])[0, 1] for d in range(max_defasagem + 1)])
+
+
+def test_igual_ao_corrcoef():
+    rng = np.random.default_rng(0)
+    x = rng.poisson(30, (3, 5, 80)).astype(float)
+    y = 0.5 * np.roll(x, 4, axis=-1) + rng.poisson(10, x.shape)
+    correlacoes = correlacao_defasada(x, y, 12)
+
+    assert correlacoes.shape == (3, 5, 13)
+    for indice in np.ndindex(x.shape[:-1]):
+        np.testing.assert_allclose(correlacoes[indice], _corrcoef(x[indice], y[indice], 12),
+                                   atol=1e-10)
+
+
+def test_defasagem_conhecida():
+    rng = np.random.default_rng(1)
+    x = rng.normal(100, 10, 120)
+    y = np.concatenate([rng.normal(100, 10, 3), x[:-3]])
+    melhor, coeficiente = melhor_defasagem(correlacao_defasada(x, y, 12))
+    assert melhor == 3 and np.isclose(coeficiente, 1.0)
+
+
+def test_nan_e_serie_constante():
+    x = np.arange(30.0)
+    x[5] = np.nan
+    y = np.full(30, 7.0)
+    correlacoes = correlacao_defasada([x, x], [x, y], 6)
+
+    # nan conta como zero ocorrências
+    np.testing.assert_allclose(correlacoes[0], _corrcoef(np.nan_to_num(x), np.nan_to_num(x), 6))
+    # série constante não tem correlação, e melhor_defasagem não escolhe nan
+    assert np.isnan(correlacoes[1]).all()
+    melhor, coeficiente = melhor_defasagem(correlacoes)
+    assert melhor[0] == 0 and np.isnan(coeficiente[1])
+
+    with pytest.raises(ValueError, match='max_defasagem'):
+        correlacao_defasada(x, x, 29)
+
+
+def test_defasagens_por_grupo():
+    df = pd.read_csv(ARQUIVO_FIXTURE, sep=';', encoding='iso-8859-1')
+    pares = [('roubo_veiculo', 'recuperacao_veiculos'), ('hom_doloso', 'roubo_veiculo')]
+    df_defasagens = defasagens_por_grupo(df, pares, 'aisp', 6)
+
+    grupos, _, lista_indicadores, cubo = cubo_grupo_mes(df, 'aisp')
+    assert len(df_defasagens) == len(pares) * len(grupos)
+    for _, linha in df_defasagens.iterrows():
+        g = list(grupos).index(linha['aisp'])
+        x = np.nan_to_num(cubo[lista_indicadores.index(linha['indicador_x']), g])
+        y = np.nan_to_num(cubo[lista_indicadores.index(linha['indicador_y']), g])
+        esperadas = _corrcoef(x, y, 6)
+        assert linha['melhor_defasagem'] == np.nanargmax(esperadas)
+        assert np.isclose(linha['correlacao'], np.nanmax(esperadas))
+        assert np.isclose(linha['correlacao_sem_defasagem'], esperadas[0])
@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from dados_isp import CHAVE, indicadores
+from dados_sinteticos import ampliar_ocorrencias, gerar_ocorrencias
+
+# Bases sintéticas: mesmo layout da base do ISP (as colunas da fixture), uma linha
+# por (cisp, mes_ano), e a ampliação com cópias de cisps novos sem chaves repetidas.
+#
+# uso: python -m pytest test_dados_sinteticos.py
+
+ARQUIVO_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regressao',
+                               'fixture_ocorrencias.csv')
+
+
+def test_layout_da_base():
+    fixture = pd.read_csv(ARQUIVO_FIXTURE, sep=';', encoding='iso-8859-1', nrows=5)
+    df = gerar_ocorrencias(n_cisp=10, anos=range(2022, 2024))
+
+    assert list(df.columns) == list(fixture.columns)
+    assert len(df) == 10 * 2 * 12
+    assert not df.duplicated(CHAVE).any()
+    # a mesma semente gera a mesma base
+    pd.testing.assert_frame_equal(df, gerar_ocorrencias(n_cisp=10, anos=range(2022, 2024)))
+
+
+def test_ampliar_ocorrencias():
+    df = gerar_ocorrencias(n_cisp=10, anos=range(2022, 2024))
+    df['estelionato'] = df['estelionato'].astype(float)
+    df.loc[df['ano'] == 2022, 'estelionato'] = np.nan
+    ampliada = ampliar_ocorrencias(df, 4)
+
+    assert len(ampliada) == 4 * len(df)
+    assert ampliada['cisp'].nunique() == 4 * df['cisp'].nunique()
+    assert not ampliada.duplicated(CHAVE).any()
+
+    # a primeira cópia é a base original; as demais têm contagens da mesma ordem e
+    # mantêm os valores ausentes
+    pd.testing.assert_frame_equal(ampliada.iloc[:len(df)], df, check_dtype=False)
+    copias = ampliada.iloc[len(df):]
+    assert copias.loc[copias['ano'] == 2022, 'estelionato'].isna().all()
+    for indicador in indicadores(df):
+        original = df[indicador].sum()
+        media_copias = copias[indicador].sum() / 3
+        assert abs(media_copias - original) <= 0.05 * original + 10, indicador
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dados_isp import NIVEIS, compactar_ocorrencias
+from diff_snapshots import LINHAS, cubo_totais, diff_estatisticas
+from medidas import calcular_medidas
+
+# Diff incremental entre snapshots na fixture: linhas removidas, revisadas (inclusive
+# uma cisp reatribuída a outra aisp e um valor que vira ausente) e um mês novo.
+# O cubo atualizado só com as linhas alteradas deve ser igual ao recalculado do
+# snapshot novo inteiro, e o changeset deve trazer os totais e medidas recalculados.
+#
+# uso: python -m pytest test_diff_snapshots.py
+
+ARQUIVO_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regressao',
+                               'fixture_ocorrencias.csv')
+INDICADORES = ['roubo_veiculo', 'hom_doloso', 'estelionato']
+
+
+def _snapshots(compactar):
+    df_antigo = pd.read_csv(ARQUIVO_FIXTURE, sep=';', encoding='iso-8859-1')
+
+    df_novo = df_antigo.copy()
+    df_novo.loc[df_novo['cisp'] == 3, 'roubo_veiculo'] += 5
+    df_novo.loc[(df_novo['cisp'] == 4) & (df_novo['ano'] == 2020), 'hom_doloso'] = np.nan
+    df_novo.loc[(df_novo['cisp'] == 5) & (df_novo['ano'] == 2023), 'aisp'] = \
+        df_novo.loc[df_novo['cisp'] == 6, 'aisp'].iloc[0]
+    df_novo = df_novo[~((df_novo['cisp'] == 7) & (df_novo['mes_ano'] == '2019m01'))]
+
+    mes_novo = df_novo[df_novo['mes_ano'] == '2023m12'].assign(mes_ano='2024m01', ano=2024, mes=1)
+    df_novo = pd.concat([df_novo, mes_novo], ignore_index=True)
+
+    if compactar:
+        return (compactar_ocorrencias(df_antigo, exibir=False),
+                compactar_ocorrencias(df_novo, exibir=False))
+    return df_antigo, df_novo
+
+
+def _igual(df_cubo, df_esperado):
+    pd.testing.assert_frame_equal(df_cubo.astype(float).sort_index(),
+                                  df_esperado.astype(float).sort_index(),
+                                  check_index_type=False, check_categorical=False)
+
+
+@pytest.mark.parametrize('compactar', [False, True])
+def test_cubo_incremental(compactar):
+    df_antigo, df_novo = _snapshots(compactar)
+    df_changeset, cubo_novo = diff_estatisticas(df_antigo, df_novo,
+                                                lista_indicadores=INDICADORES)
+    esperado = cubo_totais(df_novo, NIVEIS, INDICADORES)
+
+    for nivel in NIVEIS:
+        _igual(cubo_novo[nivel], esperado[nivel])
+
+        for indicador in INDICADORES:
+            linhas = df_changeset[(df_changeset['nivel'] == nivel)
+                                  & (df_changeset['indicador'] == indicador)]
+
+            # totais dos grupos alterados iguais aos do snapshot novo inteiro
+            for _, linha in linhas[linhas['tipo'] == 'agregado'].iterrows():
+                novo = esperado[nivel][indicador].get(linha['grupo'], np.nan)
+                assert np.isclose(linha['valor_novo'], novo, equal_nan=True), linha.to_dict()
+
+            # medidas iguais às calculadas do zero
+            medidas = calcular_medidas(esperado[nivel][indicador])
+            for _, linha in linhas[linhas['tipo'] == 'medida'].iterrows():
+                assert np.isclose(linha['valor_novo'], medidas[linha['medida']]), \
+                    linha.to_dict()
+
+    assert set(df_changeset['tipo']) >= {'agregado', 'medida'}
+
+
+# com o cubo guardado da publicação anterior o changeset é o mesmo, e o cubo novo
+# serve de cubo antigo do diff seguinte
+def test_cubo_guardado():
+    df_antigo, df_novo = _snapshots(compactar=True)
+    sem_cubo, cubo_novo = diff_estatisticas(df_antigo, df_novo, lista_indicadores=INDICADORES)
+    com_cubo, _ = diff_estatisticas(df_antigo, df_novo, lista_indicadores=INDICADORES,
+                                    cubo_antigo=cubo_totais(df_antigo, NIVEIS, INDICADORES))
+    pd.testing.assert_frame_equal(sem_cubo, com_cubo)
+
+    # o snapshot novo contra ele mesmo: nada muda e o cubo é reaproveitado
+    vazio, cubo = diff_estatisticas(df_novo, df_novo.copy(), lista_indicadores=INDICADORES,
+                                    cubo_antigo=cubo_novo)
+    assert len(vazio) == 0
+    for nivel in NIVEIS:
+        assert list(cubo[nivel].columns) == INDICADORES + [LINHAS]
+        _igual(cubo[nivel], cubo_novo[nivel])
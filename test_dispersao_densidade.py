@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from dispersao_densidade import grade_densidade, plotar_densidade
+
+# Grade de densidade do gráfico de correlação comparada com as referências do numpy:
+# contagens iguais às do histogram2d nas mesmas bordas, correlação igual à do
+# corrcoef (sem os pares com nan) e o desenho sobre um eixo do matplotlib.
+#
+# uso: python -m pytest test_dispersao_densidade.py
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+
+def _pontos():
+    rng = np.random.default_rng(0)
+    x = rng.poisson(50, 5000).astype(float)
+    y = 0.8 * x + rng.normal(0, 5, 5000)
+    x[::97] = np.nan
+    return x, y
+
+
+def test_grade_e_correlacao():
+    x, y = _pontos()
+    resolucao = 40
+    grade, limites, correlacao = grade_densidade(x, y, resolucao)
+
+    validos = ~np.isnan(x)
+    esperada, _, _ = np.histogram2d(y[validos], x[validos], bins=resolucao,
+                                    range=[limites[2:], limites[:2]])
+    assert grade.shape == (resolucao, resolucao)
+    assert grade.sum() == validos.sum()
+    np.testing.assert_array_equal(grade, esperada)
+    assert np.isclose(correlacao, np.corrcoef(x[validos], y[validos])[0, 1])
+
+
+def test_valores_constantes_e_vazios():
+    grade, limites, correlacao = grade_densidade([3.0] * 10, np.arange(10.0), 5)
+    assert grade.sum() == 10 and grade[:, 0].sum() == 10
+    assert limites[:2] == (3.0, 4.0)
+    assert np.isnan(correlacao)
+
+    with pytest.raises(ValueError, match='Nenhum par'):
+        grade_densidade([np.nan], [1.0])
+
+
+def test_plotar_densidade():
+    import matplotlib.pyplot as plt
+
+    x, y = _pontos()
+    figura, eixo = plt.subplots()
+    correlacao = plotar_densidade(x, y, resolucao=30, xlabel='x', ylabel='y', eixo=eixo)
+    try:
+        assert correlacao == grade_densidade(x, y, 30)[2]
+        assert len(eixo.images) == 1 and eixo.images[0].get_array().shape == (30, 30)
+        assert eixo.get_xlabel() == 'x' and str(correlacao) in eixo.get_title()
+    finally:
+        plt.close(figura)
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from estatisticas_segmentadas import medidas_segmentadas, perfil_por_grupo
+from medidas import calcular_medidas, outliers_iqr
+
+# Medidas por grupo em uma passada comparadas com medidas.calcular_medidas aplicada
+# a cada grupo separadamente: grupos de tamanhos variados (inclusive vazios, de um
+# valor e só com nan), valores repetidos e os dois métodos de quantil.
+#
+# uso: python -m pytest test_estatisticas_segmentadas.py
+
+ARQUIVO_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regressao',
+                               'fixture_ocorrencias.csv')
+
+
+def _comparar(obtidas, valores, multiplicador=1.5, metodo_quantil='weibull'):
+    valores = valores[~np.isnan(valores)]
+    assert obtidas['n'] == len(valores)
+    if len(valores) == 0:
+        assert np.isnan(obtidas['media']) and np.isnan(obtidas['mediana'])
+        return
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        medidas = calcular_medidas(valores, multiplicador, metodo_quantil)
+    for nome, valor in medidas.items():
+        assert np.isclose(obtidas[nome], valor, equal_nan=True), nome
+
+    inferiores, superiores = outliers_iqr(valores, medidas)
+    assert obtidas['outliers_inferiores'] == inferiores.sum()
+    assert obtidas['outliers_superiores'] == superiores.sum()
+
+
+@pytest.mark.parametrize('metodo_quantil', ['weibull', 'linear'])
+def test_igual_a_calcular_medidas(metodo_quantil):
+    rng = np.random.default_rng(0)
+    # grupo 3 sem linhas, grupo 4 só com nan, grupos 5 a 7 com 1, 2 e 3 valores
+    tamanhos = [200, 57, 9, 0, 6, 1, 2, 3]
+    codigos = np.repeat(np.arange(len(tamanhos)), tamanhos)
+    matriz = np.column_stack([rng.poisson(8, len(codigos)),
+                              rng.lognormal(3, 1, len(codigos))]).astype(float)
+    matriz[rng.random(matriz.shape) < 0.1] = np.nan
+    matriz[codigos == 4] = np.nan
+    matriz[codigos == 0, 1] *= 1 + 20 * (rng.random(200) < 0.05)
+    # linhas fora de ordem
+    ordem = rng.permutation(len(codigos))
+    codigos, matriz = codigos[ordem], matriz[ordem]
+
+    medidas = medidas_segmentadas(codigos, matriz, len(tamanhos), multiplicador=2.0,
+                                  metodo_quantil=metodo_quantil)
+    assert medidas['media'].shape == (len(tamanhos), 2)
+    for grupo in range(len(tamanhos)):
+        for j in range(2):
+            obtidas = {nome: valores[grupo, j] for nome, valores in medidas.items()}
+            _comparar(obtidas, matriz[codigos == grupo, j], 2.0, metodo_quantil)
+
+
+def test_metodo_desconhecido():
+    with pytest.raises(ValueError, match='Método de quantil'):
+        medidas_segmentadas([0, 0, 1], [1.0, 2.0, 3.0], metodo_quantil='hazen')
+
+
+def test_perfil_por_grupo():
+    df = pd.read_csv(ARQUIVO_FIXTURE, sep=';', encoding='iso-8859-1')
+    df['estelionato'] = df['estelionato'].astype(float)
+    df.loc[df['ano'] == 2019, 'estelionato'] = np.nan
+    lista_indicadores = ['roubo_veiculo', 'estelionato']
+    df_perfil = perfil_por_grupo(df, 'munic', lista_indicadores)
+
+    assert len(df_perfil) == df['munic'].nunique() * len(lista_indicadores)
+    mensal = df.groupby(['munic', 'ano', 'mes'])[lista_indicadores].sum(min_count=1)
+    for _, linha in df_perfil.iterrows():
+        valores = mensal.loc[linha['munic'], linha['indicador']].to_numpy(dtype=float)
+        _comparar(linha, valores)
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dados_isp import NIVEIS, compactar_ocorrencias
+from exportar_sqlite import METODOS_OUTLIERS, consultar_serie, consultar_totais, exportar
+from medidas import calcular_medidas
+from outliers import detectar_outliers
+
+# Exportação para SQLite na fixture comparada com o groupby do pandas: o cubo mensal,
+# as consultas de série e de totais, os perfis (calcular_medidas) e os outliers
+# (detectar_outliers) de cada nível, e a reexportação sobre um arquivo existente.
+#
+# uso: python -m pytest test_exportar_sqlite.py
+
+ARQUIVO_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regressao',
+                               'fixture_ocorrencias.csv')
+INDICADORES = ['roubo_veiculo', 'hom_doloso', 'estelionato']
+
+
+@pytest.fixture(scope='module')
+def exportado(tmp_path_factory):
+    df = pd.read_csv(ARQUIVO_FIXTURE, sep=';', encoding='iso-8859-1')
+    # meses sem linha do grupo ficam fora do cubo; valores ausentes ficam fora da soma
+    df = df.drop(df.index[(df['cisp'] == 2) & (df['mes_ano'] == '2021m05')])
+    df['estelionato'] = df['estelionato'].astype(float)
+    df.loc[df['ano'] == 2019, 'estelionato'] = np.nan
+    df = compactar_ocorrencias(df, exibir=False)
+
+    caminho = str(tmp_path_factory.mktemp('sqlite') / 'isp.sqlite')
+    exportar(df, caminho, lista_indicadores=INDICADORES)
+    # recriar o arquivo não duplica linhas
+    exportar(df, caminho, lista_indicadores=INDICADORES)
+
+    conexao = sqlite3.connect(caminho)
+    yield df, conexao
+    conexao.close()
+
+
+@pytest.mark.parametrize('nivel', NIVEIS)
+def test_cubo_igual_ao_groupby(exportado, nivel):
+    df, conexao = exportado
+    df_cubo = pd.read_sql('SELECT * FROM cubo WHERE nivel = ?', conexao, params=(nivel,))
+
+    esperado = df.groupby([nivel, 'mes_ano'], observed=True)[INDICADORES].sum().stack()
+    esperado.index = esperado.index.map(lambda chave: (str(chave[0]), int(chave[1]), chave[2]))
+    obtido = df_cubo.set_index(['grupo', 'mes', 'indicador'])['valor']
+
+    assert len(obtido) == len(esperado)
+    pd.testing.assert_series_equal(obtido.sort_index(), esperado.astype(float).sort_index(),
+                                   check_names=False)
+    assert df_cubo.loc[df_cubo['mes'] == df['mes_ano'].min(), 'mes_ano'].eq('2019m01').all()
+
+
+def test_consultas(exportado):
+    df, conexao = exportado
+    ultimo_mes = int(df['mes_ano'].max())
+
+    cisp = int(df['cisp'].iloc[0])
+    serie = consultar_serie(conexao, 'cisp', cisp, 'roubo_veiculo', ultimo_mes - 11, ultimo_mes)
+    esperada = df[(df['cisp'] == cisp) & (df['mes_ano'] > ultimo_mes - 12)] \
+        .sort_values('mes_ano')['roubo_veiculo']
+    assert [valor for _, valor in serie] == esperada.tolist()
+    assert serie[-1][0] == '2023m12'
+
+    totais = consultar_totais(conexao, 'munic', 'roubo_veiculo', ultimo_mes - 23, ultimo_mes)
+    esperados = df[df['mes_ano'] > ultimo_mes - 24] \
+        .groupby('munic', observed=True)['roubo_veiculo'].sum()
+    assert dict(totais) == {str(munic): float(total) for munic, total in esperados.items()}
+    assert [total for _, total in totais] == sorted(esperados.tolist(), reverse=True)
+
+
+@pytest.mark.parametrize('nivel', NIVEIS)
+def test_perfis_e_outliers(exportado, nivel):
+    df, conexao = exportado
+    totais = df.groupby(nivel, observed=True)[INDICADORES].sum()
+
+    df_perfis = pd.read_sql('SELECT * FROM perfis WHERE nivel = ?', conexao, params=(nivel,))
+    for indicador in INDICADORES:
+        medidas = calcular_medidas(totais[indicador].to_numpy(dtype=float))
+        obtidas = df_perfis[df_perfis['indicador'] == indicador].set_index('medida')['valor']
+        assert set(obtidas.index) == set(medidas)
+        for medida, valor in medidas.items():
+            assert np.isclose(obtidas[medida], valor, equal_nan=True), (indicador, medida)
+
+    df_outliers = pd.read_sql('SELECT * FROM outliers WHERE nivel = ?', conexao, params=(nivel,))
+    esperados = set()
+    matriz = totais.to_numpy(dtype=float)
+    for metodo, resultado in detectar_outliers(matriz, METODOS_OUTLIERS).items():
+        for tipo in ('inferiores', 'superiores'):
+            for g, j in zip(*np.nonzero(resultado[tipo])):
+                esperados.add((INDICADORES[j], metodo, str(totais.index[g]), tipo))
+    obtidos = set(df_outliers[['indicador', 'metodo', 'grupo', 'tipo']]
+                  .itertuples(index=False, name=None))
+    assert obtidos == esperados
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dados_isp import compactar_ocorrencias, indicadores
+from dados_sinteticos import ampliar_ocorrencias, gerar_ocorrencias
+from groupby_paralelo import agregar_paralelo
+from medidas import calcular_medidas
+
+# Agregação em memória compartilhada comparada com o groupby do pandas: totais por
+# grupo (nan fora da soma) e medidas de cada indicador, com um e vários processos.
+#
+# uso: python -m pytest test_groupby_paralelo.py
+
+
+def _base():
+    df = ampliar_ocorrencias(gerar_ocorrencias(n_cisp=20, anos=range(2020, 2024)), 3)
+    # valores ausentes, como nas séries que o ISP passou a publicar depois
+    df['estelionato'] = df['estelionato'].astype(float)
+    df.loc[df['ano'] == 2020, 'estelionato'] = np.nan
+    return compactar_ocorrencias(df, exibir=False)
+
+
+@pytest.mark.parametrize('nivel, processos', [('munic', 1), ('cisp', 2), ('aisp', 3)])
+def test_igual_ao_groupby(nivel, processos):
+    df = _base()
+    lista_indicadores = indicadores(df)
+    df_totais, df_medidas = agregar_paralelo(df, nivel, processos=processos)
+
+    esperado = df.groupby(nivel, observed=True)[lista_indicadores].sum()
+    pd.testing.assert_frame_equal(df_totais, esperado.astype(float), check_index_type=False,
+                                  check_categorical=False)
+
+    for indicador in lista_indicadores:
+        medidas = calcular_medidas(esperado[indicador])
+        for nome, valor in medidas.items():
+            assert np.isclose(df_medidas.loc[indicador, nome], valor), (indicador, nome)
+
+
+def test_nivel_com_vazios():
+    df = _base()
+    df['munic'] = df['munic'].astype(object)
+    df.loc[0, 'munic'] = None
+    with pytest.raises(ValueError, match='valores vazios'):
+        agregar_paralelo(df, 'munic', processos=1)
@@ -0,0 +1,128 @@
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import particoes
+from analises import executar_analises
+from particoes import carregar_particoes, gravar_particoes, ler_manifesto, preparar_particoes
+
+# Armazenamento particionado: reaproveitamento só da mesma base e em dia com ela,
+# diretórios que não são armazenamentos protegidos, consulta à base remota em cache,
+# colunas anuláveis inteiramente ausentes, e a análise do exercicio04 lida das
+# partições igual à lida do CSV.
+#
+# uso: python -m pytest test_particoes.py
+
+ARQUIVO_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regressao',
+                               'fixture_ocorrencias.csv')
+
+
+def _copiar_fixture(diretorio):
+    destino = str(diretorio / 'ocorrencias.csv')
+    shutil.copyfile(ARQUIVO_FIXTURE, destino)
+    return destino
+
+
+def test_preparar_particoes(tmp_path):
+    endereco = _copiar_fixture(tmp_path)
+    diretorio = str(tmp_path / 'particoes')
+
+    # sem armazenamento: nada é gravado
+    assert not preparar_particoes(diretorio, endereco)
+    assert not os.path.exists(diretorio)
+
+    gravar_particoes(pd.read_csv(endereco, sep=';', encoding='iso-8859-1'), diretorio, endereco)
+    manifesto = os.path.join(diretorio, 'manifesto.json')
+    gravado = os.path.getmtime(manifesto)
+    assert preparar_particoes(diretorio, endereco)
+    assert os.path.getmtime(manifesto) == gravado
+
+    # partições de outra base não são usadas nem regravadas
+    outra = str(tmp_path / 'outra.csv')
+    shutil.copyfile(endereco, outra)
+    assert not preparar_particoes(diretorio, outra)
+    assert os.path.getmtime(manifesto) == gravado
+
+    # base mais nova que as partições: regravadas
+    futuro = time.time() + 60
+    os.utime(endereco, (futuro, futuro))
+    assert preparar_particoes(diretorio, endereco)
+    assert ler_manifesto(diretorio)['origem']['modificacao'] == futuro
+
+
+# diretório com outros arquivos não é apagado; um armazenamento é substituído inteiro
+def test_destino_protegido(tmp_path):
+    df = pd.read_csv(ARQUIVO_FIXTURE, sep=';', encoding='iso-8859-1')
+    diretorio = tmp_path / 'dados'
+    diretorio.mkdir()
+    (diretorio / 'planilha.xlsx').write_text('do usuário')
+
+    with pytest.raises(ValueError, match='não é um armazenamento'):
+        gravar_particoes(df, str(diretorio))
+    assert (diretorio / 'planilha.xlsx').read_text() == 'do usuário'
+
+    armazenamento = str(tmp_path / 'particoes')
+    gravar_particoes(df, armazenamento)
+    gravar_particoes(df[df['ano'] == 2023], armazenamento)
+    assert [particao['nome'] for particao in ler_manifesto(armazenamento)['particoes']] \
+        == ['ano=2023']
+    assert sorted(os.listdir(tmp_path)) == ['dados', 'particoes']
+
+
+# base remota: a data de modificação é consultada uma vez por intervalo
+def test_verificacao_remota_em_cache(tmp_path, monkeypatch):
+    consultas = []
+
+    def modificacao(endereco):
+        consultas.append(endereco)
+        return 1000.0
+
+    monkeypatch.setattr(particoes, 'modificacao_origem', modificacao)
+    endereco = 'https://exemplo.invalido/base.csv'
+    diretorio = str(tmp_path / 'particoes')
+    gravar_particoes(pd.read_csv(ARQUIVO_FIXTURE, sep=';', encoding='iso-8859-1'), diretorio,
+                     endereco)
+    consultas.clear()
+
+    for _ in range(3):
+        assert preparar_particoes(diretorio, endereco)
+    assert len(consultas) == 1
+
+    monkeypatch.setattr(particoes, 'INTERVALO_VERIFICACAO', 0)
+    assert preparar_particoes(diretorio, endereco)
+    assert len(consultas) == 2
+
+
+def test_coluna_anulavel_ausente(tmp_path):
+    df = pd.DataFrame({'ano': [2022, 2023],
+                       'ausente': pd.array([pd.NA, pd.NA], dtype='Int64'),
+                       'fracao': [0.1, np.nan]})
+    diretorio = str(tmp_path / 'particoes')
+    gravar_particoes(df, diretorio)
+
+    tipos = {coluna: descricao['tipo']
+             for coluna, descricao in ler_manifesto(diretorio)['colunas'].items()}
+    # fração não é inteira: continua float64 para não perder precisão
+    assert tipos['fracao'] == 'float64'
+
+    df_lido = carregar_particoes(diretorio)
+    assert df_lido['ausente'].isna().all()
+    assert df_lido['fracao'].iloc[0] == 0.1
+
+
+def test_exercicio04_particoes(tmp_path):
+    endereco = _copiar_fixture(tmp_path)
+    diretorio = str(tmp_path / 'particoes')
+    gravar_particoes(pd.read_csv(endereco, sep=';', encoding='iso-8859-1'), diretorio, endereco)
+
+    df_ocorrencias = carregar_particoes(diretorio, anos=(2022, 2023),
+                                        colunas=['ano', 'aisp', 'hom_doloso'])
+    particoes = executar_analises(['exercicio04'], ocorrencias=df_ocorrencias)['exercicio04']
+    csv = executar_analises(['exercicio04'], endereco)['exercicio04']
+
+    assert particoes['medidas'] == csv['medidas']
+    assert particoes['total'].equals(csv['total'])
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pontos_mudanca import detectar_mudancas, pontos_mudanca, segmentar
+
+# Pontos de mudança comparados com referências diretas: a melhor divisão única igual
+# à busca exaustiva pela menor soma dos quadrados, degraus conhecidos em série com
+# ruído, meses sem registro e um degrau plantado na fixture.
+#
+# uso: python -m pytest test_pontos_mudanca.py
+
+ARQUIVO_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regressao',
+                               'fixture_ocorrencias.csv')
+
+
+def _degraus(semente=0):
+    rng = np.random.default_rng(semente)
+    return np.concatenate([np.full(40, 10.0), np.full(40, 30.0), np.full(40, 15.0)]) \
+        + rng.normal(0, 2, 120)
+
+
+def test_divisao_igual_a_busca_exaustiva():
+    rng = np.random.default_rng(1)
+    serie = rng.poisson(20, 50).astype(float)
+    serie[23:] += 4
+    minimo_segmento = 5
+
+    custos = {k: serie[:k].var() * k + serie[k:].var() * (len(serie) - k)
+              for k in range(minimo_segmento, len(serie) - minimo_segmento + 1)}
+    assert segmentar(serie, penalidade=0, minimo_segmento=minimo_segmento,
+                     max_mudancas=1) == [min(custos, key=custos.get)]
+
+
+def test_degraus_conhecidos():
+    assert segmentar(_degraus()) == [40, 80]
+    assert segmentar(_degraus(), max_mudancas=1) == [40]
+    # sem mudança de nível, sem divisão
+    assert segmentar(np.random.default_rng(2).normal(20, 2, 120)) == []
+    assert segmentar(np.full(60, 3.0)) == []
+    assert segmentar(_degraus()[:11]) == []
+
+
+@pytest.mark.parametrize('processos', [1, 2])
+def test_meses_sem_registro(processos):
+    serie = _degraus()
+    com_nan = serie.copy()
+    com_nan[[5, 50, 51]] = np.nan
+    matriz = np.vstack([serie, com_nan, np.full(120, np.nan)])
+
+    # posições no eixo dos meses da matriz, pulando os nan
+    validos = np.flatnonzero(~np.isnan(com_nan))
+    esperadas = validos[segmentar(com_nan[validos])].tolist()
+    assert pontos_mudanca(matriz, processos=processos) == [[40, 80], esperadas, []]
+
+
+def test_degrau_plantado():
+    df = pd.read_csv(ARQUIVO_FIXTURE, sep=';', encoding='iso-8859-1')
+    depois = (df['cisp'] == 5) & (df['ano'] * 12 + df['mes'] >= 2021 * 12 + 7)
+    df.loc[depois, 'roubo_veiculo'] += 200
+
+    df_mudancas, df_segmentos = detectar_mudancas(df, 'cisp', ['roubo_veiculo'], processos=1)
+    mudancas = df_mudancas[df_mudancas['cisp'] == 5]
+    assert '2021m07' in mudancas['mes_ano'].tolist()
+    linha = mudancas[mudancas['mes_ano'] == '2021m07'].iloc[0]
+    assert linha['variacao'] > 150
+
+    # segmentos cobrem todos os meses de cada cisp, com a média de cada trecho
+    meses = df.groupby('cisp')['mes_ano'].count()
+    assert (df_segmentos.groupby('cisp')['meses'].sum() == meses).all()
+    segmentos = df_segmentos[df_segmentos['cisp'] == 5]
+    serie = df[df['cisp'] == 5].sort_values(['ano', 'mes'])
+    rotulos = serie['mes_ano'].tolist()
+    for _, segmento in segmentos.iterrows():
+        inicio, fim = rotulos.index(segmento['inicio']), rotulos.index(segmento['fim'])
+        assert np.isclose(segmento['media'], serie['roubo_veiculo'].iloc[inicio:fim + 1].mean())
@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from previsao import ALFAS, MODELOS, prever
+
+# Previsões comparadas com séries de resposta conhecida: numa série puramente sazonal
+# o sazonal ingênuo e a reta + meses não erram, numa reta + sazonalidade a reta + meses
+# segue a tendência, e a suavização exponencial é igual a um laço simples com o alfa
+# escolhido por busca na grade.
+#
+# uso: python -m pytest test_previsao.py
+
+ARQUIVO_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regressao',
+                               'fixture_ocorrencias.csv')
+PADRAO = np.array([12.0, 9.0, 15.0, 11.0, 20.0, 7.0, 13.0, 18.0, 10.0, 16.0, 8.0, 14.0])
+
+
+def _fixture():
+    return pd.read_csv(ARQUIVO_FIXTURE, sep=';', encoding='iso-8859-1')
+
+
+def _metricas(df_metricas, modelo):
+    return df_metricas[(df_metricas['indicador'] == 'roubo_veiculo')
+                       & (df_metricas['modelo'] == modelo)]
+
+
+def _previsoes(df_previsoes, modelo, cisp):
+    selecao = (df_previsoes['indicador'] == 'roubo_veiculo') \
+        & (df_previsoes['modelo'] == modelo) & (df_previsoes['cisp'] == cisp)
+    return df_previsoes[selecao]
+
+
+def test_serie_sazonal():
+    df = _fixture()
+    df['roubo_veiculo'] = df['cisp'] * PADRAO[df['mes'] - 1]
+    df_previsoes, df_metricas = prever(df, 'cisp', ['roubo_veiculo'], horizonte=14)
+
+    for modelo in ('sazonal_ingenuo', 'tendencia_sazonal'):
+        metricas = _metricas(df_metricas, modelo)
+        assert (metricas['meses_avaliados'] == 12).all()
+        np.testing.assert_allclose(metricas['mae'], 0, atol=1e-6)
+
+        # 2024m01 a 2025m02 repetem o padrão
+        previsoes = _previsoes(df_previsoes, modelo, 3)
+        assert previsoes['mes_ano'].iloc[0] == '2024m01'
+        assert previsoes['mes_ano'].iloc[-1] == '2025m02'
+        np.testing.assert_allclose(previsoes['previsao'], 3 * PADRAO[np.arange(14) % 12],
+                                   atol=1e-6)
+
+
+def test_tendencia_sazonal():
+    df = _fixture()
+    t = (df['ano'] - 2019) * 12 + df['mes'] - 1
+    df['roubo_veiculo'] = 100 + 2.5 * t + df['cisp'] * PADRAO[df['mes'] - 1]
+    # mês sem registro da cisp 2 fica fora do ajuste e do backtest
+    df = df.drop(df.index[(df['cisp'] == 2) & (df['mes_ano'] == '2023m06')])
+    df_previsoes, df_metricas = prever(df, 'cisp', ['roubo_veiculo'], horizonte=3)
+
+    metricas = _metricas(df_metricas, 'tendencia_sazonal').set_index('cisp')
+    np.testing.assert_allclose(metricas['mae'], 0, atol=1e-4)
+    assert metricas.loc[2, 'meses_avaliados'] == 11
+
+    futuros = np.arange(60, 63)
+    previsoes = _previsoes(df_previsoes, 'tendencia_sazonal', 5)
+    np.testing.assert_allclose(previsoes['previsao'], 100 + 2.5 * futuros + 5 * PADRAO[:3],
+                               atol=1e-4)
+    # o sazonal ingênuo fica um ano atrás da tendência
+    np.testing.assert_allclose(_metricas(df_metricas, 'sazonal_ingenuo')['vies'], -30)
+
+
+def _suavizacao_direta(serie, treino):
+    def suavizar(alfa):
+        nivel, erros = np.nan, []
+        for mes, valor in enumerate(serie):
+            if mes < treino and not np.isnan(nivel):
+                erros.append((valor - nivel)**2)
+            nivel = valor if np.isnan(nivel) else alfa * valor + (1 - alfa) * nivel
+        return nivel, np.mean(erros)
+
+    resultados = [suavizar(alfa) for alfa in ALFAS]
+    return resultados[int(np.argmin([erro for _, erro in resultados]))][0]
+
+
+def test_suavizacao_igual_ao_laco():
+    df = _fixture()
+    df_previsoes, df_metricas = prever(df, 'cisp', ['roubo_veiculo'], horizonte=2, processos=1)
+    assert set(df_metricas['modelo']) == set(MODELOS)
+
+    mensal = df.sort_values(['ano', 'mes'])
+    for cisp in df['cisp'].unique()[:8]:
+        serie = mensal.loc[mensal['cisp'] == cisp, 'roubo_veiculo'].to_numpy(dtype=float)
+        previsoes = _previsoes(df_previsoes, 'suavizacao_exponencial', cisp)['previsao']
+        np.testing.assert_allclose(previsoes, _suavizacao_direta(serie, len(serie) - 12))
+
+
+def test_historico_curto():
+    df = _fixture()
+    with pytest.raises(ValueError, match='ao menos 36 meses'):
+        prever(df[df['ano'] >= 2022], 'cisp', ['roubo_veiculo'], meses_teste=12)
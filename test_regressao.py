@@ -0,0 +1,297 @@
+import glob
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analises import ANALISES, executar_analises
+from dados_isp import carregar_ocorrencias, compactar_ocorrencias
+from executor_dag import adicionar_etapa, executar
+from fluxo_comprimido import comprimir_arquivo
+from instrumentacao import contadores, tempos, zerar
+
+# Testes de regressão dos exemplos e exercícios.
+# Cada script exemploNN/exercicioNN roda sobre uma base congelada
+# (regressao/fixture_ocorrencias.csv) e o que ele imprime é comparado, linha a linha,
+# com regressao/golden/scripts/<script>.txt. As medidas e tabelas de outliers das
+# análises (analises.py) também são comparadas com os arquivos golden em
+# regressao/golden, com tolerância numérica apertada.
+#
+# Os tempos de cada etapa são comparados com regressao/tempos_base.json só com
+# REGRESSAO_TEMPOS=1: a etapa falha se ficar LIMIAR_TEMPO vezes mais lenta que a
+# base (e a diferença passar de FOLGA_SEGUNDOS). Os tempos de base dependem da
+# máquina; regrave-os e ligue o teste apenas no ambiente em que foram medidos.
+#
+# uso: python -m pytest test_regressao.py
+#      REGRESSAO_TEMPOS=1 python -m pytest test_regressao.py   (inclui os tempos)
+#      python test_regressao.py --atualizar   (regrava golden e tempos de base)
+
+DIRETORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regressao')
+ARQUIVO_FIXTURE = os.path.join(DIRETORIO, 'fixture_ocorrencias.csv')
+DIRETORIO_GOLDEN = os.path.join(DIRETORIO, 'golden')
+DIRETORIO_SAIDAS = os.path.join(DIRETORIO_GOLDEN, 'scripts')
+ARQUIVO_TEMPOS = os.path.join(DIRETORIO, 'tempos_base.json')
+
+TOLERANCIA_RELATIVA = 1e-9
+LIMIAR_TEMPO = 2.0
+FOLGA_SEGUNDOS = 0.005
+REPETICOES = 5
+MEDIR_TEMPOS = os.environ.get('REGRESSAO_TEMPOS') == '1'
+
+SCRIPTS = sorted(os.path.basename(caminho)
+                 for padrao in ('exemplo*_*.py', 'exercicio*_*.py')
+                 for caminho in glob.glob(os.path.join(os.path.dirname(DIRETORIO), padrao)))
+
+
+def _carregar_fixture():
+    return compactar_ocorrencias(carregar_ocorrencias(ARQUIVO_FIXTURE), exibir=False)
+
+
+def _numero(valor):
+    valor = float(valor)
+    return None if math.isnan(valor) else valor
+
+
+def _tabela(df):
+    # pares (grupo, valor) na ordem em que a análise imprime
+    return [[str(grupo), _numero(valor)] for grupo, valor in df.itertuples(index=False)]
+
+
+# resultado de uma análise em formato JSON
+def serializar(resultado):
+    if 'correlacao' in resultado:
+        return {'correlacao': _numero(resultado['correlacao'])}
+
+    golden = {'medidas': {nome: _numero(valor) for nome, valor in resultado['medidas'].items()}}
+    for nome in ('abaixo_q1', 'acima_q3', 'outliers_inferiores', 'outliers_superiores'):
+        golden[nome] = _tabela(resultado[nome])
+    return golden
+
+
+def _comparar(esperado, obtido, caminho=''):
+    if isinstance(esperado, dict):
+        assert sorted(esperado) == sorted(obtido), f'{caminho}: chaves diferentes'
+        for chave in esperado:
+            _comparar(esperado[chave], obtido[chave], f'{caminho}.{chave}')
+    elif isinstance(esperado, list):
+        assert len(esperado) == len(obtido), f'{caminho}: {len(obtido)} itens, esperado {len(esperado)}'
+        for posicao, (item_esperado, item_obtido) in enumerate(zip(esperado, obtido)):
+            _comparar(item_esperado, item_obtido, f'{caminho}[{posicao}]')
+    elif isinstance(esperado, float) and isinstance(obtido, float):
+        assert np.isclose(obtido, esperado, rtol=TOLERANCIA_RELATIVA, atol=0), \
+            f'{caminho}: {obtido} != {esperado}'
+    else:
+        assert esperado == obtido, f'{caminho}: {obtido} != {esperado}'
+
+
+# o que o script imprime ao rodar sobre a fixture
+# roda em um diretório temporário (o script pode gravar arquivos no diretório atual),
+# sem janelas de gráfico; avisos vão para o stderr e não entram na comparação
+def executar_script(script):
+    ambiente = dict(os.environ, MPLBACKEND='Agg', PYTHONIOENCODING='utf-8')
+    with tempfile.TemporaryDirectory() as diretorio:
+        processo = subprocess.run([sys.executable, os.path.join(os.path.dirname(DIRETORIO), script),
+                                   ARQUIVO_FIXTURE],
+                                  cwd=diretorio, env=ambiente, capture_output=True,
+                                  encoding='utf-8', timeout=300)
+    assert processo.returncode == 0, f'{script}:\n{processo.stderr}'
+    return processo.stdout
+
+
+def _arquivo_saida(script):
+    return os.path.join(DIRETORIO_SAIDAS, script.replace('.py', '.txt'))
+
+
+# menor tempo de cada etapa em algumas repetições (reduz o ruído da medição)
+def medir_tempos(df, repeticoes=REPETICOES):
+    menores = {}
+    for _ in range(repeticoes):
+        zerar()
+        executar_analises(ocorrencias=df, max_threads=1)
+        for nome, resumo in tempos().items():
+            menores[nome] = min(menores.get(nome, math.inf), resumo['total'])
+    return menores
+
+
+@pytest.mark.parametrize('script', SCRIPTS)
+def test_saida_scripts(script):
+    with open(_arquivo_saida(script), encoding='utf-8') as arquivo:
+        esperado = arquivo.read().splitlines()
+    obtido = executar_script(script).splitlines()
+
+    diferencas = [f'linha {numero}: {linha_obtida!r} != {linha_esperada!r}'
+                  for numero, (linha_esperada, linha_obtida)
+                  in enumerate(zip(esperado, obtido), start=1)
+                  if linha_esperada != linha_obtida]
+    if len(esperado) != len(obtido):
+        diferencas.append(f'{len(obtido)} linhas, esperado {len(esperado)}')
+    assert not diferencas, f'{script}:\n' + '\n'.join(diferencas[:20])
+
+
+def test_golden():
+    resultados = executar_analises(ocorrencias=_carregar_fixture())
+
+    for nome in ANALISES:
+        with open(os.path.join(DIRETORIO_GOLDEN, f'{nome}.json'), encoding='utf-8') as arquivo:
+            esperado = json.load(arquivo)
+        _comparar(esperado, serializar(resultados[nome]), nome)
+
+
+# a compactação da leitura do DAG publica a memória antes e depois nos contadores
+def test_memoria_compactacao():
+    zerar()
+    executar_analises(['exemplo01'], ARQUIVO_FIXTURE)
+    memoria = contadores()
+    assert 0 < memoria['compactacao.memoria_depois_kb'] < memoria['compactacao.memoria_antes_kb']
+
+
+# o caminho dos scripts (baixar_dados -> ler_ocorrencias) lendo uma cópia .gz em fluxo
+def test_golden_comprimido(tmp_path):
+    destino = str(tmp_path / 'fixture_ocorrencias.csv.gz')
+    comprimir_arquivo(ARQUIVO_FIXTURE, destino)
+    resultados = executar_analises(endereco=destino)
+
+    for nome in ANALISES:
+        with open(os.path.join(DIRETORIO_GOLDEN, f'{nome}.json'), encoding='utf-8') as arquivo:
+            esperado = json.load(arquivo)
+        _comparar(esperado, serializar(resultados[nome]), nome)
+
+
+# os módulos importados pelos scripts (ex.: exercicio04) não carregam o pandas:
+# ele só entra na leitura da base
+def test_importacoes_sem_pandas():
+    codigo = ('import sys, analises, dados_isp, particoes; '
+              'print("pandas" in sys.modules)')
+    processo = subprocess.run([sys.executable, '-c', codigo], cwd=os.path.dirname(DIRETORIO),
+                              capture_output=True, text=True)
+    assert processo.stdout.strip() == 'False', processo.stderr
+
+
+# população fictícia por unidade do nível (munic, cisp...) e ano para a fixture
+def _populacao(df, nivel='munic'):
+    unidades = sorted(df[nivel].astype(str).unique())
+    return pd.DataFrame([(unidade, ano, 100000 * (posicao + 1) + ano)
+                         for posicao, unidade in enumerate(unidades)
+                         for ano in sorted(df['ano'].unique())],
+                        columns=[nivel, 'ano', 'populacao'])
+
+
+# com a população por munic só munic e mes_ano (municípios inteiros) têm taxa;
+# cisp e aisp dividem municípios e falham pedindo uma tabela no próprio nível
+def test_analises_com_populacao_por_munic():
+    df = _carregar_fixture()
+    df_populacao = _populacao(df)
+    erros = {}
+    resultados = executar_analises(ocorrencias=df, populacao=df_populacao, erros=erros)
+
+    niveis = {nome: definicao['nivel'] for nome, definicao in ANALISES.items()}
+    assert sorted(resultados) == sorted(nome for nome, nivel in niveis.items()
+                                        if nivel in ('munic', 'mes_ano'))
+    assert sorted(erros) == sorted(nome for nome, nivel in niveis.items()
+                                   if nivel in ('cisp', 'aisp'))
+    for nome, erro in erros.items():
+        assert f'não se aplica ao nível {niveis[nome]}' in str(erro), nome
+
+    # mes_ano: ocorrências do mês / população de todos os municípios no ano
+    total = resultados['exercicio01']['total'].set_index('mes_ano')['estelionato']
+    mes_ano = total.index[0]
+    ano = df.loc[df['mes_ano'] == mes_ano, 'ano'].iloc[0]
+    populacao = df_populacao.loc[df_populacao['ano'] == ano, 'populacao'].sum()
+    esperada = df.loc[df['mes_ano'] == mes_ano, 'estelionato'].sum() / populacao * 100000
+    assert np.isclose(total.iloc[0], esperada)
+
+
+# com a população por cisp todas as análises rodam (aisp e munic contêm cisps inteiros)
+def test_analises_com_populacao_por_cisp():
+    df = _carregar_fixture()
+    df_populacao = _populacao(df, 'cisp')
+    df_populacao['cisp'] = df_populacao['cisp'].astype(int)
+    erros = {}
+    resultados = executar_analises(ocorrencias=df, populacao=df_populacao, erros=erros)
+
+    assert not erros, erros
+    assert sorted(resultados) == sorted(ANALISES)
+    for nome, resultado in resultados.items():
+        if 'correlacao' in resultado:
+            assert np.isfinite(resultado['correlacao']), nome
+        else:
+            assert np.isfinite(resultado['medidas']['media']), nome
+
+    # taxa do munic: ocorrências / soma da população dos seus cisps nos mesmos anos
+    total = resultados['exemplo01']['total'].set_index('munic')['roubo_veiculo']
+    linhas = df[df['munic'] == total.index[0]]
+    populacao = df_populacao.set_index(['cisp', 'ano'])['populacao']
+    anos = list(linhas[['cisp', 'ano']].drop_duplicates().itertuples(index=False, name=None))
+    esperada = linhas['roubo_veiculo'].sum() / populacao[anos].sum() * 100000
+    assert np.isclose(total.iloc[0], esperada)
+
+
+# uma etapa que falha não interrompe as independentes
+def test_etapa_com_erro():
+    def falhar():
+        raise ValueError('sem dados')
+
+    etapas = {}
+    adicionar_etapa(etapas, 'falha', falhar)
+    adicionar_etapa(etapas, 'depende', lambda valor: valor, ['falha'])
+    adicionar_etapa(etapas, 'independente', lambda: 1)
+
+    erros = {}
+    resultados = executar(etapas, ['depende', 'independente'], erros=erros)
+    assert resultados == {'independente': 1}
+    assert sorted(erros) == ['depende', 'falha']
+
+    with pytest.raises(RuntimeError, match='sem dados'):
+        executar(etapas, ['depende', 'independente'])
+
+
+@pytest.mark.skipif(not MEDIR_TEMPOS, reason='tempos só com REGRESSAO_TEMPOS=1')
+def test_tempos():
+    with open(ARQUIVO_TEMPOS, encoding='utf-8') as arquivo:
+        base = json.load(arquivo)
+
+    medidos = medir_tempos(_carregar_fixture())
+
+    regressoes = [f'{nome}: {medidos[nome]:.4f}s (base {base[nome]:.4f}s)'
+                  for nome in base
+                  if nome in medidos
+                  and medidos[nome] > base[nome] * LIMIAR_TEMPO
+                  and medidos[nome] - base[nome] > FOLGA_SEGUNDOS]
+    assert not regressoes, 'Etapas mais lentas que a base:\n' + '\n'.join(regressoes)
+
+
+def atualizar():
+    df = _carregar_fixture()
+    resultados = executar_analises(ocorrencias=df)
+
+    os.makedirs(DIRETORIO_GOLDEN, exist_ok=True)
+    for nome, resultado in resultados.items():
+        with open(os.path.join(DIRETORIO_GOLDEN, f'{nome}.json'), 'w', encoding='utf-8') as arquivo:
+            json.dump(serializar(resultado), arquivo, indent=2, ensure_ascii=False)
+
+    os.makedirs(DIRETORIO_SAIDAS, exist_ok=True)
+    for script in SCRIPTS:
+        with open(_arquivo_saida(script), 'w', encoding='utf-8') as arquivo:
+            arquivo.write(executar_script(script))
+
+    with open(ARQUIVO_TEMPOS, 'w', encoding='utf-8') as arquivo:
+        json.dump(medir_tempos(df), arquivo, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    if '--atualizar' in sys.argv:
+        try:
+            print('Regravando arquivos golden e tempos de base...')
+            atualizar()
+            print('Arquivos atualizados!')
+        except Exception as e:
+            print(f'Erro ao atualizar arquivos: {e}')
+            exit()
+    else:
+        sys.exit(pytest.main([__file__, '-q']))